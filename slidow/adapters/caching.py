@@ -0,0 +1,243 @@
+"""Read-through caching of aggregates fetched by identifier"""
+
+import collections
+import threading
+import time
+import typing
+
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy.orm.base import NO_VALUE
+
+from slidow import models
+from slidow.adapters import repos
+
+# an aggregate root type and its identifier
+CacheKey = tuple[type, str]
+
+
+class AggregateCache:
+    """A bounded LRU cache of aggregates with a time to live
+
+    Entries are dropped once `ttl` seconds old, and the least recently
+    used entry is evicted when more than `max_size` are held. An entry
+    may depend on other keys, e.g. an event on its quizzes, and is
+    invalidated along with them.
+
+    Every invalidation starts a new generation. A value loaded while an
+    invalidation happened is not stored, so a slow reader cannot put
+    back data that a concurrent commit has just replaced."""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 60.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # key -> (expiry, value, the keys it depends on)
+        self._entries: collections.OrderedDict[
+            CacheKey, tuple[float, typing.Any, tuple[CacheKey, ...]]
+        ] = collections.OrderedDict()
+        self._dependents: dict[CacheKey, set[CacheKey]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: CacheKey) -> typing.Any | None:
+        """Return the cached value for `key`, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self,
+        key: CacheKey,
+        value: typing.Any,
+        generation: int,
+        depends_on: typing.Iterable[CacheKey] = (),
+    ) -> bool:
+        """Store a value loaded during `generation`
+
+        Returns False, storing nothing, if anything was invalidated
+        since that generation began."""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._discard(key)
+            dependencies = tuple(depends_on)
+            self._entries[key] = (self.clock() + self.ttl, value, dependencies)
+            for dependency in dependencies:
+                self._dependents.setdefault(dependency, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, keys: typing.Iterable[CacheKey]) -> None:
+        """Drop `keys` and every entry that depends on them"""
+        with self._lock:
+            self._generation += 1
+            pending = list(keys)
+            while pending:
+                key = pending.pop()
+                pending.extend(self._dependents.pop(key, ()))
+                if key in self._entries:
+                    self._discard(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._dependents.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dependency in entry[2]:
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
+
+
+class _CachingRepo(repos.AbstractRepo):
+    """Serve `get` from an AggregateCache, delegating everything else
+
+    Aggregates are cached fully loaded and detached from any session.
+    `get` merges a copy into the unit of work's session without a
+    query, so callers never share the cached instance, and changes
+    they make are flushed like those to any other loaded aggregate.
+    Without `fill`, misses are read from the repo without being cached,
+    for sessions that may see stale data. Aggregates passed to
+    `add`/`add_all` are recorded in `written` for the unit of work to
+    invalidate when it commits."""
+
+    root_type: type
+
+    def __init__(
+        self,
+        repo: repos.AbstractRepo,
+        session: Session,
+        cache: AggregateCache,
+        written: set[CacheKey],
+        fill: bool = True,
+    ) -> None:
+        self.repo = repo
+        self.session = session
+        self.cache = cache
+        self.written = written
+        self.fill = fill
+
+    def add(self, model: typing.Any) -> None:
+        self.written.add(aggregate_key(model))
+        self.repo.add(model)
+
+    def add_all(self, aggregates: typing.Iterable[typing.Any]) -> None:
+        aggregates = list(aggregates)
+        self.written.update(aggregate_key(model) for model in aggregates)
+        self.repo.add_all(aggregates)
+
+    def get(self, id_: typing.Any, load: repos.LoadProfile = "lazy") -> typing.Any:
+        key = (self.root_type, id_)
+        if key in self.written:
+            # added in this unit of work and not committed yet
+            return self.repo.get(id_, load)
+        generation = self.cache.generation
+        aggregate = self.cache.get(key)
+        if aggregate is None:
+            if not self.fill:
+                return self.repo.get(id_, load)
+            aggregate = self.repo.get(id_, load="full")
+            _detach(aggregate)
+            self.cache.put(
+                key,
+                aggregate,
+                generation,
+                depends_on=_dependencies(aggregate),
+            )
+        return self.session.merge(aggregate, load=False)
+
+    def list(self) -> typing.Any:
+        return self.repo.list()
+
+    def page(self, limit: int, after: typing.Any = None) -> typing.Any:
+        return self.repo.page(limit, after)
+
+    def stream(self, batch_size: int = 1000) -> typing.Any:
+        return self.repo.stream(batch_size)
+
+    def summaries(self, limit: int, after: typing.Any = None) -> typing.Any:
+        return self.repo.summaries(limit, after)
+
+
+class CachingEventRepo(_CachingRepo):
+    root_type = models.Event
+
+
+class CachingQuizRepo(_CachingRepo, repos.AbstractQuizRepo):
+    root_type = models.Quiz
+    repo: repos.AbstractQuizRepo
+
+    def stream_dicts(self, batch_size: int = 1000) -> typing.Iterator[dict]:
+        return self.repo.stream_dicts(batch_size)
+
+
+def aggregate_key(model: typing.Any) -> CacheKey:
+    """Return the key of the aggregate that `model` belongs to
+
+    Raises LookupError when the root cannot be reached without a query,
+    e.g. for an option whose question was never loaded."""
+    if isinstance(model, (models.Event, models.Quiz)):
+        return (type(model), model.identifier)
+    for child_type, parent in ((models.Option, "question"), (models.Question, "quiz")):
+        if isinstance(model, child_type):
+            value = instance_state(model).attrs[parent].loaded_value
+            if value is NO_VALUE or value is None:
+                raise LookupError(model)
+            return aggregate_key(value)
+    raise LookupError(model)
+
+
+def _dependencies(aggregate: typing.Any) -> list[CacheKey]:
+    if isinstance(aggregate, models.Event):
+        return [(models.Quiz, quiz.identifier) for quiz in aggregate.quizzes]
+    return []
+
+
+def _detach(aggregate: typing.Any) -> None:
+    session = object_session(aggregate)
+    if session is not None:
+        session.expunge(aggregate)
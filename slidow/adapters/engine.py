@@ -0,0 +1,160 @@
+"""SQLite engines configured from a named profile"""
+
+import dataclasses
+import itertools
+import threading
+import time
+import typing
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclasses.dataclass(frozen=True)
+class SQLiteProfile:
+    """Connection pragmas and pool settings for a SQLite engine
+
+    Pragmas left as None keep SQLite's defaults. `cache_size` follows
+    the pragma: positive in pages, negative in KiB."""
+
+    journal_mode: str | None = None
+    synchronous: str | None = None
+    mmap_size: int | None = None
+    cache_size: int | None = None
+    busy_timeout: int | None = None
+    pool_size: int | None = None
+    max_overflow: int | None = None
+
+    def pragmas(self) -> list[str]:
+        settings = {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+            "busy_timeout": self.busy_timeout,
+        }
+        return [
+            f"PRAGMA {name}={value}"
+            for name, value in settings.items()
+            if value is not None
+        ]
+
+    def pool_options(self) -> dict[str, int]:
+        options = {"pool_size": self.pool_size, "max_overflow": self.max_overflow}
+        return {name: value for name, value in options.items() if value is not None}
+
+
+PROFILES: dict[str, SQLiteProfile] = {
+    "default": SQLiteProfile(),
+    # readers never block the writer, and a commit only syncs the WAL
+    # at checkpoints; a power loss can drop the last commits but not
+    # corrupt the database
+    "production": SQLiteProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64 * 1024,
+        busy_timeout=5000,
+        pool_size=16,
+        max_overflow=16,
+    ),
+}
+
+
+def get_profile(profile: SQLiteProfile | str) -> SQLiteProfile:
+    if isinstance(profile, SQLiteProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile: {profile}")
+
+
+def create_sqlite_engine(
+    database: str, profile: SQLiteProfile | str = "default", **kwargs
+) -> Engine:
+    """Create an engine for a SQLite file that applies `profile` on connect"""
+    profile = get_profile(profile)
+    if database != ":memory:":
+        kwargs = {**profile.pool_options(), **kwargs}
+    engine = create_engine("sqlite:///" + database, **kwargs)
+    _apply_pragmas(engine, profile)
+    return engine
+
+
+def create_async_sqlite_engine(
+    database: str, profile: SQLiteProfile | str = "default", **kwargs
+) -> "AsyncEngine":
+    """create_sqlite_engine for the aiosqlite driver"""
+    # imported here so the sync app does not load the asyncio extension
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    profile = get_profile(profile)
+    if database != ":memory:" and profile.pool_options():
+        kwargs = {
+            "poolclass": AsyncAdaptedQueuePool,
+            **profile.pool_options(),
+            **kwargs,
+        }
+    engine = create_async_engine("sqlite+aiosqlite:///" + database, **kwargs)
+    _apply_pragmas(engine.sync_engine, profile)
+    return engine
+
+
+class ReplicaRouter:
+    """Picks the engine for each session: the primary or a read replica
+
+    Writes always go to the primary. Reads are spread round-robin over
+    the replicas, or go to the primary when there are none. Replicas may
+    lag, so a client that wrote within the last `read_your_writes`
+    seconds has its reads sent to the primary too."""
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: typing.Sequence[Engine] = (),
+        read_your_writes: float = 0.0,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.read_your_writes = read_your_writes
+        self.clock = clock
+        self._next_replica = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def write_engine(self) -> Engine:
+        return self.primary
+
+    def read_engine(self, last_write: float | None = None) -> Engine:
+        """Return the engine for a read by a client that last wrote at
+        `last_write`, a timestamp from this router's clock"""
+        if not self.replicas or self.is_recent(last_write):
+            return self.primary
+        with self._lock:
+            return next(self._next_replica)
+
+    def is_recent(self, last_write: float | None) -> bool:
+        return (
+            last_write is not None and self.clock() - last_write < self.read_your_writes
+        )
+
+    def dispose(self) -> None:
+        for db_engine in (self.primary, *self.replicas):
+            db_engine.dispose()
+
+
+def _apply_pragmas(engine: Engine, profile: SQLiteProfile) -> None:
+    pragmas = profile.pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: typing.Any, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
@@ -0,0 +1,165 @@
+"""Caching of rendered HTML fragments
+
+Fragments are keyed by what they were rendered from, including the
+version of the data (see slidow.adapters.versioning), so a write makes
+new keys rather than invalidating old ones; stale fragments are never
+served and age out of the bounded caches.
+"""
+
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+import typing
+
+FragmentKey = tuple[typing.Hashable, ...]
+
+
+class FileFragmentStore:
+    """Fragments in a directory shared by every worker process
+
+    Files are written to a temporary name and renamed into place, so
+    readers never see a partial fragment. Every `prune_every` writes,
+    the oldest files are removed until the directory holds at most
+    `max_bytes`."""
+
+    def __init__(
+        self, directory: str, max_bytes: int = 64 << 20, prune_every: int = 100
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: FragmentKey) -> str | None:
+        try:
+            with open(self._path(key), encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: FragmentKey, fragment: str) -> None:
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(fragment)
+        os.replace(temporary, self._path(key))
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".html"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".html"):
+                os.remove(entry.path)
+
+    def _path(self, key: FragmentKey) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, digest + ".html")
+
+
+class FragmentCache:
+    """A least recently used cache of fragments, bounded in bytes
+
+    With a `store`, misses are looked up there before rendering and
+    rendered fragments are written to it, so worker processes share
+    what any of them rendered."""
+
+    def __init__(
+        self, max_bytes: int = 8 << 20, store: FileFragmentStore | None = None
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.store = store
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: collections.OrderedDict[FragmentKey, str] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Characters held in memory, roughly bytes for ASCII markup"""
+        return self._size
+
+    def get_or_render(self, key: FragmentKey, render: typing.Callable[[], str]) -> str:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+        if self.store is not None and (fragment := self.store.get(key)) is not None:
+            with self._lock:
+                self.shared_hits += 1
+            self._put(key, fragment)
+            return fragment
+        with self._lock:
+            self.misses += 1
+        fragment = render()
+        if self.store is not None:
+            self.store.put(key, fragment)
+        self._put(key, fragment)
+        return fragment
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.shared_hits + self.misses
+        return (self.hits + self.shared_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "size": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
+
+    def _put(self, key: FragmentKey, fragment: str) -> None:
+        if len(fragment) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = fragment
+            self._size += len(fragment)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
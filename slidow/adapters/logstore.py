@@ -0,0 +1,313 @@
+"""A persistent key-value store for the KeyVal repositories
+
+LogStore keeps tables of pickled values in a single append-only log
+file. Every write appends a record; opening the file replays the record
+headers to rebuild an in-memory index of where each key's latest value
+lives, without unpickling any value. Values are read from the file when
+they are accessed, so iterating over a table never holds it in memory.
+
+Overwritten and deleted records stay in the log as garbage until the
+store is compacted, which rewrites the live records into a new file.
+This happens on its own once garbage makes up `compact_ratio` of a log
+larger than `compact_min_bytes`.
+
+Values are pickled, dataclasses by their fields alone, so that models
+are stored without any ORM state attached to them. The log is unpickled
+on access, so it must only ever be written by slidow itself.
+"""
+
+import collections.abc
+import dataclasses
+import io
+import os
+import pickle
+import struct
+import threading
+import typing
+import zlib
+
+# metadata length, value length, crc32 of metadata and value
+_HEADER = struct.Struct("<III")
+_SET, _DELETE = "set", "del"
+
+
+class _Location(typing.NamedTuple):
+    offset: int  # of the pickled value
+    length: int  # of the pickled value
+    record_length: int
+
+
+class LogTable(collections.abc.MutableMapping):
+    """One table of a LogStore, used as a dict
+
+    Values are stored when they are set: changing a value read back
+    does not change the store until it is set again.
+
+    Secondary indexes map a function of each value to the keys with
+    that result, and are kept up to date as values are set."""
+
+    def __init__(self, store: "LogStore", name: str) -> None:
+        self.store = store
+        self.name = name
+        self._locations: dict[typing.Hashable, _Location] = {}
+        self._index_functions: dict[str, typing.Callable[[typing.Any], typing.Any]] = {}
+        self._indexes: dict[str, dict[typing.Any, set]] = {}
+        self._indexed: dict[str, dict[typing.Hashable, typing.Any]] = {}
+
+    def __getitem__(self, key: typing.Hashable) -> typing.Any:
+        return self.store._read(self, key)
+
+    def __setitem__(self, key: typing.Hashable, value: typing.Any) -> None:
+        self.store._write(self, _SET, key, value)
+
+    def __delitem__(self, key: typing.Hashable) -> None:
+        if key not in self._locations:
+            raise KeyError(key)
+        self.store._write(self, _DELETE, key, None)
+
+    def __iter__(self) -> typing.Iterator[typing.Hashable]:
+        return iter(list(self._locations))
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._locations
+
+    def add_index(
+        self, name: str, function: typing.Callable[[typing.Any], typing.Any]
+    ) -> None:
+        """Index the table by `function(value)`, reading every value once"""
+        with self.store._lock:
+            self._index_functions[name] = function
+            self._indexes[name] = {}
+            self._indexed[name] = {}
+            for key in self._locations:
+                self._index(name, key, self[key])
+
+    def has_index(self, name: str) -> bool:
+        return name in self._index_functions
+
+    def lookup(self, name: str, value: typing.Any) -> typing.Iterator[typing.Any]:
+        """Yield the values whose index `name` has the given value"""
+        for key in list(self._indexes[name].get(value, ())):
+            yield self[key]
+
+    def _index(self, name: str, key: typing.Hashable, value: typing.Any) -> None:
+        indexed = self._index_functions[name](value)
+        self._indexes[name].setdefault(indexed, set()).add(key)
+        self._indexed[name][key] = indexed
+
+    def _unindex(self, key: typing.Hashable) -> None:
+        for name in self._indexes:
+            if key in self._indexed[name]:
+                indexed = self._indexed[name].pop(key)
+                keys = self._indexes[name][indexed]
+                keys.discard(key)
+                if not keys:
+                    del self._indexes[name][indexed]
+
+    def _apply(
+        self,
+        op: str,
+        key: typing.Hashable,
+        location: _Location | None,
+        value: typing.Any = None,
+    ) -> int:
+        """Point `key` at a new record, returning the bytes made garbage"""
+        previous = self._locations.pop(key, None)
+        garbage = previous.record_length if previous else 0
+        if self._indexes:
+            self._unindex(key)
+        if op == _SET and location is not None:
+            self._locations[key] = location
+            for name in self._indexes:
+                self._index(name, key, value)
+        elif location is not None:
+            garbage += location.record_length
+        return garbage
+
+
+class LogStore(collections.abc.MutableMapping):
+    """Tables persisted in an append-only log file, used as a dict of dicts
+
+    Setting a table to a mapping creates it and stores the mapping's
+    items. With `sync`, every write is flushed to disk before it
+    returns; otherwise only `sync()` and compaction flush.
+
+    Tables can be read and written from several threads at once."""
+
+    def __init__(
+        self,
+        path: str,
+        sync: bool = False,
+        compact_ratio: float = 0.5,
+        compact_min_bytes: int = 1 << 20,
+    ) -> None:
+        self.path = path
+        self.sync_writes = sync
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.compactions = 0
+        self._tables: dict[str, LogTable] = {}
+        self._lock = threading.RLock()
+        self._size = 0
+        self._garbage = 0
+        self._replay()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def garbage(self) -> int:
+        return self._garbage
+
+    def __getitem__(self, name: str) -> LogTable:
+        return self._tables[name]
+
+    def __setitem__(self, name: str, mapping: typing.Mapping) -> None:
+        with self._lock:
+            table = self._table(name)
+            for key in list(table):
+                del table[key]
+            table.update(mapping)
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            table = self._tables[name]
+            for key in list(table):
+                del table[key]
+            del self._tables[name]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(list(self._tables))
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def sync(self) -> None:
+        os.fsync(self._fd)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def compact(self) -> None:
+        """Rewrite the log with only the latest value of each key"""
+        with self._lock:
+            compact_path = self.path + ".compact"
+            relocated: list[tuple[LogTable, typing.Hashable, _Location]] = []
+            with open(compact_path, "wb") as log:
+                offset = 0
+                for table in self._tables.values():
+                    for key, location in table._locations.items():
+                        data = self._read_bytes(location)
+                        record = _record(_SET, table.name, key, data)
+                        log.write(record)
+                        value_offset = offset + len(record) - len(data)
+                        relocated.append(
+                            (
+                                table,
+                                key,
+                                _Location(value_offset, len(data), len(record)),
+                            )
+                        )
+                        offset += len(record)
+                log.flush()
+                os.fsync(log.fileno())
+            os.replace(compact_path, self.path)
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            for table, key, location in relocated:
+                table._locations[key] = location
+            self._size, self._garbage = offset, 0
+            self.compactions += 1
+
+    def _table(self, name: str) -> LogTable:
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = LogTable(self, name)
+        return table
+
+    def _write(
+        self, table: LogTable, op: str, key: typing.Hashable, value: typing.Any
+    ) -> None:
+        data = _dumps(value)
+        record = _record(op, table.name, key, data)
+        with self._lock:
+            offset = self._size
+            os.write(self._fd, record)
+            if self.sync_writes:
+                os.fsync(self._fd)
+            self._size += len(record)
+            location = _Location(
+                offset + len(record) - len(data), len(data), len(record)
+            )
+            self._garbage += table._apply(op, key, location, value)
+            if (
+                self._size >= self.compact_min_bytes
+                and self._garbage >= self._size * self.compact_ratio
+            ):
+                self.compact()
+
+    def _read(self, table: LogTable, key: typing.Hashable) -> typing.Any:
+        # compaction moves every record and swaps the file descriptor
+        with self._lock:
+            data = self._read_bytes(table._locations[key])
+        return pickle.loads(data)
+
+    def _read_bytes(self, location: _Location) -> bytes:
+        return os.pread(self._fd, location.length, location.offset)
+
+    def _replay(self) -> None:
+        """Rebuild the index from the log, dropping a torn final record"""
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, "r+b") as log:
+            while header := log.read(_HEADER.size):
+                if len(header) < _HEADER.size:
+                    break
+                meta_length, value_length, crc = _HEADER.unpack(header)
+                body = log.read(meta_length + value_length)
+                if len(body) < meta_length + value_length or zlib.crc32(body) != crc:
+                    break
+                op, name, key = pickle.loads(body[:meta_length])
+                record_length = _HEADER.size + len(body)
+                location = _Location(
+                    offset + _HEADER.size + meta_length, value_length, record_length
+                )
+                self._garbage += self._table(name)._apply(op, key, location)
+                offset += record_length
+            log.truncate(offset)
+        self._size = offset
+
+
+def _record(op: str, table: str, key: typing.Hashable, data: bytes) -> bytes:
+    meta = pickle.dumps((op, table, key), protocol=pickle.HIGHEST_PROTOCOL)
+    body = meta + data
+    return _HEADER.pack(len(meta), len(data), zlib.crc32(body)) + body
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj: typing.Any) -> typing.Any:
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            values = {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+            return _dataclass, (type(obj), values)
+        if isinstance(obj, list):
+            # an instrumented collection of a mapped model
+            return list, (list(obj),)
+        return NotImplemented
+
+
+def _dataclass(cls: type, values: dict) -> typing.Any:
+    return cls(**values)
+
+
+def _dumps(value: typing.Any) -> bytes:
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    return buffer.getvalue()
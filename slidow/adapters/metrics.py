@@ -0,0 +1,246 @@
+"""Request, query and commit metrics in the Prometheus text format
+
+A RequestStats is made current for each request with `start_request`.
+Engines instrumented with `instrument_engine` add each statement's time
+to the current request, and connections made by `CountingConnection`
+add the rows fetched. `finish_request` folds the request's stats into
+the registry's histograms and counters, under one lock, so the cost per
+statement is a few attribute updates.
+"""
+
+import bisect
+import contextvars
+import dataclasses
+import sqlite3
+import threading
+import time
+import typing
+
+from sqlalchemy import Engine, event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED = "unmatched"
+
+
+@dataclasses.dataclass
+class RequestStats:
+    endpoint: str = UNMATCHED
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    queries: int = 0
+    rows: int = 0
+    db_seconds: float = 0.0
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar(
+    "slidow_request_stats", default=None
+)
+
+
+class Histogram:
+    """Cumulative bucket counts, as Prometheus histograms report them"""
+
+    def __init__(self, buckets: typing.Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> typing.Iterator[tuple[str, int]]:
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            yield str(bound), total
+
+
+class CountingCursor(sqlite3.Cursor):
+    """Adds the rows fetched to the current request's stats"""
+
+    def fetchone(self) -> typing.Any:
+        row = super().fetchone()
+        if row is not None and (stats := _current.get()) is not None:
+            stats.rows += 1
+        return row
+
+    def fetchmany(self, *args: typing.Any) -> list:
+        rows = super().fetchmany(*args)
+        if (stats := _current.get()) is not None:
+            stats.rows += len(rows)
+        return rows
+
+    def fetchall(self) -> list:
+        rows = super().fetchall()
+        if (stats := _current.get()) is not None:
+            stats.rows += len(rows)
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    """A sqlite3 connection whose cursors count rows, see engine_options"""
+
+    def cursor(self, factory: typing.Any = CountingCursor) -> typing.Any:
+        return super().cursor(factory)
+
+
+def engine_options() -> dict:
+    """Options for create_sqlite_engine to count the rows fetched"""
+    return {"connect_args": {"factory": CountingConnection}}
+
+
+def start_request(endpoint: str | None) -> RequestStats:
+    stats = RequestStats(endpoint or UNMATCHED)
+    _current.set(stats)
+    return stats
+
+
+def current_request() -> RequestStats | None:
+    return _current.get()
+
+
+class Metrics:
+    """Per-endpoint request and database metrics of one app"""
+
+    def __init__(self) -> None:
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[str, Histogram] = {}
+        self.queries: dict[str, Histogram] = {}
+        self.db_seconds: dict[str, Histogram] = {}
+        self.rows: dict[str, int] = {}
+        self.commits: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def instrument_engine(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+        event.listen(engine, "handle_error", _on_error)
+
+    def instrument_sessions(self, session_factory: typing.Any) -> None:
+        """Time the commits of sessions from a sessionmaker or scoped_session"""
+        event.listen(session_factory, "before_commit", _before_commit)
+        event.listen(session_factory, "after_commit", self._after_commit)
+
+    def finish_request(self, stats: RequestStats, method: str, status: int) -> None:
+        _current.set(None)
+        elapsed = time.perf_counter() - stats.started
+        endpoint = stats.endpoint
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            _histogram(self.latency, endpoint, LATENCY_BUCKETS).observe(elapsed)
+            _histogram(self.queries, endpoint, QUERY_BUCKETS).observe(stats.queries)
+            _histogram(self.db_seconds, endpoint, LATENCY_BUCKETS).observe(
+                stats.db_seconds
+            )
+            self.rows[endpoint] = self.rows.get(endpoint, 0) + stats.rows
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        lines: list[str] = []
+        with self._lock:
+            lines += _header("slidow_requests_total", "counter", "Requests served")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                labels = f'endpoint="{endpoint}",method="{method}",status="{status}"'
+                lines.append(f"slidow_requests_total{{{labels}}} {count}")
+            _render_histograms(
+                lines,
+                "slidow_request_duration_seconds",
+                "Time to handle a request",
+                self.latency,
+            )
+            _render_histograms(
+                lines,
+                "slidow_request_queries",
+                "SQL statements executed per request",
+                self.queries,
+            )
+            _render_histograms(
+                lines,
+                "slidow_request_db_seconds",
+                "Time spent executing SQL per request",
+                self.db_seconds,
+            )
+            lines += _header(
+                "slidow_db_rows_fetched_total", "counter", "Rows fetched from SQLite"
+            )
+            for endpoint, rows in sorted(self.rows.items()):
+                lines.append(
+                    f'slidow_db_rows_fetched_total{{endpoint="{endpoint}"}} {rows}'
+                )
+            _render_histograms(
+                lines,
+                "slidow_commit_duration_seconds",
+                "Time to flush and commit a session",
+                self.commits,
+            )
+        return "\n".join(lines) + "\n"
+
+    def _after_commit(self, session: typing.Any) -> None:
+        started = session.info.pop("slidow_commit_started", None)
+        if started is None:
+            return
+        stats = _current.get()
+        endpoint = stats.endpoint if stats is not None else UNMATCHED
+        with self._lock:
+            _histogram(self.commits, endpoint, LATENCY_BUCKETS).observe(
+                time.perf_counter() - started
+            )
+
+
+def render_stats(prefix: str, stats: typing.Mapping[str, float]) -> str:
+    """A cache's stats() as gauges, e.g. slidow_fragment_cache_hits"""
+    lines = []
+    for name, value in stats.items():
+        lines += _header(f"{prefix}_{name}", "gauge", f"{prefix} {name}")
+        lines.append(f"{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("slidow_query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None and (started := conn.info.get("slidow_query_started")):
+        stats.db_seconds += time.perf_counter() - started.pop()
+        stats.queries += 1
+
+
+def _on_error(context: typing.Any) -> None:
+    if context.connection is not None:
+        started = context.connection.info.get("slidow_query_started")
+        if started:
+            started.pop()
+
+
+def _before_commit(session: typing.Any) -> None:
+    session.info["slidow_commit_started"] = time.perf_counter()
+
+
+def _histogram(
+    histograms: dict[str, Histogram], endpoint: str, buckets: typing.Sequence[float]
+) -> Histogram:
+    if endpoint not in histograms:
+        histograms[endpoint] = Histogram(buckets)
+    return histograms[endpoint]
+
+
+def _header(name: str, kind: str, description: str) -> list[str]:
+    return [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+
+
+def _render_histograms(
+    lines: list[str], name: str, description: str, histograms: dict[str, Histogram]
+) -> None:
+    lines += _header(name, "histogram", description)
+    for endpoint, histogram in sorted(histograms.items()):
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+        lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+        lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram.count}')
@@ -1,15 +1,27 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, Table, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Table,
+    Text,
+)
 from sqlalchemy.orm import registry, relationship
 
 from slidow import models
 
 mapper_registry = registry()
 
+# expunging an aggregate root detaches the whole aggregate with it
+AGGREGATE_CASCADE = "save-update, merge, expunge"
+
 events_table = Table(
     "event",
     mapper_registry.metadata,
     Column("id", Integer, primary_key=True),
-    Column("identifier", Text, nullable=False),
+    Column("identifier", Text, nullable=False, unique=True, index=True),
     Column("name", Text, nullable=False),
 )
 
@@ -17,7 +29,7 @@ quizzes_table = Table(
     "quiz",
     mapper_registry.metadata,
     Column("id", Integer, primary_key=True),
-    Column("identifier", Text, nullable=False),
+    Column("identifier", Text, nullable=False, unique=True, index=True),
     Column("title", Text, nullable=False),
 )
 
@@ -26,14 +38,15 @@ event_quiz_table = Table(
     mapper_registry.metadata,
     Column("id", Integer, primary_key=True),
     Column("event_id", ForeignKey("event.id"), nullable=False),
-    Column("quiz_id", ForeignKey("quiz.id"), nullable=False),
+    Column("quiz_id", ForeignKey("quiz.id"), nullable=False, index=True),
+    Index("ix_event_quiz_event_id_quiz_id", "event_id", "quiz_id", unique=True),
 )
 
 questions_table = Table(
     "question",
     mapper_registry.metadata,
     Column("id", Integer, primary_key=True),
-    Column("quiz_id", Integer, ForeignKey("quiz.id"), nullable=False),
+    Column("quiz_id", Integer, ForeignKey("quiz.id"), nullable=False, index=True),
     Column("text", Text, nullable=False),
 )
 
@@ -41,30 +54,107 @@ options_table = Table(
     "option",
     mapper_registry.metadata,
     Column("id", Integer, primary_key=True),
-    Column("question_id", Integer, ForeignKey("question.id"), nullable=False),
+    Column(
+        "question_id", Integer, ForeignKey("question.id"), nullable=False, index=True
+    ),
     Column("text", Text, nullable=False),
     Column("correct", Boolean, nullable=False),
 )
 
+responses_table = Table(
+    "response",
+    mapper_registry.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("participant", Text, nullable=False),
+    Column("quiz_identifier", Text, nullable=False),
+    Column("question_index", Integer, nullable=False),
+    Column("selected", Integer, nullable=False),
+    Column("answered_at", Float, nullable=False),
+    Index(
+        "ix_response_quiz_identifier_question_index_participant",
+        "quiz_identifier",
+        "question_index",
+        "participant",
+        unique=True,
+    ),
+)
+
+scores_table = Table(
+    "score",
+    mapper_registry.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("quiz_identifier", Text, nullable=False),
+    Column("participant", Text, nullable=False),
+    Column("points", Float, nullable=False),
+    Index(
+        "ix_score_quiz_identifier_participant",
+        "quiz_identifier",
+        "participant",
+        unique=True,
+    ),
+)
+
+# one row per kind of data, see slidow.adapters.versioning
+data_versions_table = Table(
+    "data_version",
+    mapper_registry.metadata,
+    Column("name", Text, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("changed_at", Float, nullable=False),
+)
+
 mapper_registry.map_imperatively(
     models.Event,
     events_table,
-    properties={"quizzes": relationship(models.Quiz, secondary=event_quiz_table)},
+    properties={
+        "quizzes": relationship(
+            models.Quiz, secondary=event_quiz_table, cascade=AGGREGATE_CASCADE
+        )
+    },
 )
 
 mapper_registry.map_imperatively(
     models.Quiz,
     quizzes_table,
-    properties={"questions": relationship(models.Question, backref="quiz")},
+    properties={
+        "questions": relationship(
+            models.Question,
+            backref="quiz",
+            order_by=questions_table.c.id,
+            cascade=AGGREGATE_CASCADE,
+        )
+    },
 )
 
 mapper_registry.map_imperatively(
     models.Question,
     questions_table,
-    properties={"options": relationship(models.Option, backref="question")},
+    properties={
+        "options": relationship(
+            models.Option,
+            backref="question",
+            order_by=options_table.c.id,
+            cascade=AGGREGATE_CASCADE,
+        )
+    },
 )
 
 mapper_registry.map_imperatively(
     models.Option,
     options_table,
 )
+
+mapper_registry.map_imperatively(
+    models.Response,
+    responses_table,
+)
+
+
+def create_indexes(engine) -> None:
+    """Create any of the schema's indexes missing from an existing database
+
+    `create_all` skips tables that already exist, so databases created
+    before an index was declared need it added separately."""
+    for table in mapper_registry.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
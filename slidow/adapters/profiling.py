@@ -0,0 +1,174 @@
+"""Recording the SQL a block of code runs, to catch N+1 and slow queries
+
+A QueryProfiler listens to the engines it instruments, and adds every
+statement executed inside `record()` to the QueryLog it yields. A log
+flags statements run again and again with different parameters, the
+mark of a lazy load inside a loop, and statements slower than a
+threshold. `expect()` fails a test that runs more statements than it
+allows:
+
+    with profiler.expect(max_queries=3):
+        services.grade_question("quiz1", 0, uow)
+"""
+
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import time
+import typing
+
+from sqlalchemy import Engine, event
+
+SLOW_SECONDS = 0.1
+REPEAT_THRESHOLD = 3
+
+
+class QueryBudgetError(AssertionError):
+    def __init__(self, log: "QueryLog", max_queries: int) -> None:
+        self.msg = (
+            f"{len(log)} queries executed, at most {max_queries} expected\n"
+            + log.report()
+        )
+        super().__init__(self.msg)
+
+
+@dataclasses.dataclass
+class Query:
+    statement: str
+    parameters: typing.Any
+    seconds: float
+
+
+class QueryLog:
+    """The statements executed while a QueryProfiler was recording"""
+
+    def __init__(
+        self,
+        slow_seconds: float = SLOW_SECONDS,
+        repeat_threshold: int = REPEAT_THRESHOLD,
+    ) -> None:
+        self.slow_seconds = slow_seconds
+        self.repeat_threshold = repeat_threshold
+        self.queries: list[Query] = []
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def selects(self) -> list[Query]:
+        return [q for q in self.queries if q.statement.lstrip().startswith("SELECT")]
+
+    def repeated(self) -> dict[str, int]:
+        """Statements run with `repeat_threshold` or more different parameters"""
+        parameters = collections.defaultdict(set)
+        for query in self.queries:
+            parameters[query.statement].add(repr(query.parameters))
+        return {
+            statement: len(seen)
+            for statement, seen in parameters.items()
+            if len(seen) >= self.repeat_threshold
+        }
+
+    def slow(self) -> list[Query]:
+        return [q for q in self.queries if q.seconds >= self.slow_seconds]
+
+    def problems(self) -> list[str]:
+        problems = [
+            f"possible N+1: {count} runs of {_shorten(statement)}"
+            for statement, count in self.repeated().items()
+        ]
+        problems += [
+            f"slow query: {query.seconds * 1e3:.1f} ms for {_shorten(query.statement)}"
+            for query in self.slow()
+        ]
+        return problems
+
+    def report(self) -> str:
+        lines = [
+            f"{q.seconds * 1e3:8.2f} ms  {_shorten(q.statement)}" for q in self.queries
+        ]
+        return "\n".join(lines + self.problems())
+
+
+_recording: contextvars.ContextVar[tuple[QueryLog, ...]] = contextvars.ContextVar(
+    "slidow_query_logs", default=()
+)
+
+
+class QueryProfiler:
+    """Records the statements of instrumented engines into QueryLogs
+
+    Recording follows the context it started in, so statements run by
+    other threads are not mixed in."""
+
+    def __init__(
+        self,
+        slow_seconds: float = SLOW_SECONDS,
+        repeat_threshold: int = REPEAT_THRESHOLD,
+    ) -> None:
+        self.slow_seconds = slow_seconds
+        self.repeat_threshold = repeat_threshold
+
+    def instrument(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+        event.listen(engine, "handle_error", _on_error)
+
+    def uninstrument(self, engine: Engine) -> None:
+        event.remove(engine, "before_cursor_execute", _before_execute)
+        event.remove(engine, "after_cursor_execute", _after_execute)
+        event.remove(engine, "handle_error", _on_error)
+
+    def start(self) -> QueryLog:
+        log = QueryLog(self.slow_seconds, self.repeat_threshold)
+        _recording.set((*_recording.get(), log))
+        return log
+
+    def stop(self, log: QueryLog) -> None:
+        _recording.set(tuple(other for other in _recording.get() if other is not log))
+
+    @contextlib.contextmanager
+    def record(self) -> typing.Iterator[QueryLog]:
+        log = self.start()
+        try:
+            yield log
+        finally:
+            self.stop(log)
+
+    @contextlib.contextmanager
+    def expect(
+        self, max_queries: int, allow_repeats: bool = False
+    ) -> typing.Iterator[QueryLog]:
+        """Fail if the block runs more than `max_queries` statements, or,
+        unless `allow_repeats`, a statement that looks like an N+1"""
+        with self.record() as log:
+            yield log
+        if len(log) > max_queries:
+            raise QueryBudgetError(log, max_queries)
+        if not allow_repeats and log.repeated():
+            raise AssertionError("\n".join(["N+1 queries", log.report()]))
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _recording.get():
+        conn.info.setdefault("slidow_profile_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _recording.get()
+    if logs and (started := conn.info.get("slidow_profile_started")):
+        query = Query(statement, parameters, time.perf_counter() - started.pop())
+        for log in logs:
+            log.queries.append(query)
+
+
+def _on_error(context: typing.Any) -> None:
+    if context.connection is not None:
+        started = context.connection.info.get("slidow_profile_started")
+        if started:
+            started.pop()
+
+
+def _shorten(statement: str, length: int = 120) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= length else statement[: length - 3] + "..."
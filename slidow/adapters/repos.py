@@ -1,35 +1,118 @@
 """Aggregate repositories"""
 
+import dataclasses
+import heapq
 import typing
 
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Mapper, joinedload, selectinload
+
 from slidow import models
+from slidow.adapters import orm, versioning
+
+LoadProfile = typing.Literal["lazy", "full", "joined"]
 
 
 class AbstractRepo(typing.Protocol):
     def add(self, model: typing.Any) -> None: ...
 
-    def get(self, id_: typing.Any) -> typing.Any: ...
+    def add_all(self, models: typing.Iterable[typing.Any]) -> None: ...
+
+    def get(self, id_: typing.Any, load: LoadProfile = "lazy") -> typing.Any: ...
 
     def list(self) -> typing.Any: ...
 
+    def page(self, limit: int, after: typing.Any = None) -> typing.Any: ...
+
+    def stream(self, batch_size: int = 1000) -> typing.Any: ...
+
+    def summaries(self, limit: int, after: typing.Any = None) -> typing.Any: ...
+
+
+class AbstractQuizRepo(AbstractRepo, typing.Protocol):
+    def stream_dicts(self, batch_size: int = 1000) -> typing.Iterator[dict]: ...
+
+
+class AbstractResponseRepo(typing.Protocol):
+    def add_all(self, responses: typing.Iterable[models.Response]) -> None: ...
+
+    def for_question(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[models.Response]: ...
+
+    def selections(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[tuple[str, int]]: ...
+
+
+class AbstractScoreRepo(typing.Protocol):
+    def replace(
+        self, quiz_identifier: str, scores: typing.Iterable[tuple[str, float]]
+    ) -> None: ...
+
+    def for_quiz(self, quiz_identifier: str) -> typing.Sequence[tuple[str, float]]: ...
+
 
 class KeyValRepo:
+    """Stores aggregates in one table of a key-value store
+
+    The store maps table names to tables, and may be a dict of dicts or
+    a persistent slidow.adapters.logstore.LogStore. A LogStore hands out
+    copies, so aggregates fetched with `get` are kept and written back
+    by `flush`, which a unit of work calls on commit."""
+
     table_name: str
 
-    def __init__(self, kv_store: dict) -> None:
+    def __init__(self, kv_store: typing.MutableMapping) -> None:
         if not self.table_name in kv_store:
             kv_store[self.table_name] = {}
         self.kv_store = kv_store
+        self.loaded: dict = {}
+
+    def flush(self) -> None:
+        """Write back the aggregates fetched since the last flush"""
+        table = self.kv_store[self.table_name]
+        for key, val in self.loaded.items():
+            table[key] = val
+        self.loaded.clear()
 
     def _add(self, key, val):
+        self.loaded.pop(key, None)
         self.kv_store[self.table_name][key] = val
 
     def _get(self, key):
-        return self.kv_store[self.table_name][key]
+        table = self.kv_store[self.table_name]
+        if isinstance(table, dict):
+            return table[key]
+        if key not in self.loaded:
+            self.loaded[key] = table[key]
+        return self.loaded[key]
 
     def _list(self):
+        # a live view; a LogStore reads each value as it is iterated over
+        return self.kv_store[self.table_name].values()
+
+    def _page(self, limit, after=None):
         table = self.kv_store[self.table_name]
-        return [table[key] for key in table]
+        keys = heapq.nsmallest(
+            limit, (key for key in table if after is None or key > after)
+        )
+        return [table[key] for key in keys]
+
+    def _stream(self):
+        yield from self.kv_store[self.table_name].values()
+
+    def _lookup(self, index: str, function, value) -> typing.Iterable:
+        """Yield the values for which `function` returns `value`
+
+        Uses a secondary index of the table if it supports them."""
+        table = self.kv_store[self.table_name]
+        if not hasattr(table, "add_index"):
+            return (val for val in table.values() if function(val) == value)
+        if not table.has_index(index):
+            table.add_index(index, function)
+        return table.lookup(index, value)
 
 
 class EventKeyValRepo(KeyValRepo, AbstractRepo):
@@ -38,25 +121,104 @@ class EventKeyValRepo(KeyValRepo, AbstractRepo):
     def add(self, event: models.Event) -> None:
         self._add(event.identifier, event)
 
-    def get(self, event_id: str) -> models.Event:
+    def add_all(self, events: typing.Iterable[models.Event]) -> None:
+        for event in events:
+            self._add(event.identifier, event)
+
+    def get(self, event_id: str, load: LoadProfile = "lazy") -> models.Event:
         return self._get(event_id)
 
     def list(self) -> typing.Iterable[models.Event]:
         return self._list()
 
+    def page(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[models.Event]:
+        return self._page(limit, after)
+
+    def stream(self, batch_size: int = 1000) -> typing.Iterable[models.Event]:
+        return self._stream()
 
-class QuizKeyValRepo(KeyValRepo, AbstractRepo):
+    def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        return [(m.identifier, m.name) for m in self._page(limit, after)]
+
+
+class QuizKeyValRepo(KeyValRepo, AbstractQuizRepo):
     table_name: str = "quizzes"
 
     def add(self, quiz: models.Quiz) -> None:
         self._add(quiz.identifier, quiz)
 
-    def get(self, quiz_id: str) -> models.Quiz:
+    def add_all(self, quizzes: typing.Iterable[models.Quiz]) -> None:
+        for quiz in quizzes:
+            self._add(quiz.identifier, quiz)
+
+    def get(self, quiz_id: str, load: LoadProfile = "lazy") -> models.Quiz:
         return self._get(quiz_id)
 
     def list(self) -> typing.Iterable[models.Quiz]:
         return self._list()
 
+    def page(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[models.Quiz]:
+        return self._page(limit, after)
+
+    def stream(self, batch_size: int = 1000) -> typing.Iterable[models.Quiz]:
+        return self._stream()
+
+    def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        return [(m.identifier, m.title) for m in self._page(limit, after)]
+
+    def stream_dicts(self, batch_size: int = 1000) -> typing.Iterator[dict]:
+        for quiz in self._stream():
+            yield dataclasses.asdict(quiz)
+
+
+class ResponseKeyValRepo(KeyValRepo, AbstractResponseRepo):
+    table_name: str = "responses"
+
+    def add_all(self, responses: typing.Iterable[models.Response]) -> None:
+        """Add responses, keeping a participant's first to each question"""
+        table = self.kv_store[self.table_name]
+        for r in responses:
+            key = (r.quiz_identifier, r.question_index, r.participant)
+            if key not in table:
+                self._add(key, r)
+
+    def for_question(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[models.Response]:
+        return list(
+            self._lookup(
+                "question", _response_question, (quiz_identifier, question_index)
+            )
+        )
+
+    def selections(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[tuple[str, int]]:
+        return [
+            (response.participant, response.selected)
+            for response in self.for_question(quiz_identifier, question_index)
+        ]
+
+
+class ScoreKeyValRepo(KeyValRepo, AbstractScoreRepo):
+    table_name: str = "scores"
+
+    def replace(
+        self, quiz_identifier: str, scores: typing.Iterable[tuple[str, float]]
+    ) -> None:
+        self._add(quiz_identifier, list(scores))
+
+    def for_quiz(self, quiz_identifier: str) -> typing.Sequence[tuple[str, float]]:
+        return self.kv_store[self.table_name].get(quiz_identifier, [])
+
 
 class EventSQLAlchemyRepo(AbstractRepo):
 
@@ -65,24 +227,507 @@ class EventSQLAlchemyRepo(AbstractRepo):
 
     def add(self, event: models.Event) -> None:
         self.session.add(event)
-
-    def get(self, identifier: str) -> models.Event:
-        return self.session.query(models.Event).filter_by(identifier=identifier).one()
+        _mark_events_changed(self.session, [event])
+
+    def add_all(self, events: typing.Iterable[models.Event]) -> None:
+        """Insert events with a single executemany
+
+        The rows are written directly, so the events are not attached
+        to the session. Events that already have quizzes are added
+        through the session instead to keep their associations."""
+        rows = []
+        events = list(events)
+        for event in events:
+            if event.quizzes:
+                self.session.add(event)
+            else:
+                rows.append({"identifier": event.identifier, "name": event.name})
+        if rows:
+            self.session.execute(insert(orm.events_table), rows)
+        _mark_events_changed(self.session, events)
+
+    def get(self, identifier: str, load: LoadProfile = "lazy") -> models.Event:
+        return (
+            self.session.query(models.Event)
+            .options(*_load_options(models.Event, load))
+            .filter_by(identifier=identifier)
+            .one()
+        )
 
     def list(self) -> typing.Iterable[models.Event]:
         return self.session.query(models.Event).all()
 
+    def page(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[models.Event]:
+        return self.session.scalars(_page_statement(models.Event, limit, after)).all()
+
+    def stream(self, batch_size: int = 1000) -> typing.Iterable[models.Event]:
+        return self.session.query(models.Event).yield_per(batch_size)
+
+    def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        table = orm.events_table
+        query = _summaries_statement(table.c.identifier, table.c.name, limit, after)
+        return self.session.execute(query).tuples().all()
 
-class QuizSQLAlchemyRepo(AbstractRepo):
+
+class QuizSQLAlchemyRepo(AbstractQuizRepo):
 
     def __init__(self, session) -> None:
         self.session = session
 
     def add(self, quiz: models.Quiz) -> None:
         self.session.add(quiz)
-
-    def get(self, identifier: str) -> models.Quiz:
-        return self.session.query(models.Quiz).filter_by(identifier=identifier).one()
+        versioning.mark_changed(self.session, "quizzes")
+
+    def add_all(self, quizzes: typing.Iterable[models.Quiz]) -> None:
+        """Insert whole quiz trees with one bulk insert per table
+
+        Quiz and question primary keys come back from batched
+        INSERT .. RETURNING statements in parameter order and are used
+        to fill in the children's foreign keys. The quizzes are not
+        attached to the session."""
+        quizzes = list(quizzes)
+        if not quizzes:
+            return
+        versioning.mark_changed(self.session, "quizzes")
+        quiz_ids = self.session.scalars(
+            _insert_returning_ids(orm.quizzes_table), _quiz_rows(quizzes)
+        ).all()
+        questions = _quiz_questions(quiz_ids, quizzes)
+        if not questions:
+            return
+        question_ids = self.session.scalars(
+            _insert_returning_ids(orm.questions_table), _question_rows(questions)
+        ).all()
+        options = _option_rows(question_ids, questions)
+        if options:
+            self.session.execute(insert(orm.options_table), options)
+
+    def get(self, identifier: str, load: LoadProfile = "lazy") -> models.Quiz:
+        return (
+            self.session.query(models.Quiz)
+            .options(*_load_options(models.Quiz, load))
+            .filter_by(identifier=identifier)
+            .one()
+        )
 
     def list(self) -> typing.Iterable[models.Quiz]:
         return self.session.query(models.Quiz).all()
+
+    def page(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[models.Quiz]:
+        return self.session.scalars(_page_statement(models.Quiz, limit, after)).all()
+
+    def stream(self, batch_size: int = 1000) -> typing.Iterable[models.Quiz]:
+        return self.session.query(models.Quiz).yield_per(batch_size)
+
+    def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        table = orm.quizzes_table
+        query = _summaries_statement(table.c.identifier, table.c.title, limit, after)
+        return self.session.execute(query).tuples().all()
+
+    def stream_dicts(self, batch_size: int = 1000) -> typing.Iterator[dict]:
+        """Stream quizzes as plain dicts without building any entities
+
+        Quiz, question and option rows are read as one ordered outer
+        join in batches and grouped back into one dict per quiz."""
+        quiz, question, option = (
+            orm.quizzes_table,
+            orm.questions_table,
+            orm.options_table,
+        )
+        query = (
+            select(
+                quiz.c.id.label("quiz_id"),
+                quiz.c.identifier,
+                quiz.c.title,
+                question.c.id.label("question_id"),
+                question.c.text.label("question_text"),
+                option.c.text.label("option_text"),
+                option.c.correct,
+            )
+            .outerjoin(question, question.c.quiz_id == quiz.c.id)
+            .outerjoin(option, option.c.question_id == question.c.id)
+            .order_by(quiz.c.id, question.c.id, option.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        current: dict | None = None
+        quiz_id: int | None = None
+        question_id: int | None = None
+        for row in self.session.execute(query):
+            if current is None or row.quiz_id != quiz_id:
+                if current is not None:
+                    yield current
+                quiz_id, question_id = row.quiz_id, None
+                current = {
+                    "identifier": row.identifier,
+                    "title": row.title,
+                    "questions": [],
+                }
+            if row.question_id is None:
+                continue
+            if row.question_id != question_id:
+                question_id = row.question_id
+                options: list[dict] = []
+                current["questions"].append(
+                    {"text": row.question_text, "options": options}
+                )
+            if row.option_text is not None:
+                options.append({"text": row.option_text, "correct": row.correct})
+        if current is not None:
+            yield current
+
+
+class ResponseSQLAlchemyRepo(AbstractResponseRepo):
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def add_all(self, responses: typing.Iterable[models.Response]) -> None:
+        """Insert responses with a single executemany
+
+        A participant's first response to a question is kept, later
+        ones are skipped."""
+        rows = [_response_row(r) for r in responses]
+        if rows:
+            self.session.execute(_insert_responses_statement(), rows)
+            versioning.mark_changed(self.session, "responses")
+
+    def for_question(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[models.Response]:
+        return (
+            self.session.query(models.Response)
+            .filter_by(quiz_identifier=quiz_identifier, question_index=question_index)
+            .all()
+        )
+
+    def selections(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[tuple[str, int]]:
+        """Return (participant, selected) rows without building entities"""
+        query = _selections_statement(quiz_identifier, question_index)
+        return self.session.execute(query).tuples().all()
+
+
+class ScoreSQLAlchemyRepo(AbstractScoreRepo):
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def replace(
+        self, quiz_identifier: str, scores: typing.Iterable[tuple[str, float]]
+    ) -> None:
+        """Replace a quiz's stored scores with a single executemany"""
+        table = orm.scores_table
+        versioning.mark_changed(self.session, "scores")
+        self.session.execute(
+            delete(table).where(table.c.quiz_identifier == quiz_identifier)
+        )
+        rows = [
+            {"quiz_identifier": quiz_identifier, "participant": p, "points": points}
+            for p, points in scores
+        ]
+        if rows:
+            self.session.execute(insert(table), rows)
+
+    def for_quiz(self, quiz_identifier: str) -> typing.Sequence[tuple[str, float]]:
+        table = orm.scores_table
+        query = select(table.c.participant, table.c.points).where(
+            table.c.quiz_identifier == quiz_identifier
+        )
+        return self.session.execute(query).tuples().all()
+
+
+class AbstractAsyncRepo(typing.Protocol):
+    """The AbstractRepo contract for repos backed by an AsyncSession
+
+    Only the relationships loaded by the chosen load profile can be
+    accessed on what they return, as lazy loads cannot be awaited."""
+
+    def add(self, model: typing.Any) -> None: ...
+
+    async def add_all(self, models: typing.Iterable[typing.Any]) -> None: ...
+
+    async def get(self, id_: typing.Any, load: LoadProfile = "full") -> typing.Any: ...
+
+    async def list(self) -> typing.Any: ...
+
+    async def page(self, limit: int, after: typing.Any = None) -> typing.Any: ...
+
+    async def summaries(self, limit: int, after: typing.Any = None) -> typing.Any: ...
+
+
+class AbstractAsyncResponseRepo(typing.Protocol):
+    async def add_all(self, responses: typing.Iterable[models.Response]) -> None: ...
+
+    async def selections(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[tuple[str, int]]: ...
+
+
+class AsyncEventSQLAlchemyRepo(AbstractAsyncRepo):
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def add(self, event: models.Event) -> None:
+        self.session.add(event)
+        _mark_events_changed(self.session, [event])
+
+    async def add_all(self, events: typing.Iterable[models.Event]) -> None:
+        """Insert events with a single executemany, adding those with
+        quizzes through the session, as EventSQLAlchemyRepo does"""
+        rows = []
+        events = list(events)
+        for event in events:
+            if event.quizzes:
+                self.session.add(event)
+            else:
+                rows.append({"identifier": event.identifier, "name": event.name})
+        if rows:
+            await self.session.execute(insert(orm.events_table), rows)
+        _mark_events_changed(self.session, events)
+
+    async def get(self, identifier: str, load: LoadProfile = "full") -> models.Event:
+        result = await self.session.scalars(
+            _get_statement(models.Event, identifier, load)
+        )
+        return result.unique().one()
+
+    async def list(self) -> typing.Sequence[models.Event]:
+        return (await self.session.scalars(select(models.Event))).all()
+
+    async def page(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[models.Event]:
+        query = _page_statement(models.Event, limit, after)
+        return (await self.session.scalars(query)).all()
+
+    async def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        table = orm.events_table
+        query = _summaries_statement(table.c.identifier, table.c.name, limit, after)
+        return (await self.session.execute(query)).tuples().all()
+
+
+class AsyncQuizSQLAlchemyRepo(AbstractAsyncRepo):
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def add(self, quiz: models.Quiz) -> None:
+        self.session.add(quiz)
+        versioning.mark_changed(self.session, "quizzes")
+
+    async def add_all(self, quizzes: typing.Iterable[models.Quiz]) -> None:
+        """Insert whole quiz trees with one bulk insert per table, as
+        QuizSQLAlchemyRepo does"""
+        quizzes = list(quizzes)
+        if not quizzes:
+            return
+        versioning.mark_changed(self.session, "quizzes")
+        quiz_ids = (
+            await self.session.scalars(
+                _insert_returning_ids(orm.quizzes_table), _quiz_rows(quizzes)
+            )
+        ).all()
+        questions = _quiz_questions(quiz_ids, quizzes)
+        if not questions:
+            return
+        question_ids = (
+            await self.session.scalars(
+                _insert_returning_ids(orm.questions_table), _question_rows(questions)
+            )
+        ).all()
+        options = _option_rows(question_ids, questions)
+        if options:
+            await self.session.execute(insert(orm.options_table), options)
+
+    async def get(self, identifier: str, load: LoadProfile = "full") -> models.Quiz:
+        result = await self.session.scalars(
+            _get_statement(models.Quiz, identifier, load)
+        )
+        return result.unique().one()
+
+    async def list(self) -> typing.Sequence[models.Quiz]:
+        return (await self.session.scalars(select(models.Quiz))).all()
+
+    async def page(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[models.Quiz]:
+        query = _page_statement(models.Quiz, limit, after)
+        return (await self.session.scalars(query)).all()
+
+    async def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        table = orm.quizzes_table
+        query = _summaries_statement(table.c.identifier, table.c.title, limit, after)
+        return (await self.session.execute(query)).tuples().all()
+
+
+class AsyncResponseSQLAlchemyRepo(AbstractAsyncResponseRepo):
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    async def add_all(self, responses: typing.Iterable[models.Response]) -> None:
+        rows = [_response_row(r) for r in responses]
+        if rows:
+            await self.session.execute(_insert_responses_statement(), rows)
+            versioning.mark_changed(self.session, "responses")
+
+    async def selections(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[tuple[str, int]]:
+        query = _selections_statement(quiz_identifier, question_index)
+        return (await self.session.execute(query)).tuples().all()
+
+
+def _insert_returning_ids(table):
+    """Insert rows returning their primary keys in parameter order"""
+    return insert(table).returning(table.c.id, sort_by_parameter_order=True)
+
+
+def _quiz_rows(quizzes: list[models.Quiz]) -> list[dict]:
+    return [{"identifier": q.identifier, "title": q.title} for q in quizzes]
+
+
+def _quiz_questions(
+    quiz_ids: typing.Sequence[int], quizzes: list[models.Quiz]
+) -> list[tuple[int, models.Question]]:
+    return [
+        (quiz_id, question)
+        for quiz_id, quiz in zip(quiz_ids, quizzes)
+        for question in quiz.questions
+    ]
+
+
+def _question_rows(questions: list[tuple[int, models.Question]]) -> list[dict]:
+    return [{"quiz_id": quiz_id, "text": q.text} for quiz_id, q in questions]
+
+
+def _option_rows(
+    question_ids: typing.Sequence[int],
+    questions: list[tuple[int, models.Question]],
+) -> list[dict]:
+    return [
+        {"question_id": question_id, "text": o.text, "correct": o.correct}
+        for question_id, (_, question) in zip(question_ids, questions)
+        for o in question.options
+    ]
+
+
+def _mark_events_changed(session, events: list[models.Event]) -> None:
+    if any(event.quizzes for event in events):
+        versioning.mark_changed(session, "events", "quizzes")
+    elif events:
+        versioning.mark_changed(session, "events")
+
+
+def _page_statement(model, limit: int, after: str | None):
+    """Select up to `limit` aggregates ordered by identifier
+
+    Pages are continued from the identifier of the last aggregate seen
+    rather than an offset, so each page is an index range scan no matter
+    how deep into the table it is."""
+    query = select(model)
+    if after is not None:
+        query = query.where(model.identifier > after)
+    return query.order_by(model.identifier).limit(limit)
+
+
+def _summaries_statement(key, column, limit: int, after: str | None):
+    """Select up to `limit` (identifier, column) rows ordered by identifier
+
+    Only the two columns are selected and rows are returned as plain
+    tuples, skipping ORM object construction and the identity map."""
+    query = select(key, column)
+    if after is not None:
+        query = query.where(key > after)
+    return query.order_by(key).limit(limit)
+
+
+def _get_statement(model, identifier: str, load: LoadProfile):
+    return (
+        select(model)
+        .options(*_load_options(model, load))
+        .filter_by(identifier=identifier)
+    )
+
+
+def _response_question(response: models.Response) -> tuple[str, int]:
+    return response.quiz_identifier, response.question_index
+
+
+def _response_row(response: models.Response) -> dict:
+    return {
+        "participant": response.participant,
+        "quiz_identifier": response.quiz_identifier,
+        "question_index": response.question_index,
+        "selected": response.selected,
+        "answered_at": response.answered_at,
+    }
+
+
+def _insert_responses_statement():
+    table = orm.responses_table
+    return sqlite_insert(table).on_conflict_do_nothing(
+        index_elements=[
+            table.c.quiz_identifier,
+            table.c.question_index,
+            table.c.participant,
+        ]
+    )
+
+
+def _selections_statement(quiz_identifier: str, question_index: int):
+    table = orm.responses_table
+    return select(table.c.participant, table.c.selected).where(
+        table.c.quiz_identifier == quiz_identifier,
+        table.c.question_index == question_index,
+    )
+
+
+# relationship path from each aggregate root down to its leaf entities
+_AGGREGATE_PATHS: dict[type, tuple[str, ...]] = {
+    models.Event: ("quizzes", "questions", "options"),
+    models.Quiz: ("questions", "options"),
+}
+
+
+def _load_options(model: type, load: LoadProfile) -> tuple:
+    """Return the loader options that fetch an aggregate down to its options
+
+    "lazy" loads relationships on first access, "full" issues one
+    SELECT ... IN query per relationship level and "joined" loads the
+    whole aggregate in a single JOINed query."""
+    if load == "lazy":
+        return ()
+    if load == "full":
+        loader = selectinload
+    elif load == "joined":
+        loader = joinedload
+    else:
+        raise ValueError(f"Unknown load profile: {load}")
+
+    attributes = []
+    mapper: Mapper = inspect(model)
+    for name in _AGGREGATE_PATHS[model]:
+        relationship = mapper.relationships[name]
+        attributes.append(relationship.class_attribute)
+        mapper = relationship.mapper
+
+    # nest from the leaf upwards so every level gets the loader strategy
+    option = loader(attributes.pop())
+    while attributes:
+        option = loader(attributes.pop()).options(option)
+    return (option,)
@@ -0,0 +1,146 @@
+"""Repositories spread over several databases by hashing identifiers
+
+Each Event aggregate, with the quizzes it holds, is stored in the shard
+its identifier hashes to. Quizzes added on their own, and the responses
+and scores of a quiz, go to the shard of the quiz identifier. A quiz
+saved as part of an event lives in the event's shard instead, so
+fetching a quiz falls back to the other shards when it is not in its
+own."""
+
+import collections
+import heapq
+import itertools
+import operator
+import typing
+import zlib
+
+from sqlalchemy.exc import NoResultFound
+
+from slidow import models
+from slidow.adapters import repos
+
+# page size of the merged scan behind list()
+SCAN_PAGE_SIZE = 1000
+
+
+def shard_for(identifier: str, shards: int) -> int:
+    """Return the shard index for an identifier, stable across processes"""
+    return zlib.crc32(identifier.encode()) % shards
+
+
+class _ShardedRepo:
+    def __init__(self, shards: typing.Sequence[repos.AbstractRepo]) -> None:
+        self.shards = shards
+
+    def _shard(self, identifier: str) -> repos.AbstractRepo:
+        return self.shards[shard_for(identifier, len(self.shards))]
+
+    def add(self, model: typing.Any) -> None:
+        self._shard(model.identifier).add(model)
+
+    def add_all(self, aggregates: typing.Iterable[typing.Any]) -> None:
+        by_shard = collections.defaultdict(list)
+        for model in aggregates:
+            by_shard[shard_for(model.identifier, len(self.shards))].append(model)
+        for index, batch in by_shard.items():
+            self.shards[index].add_all(batch)
+
+    def get(self, id_: str, load: repos.LoadProfile = "lazy") -> typing.Any:
+        return self._shard(id_).get(id_, load)
+
+    def list(self) -> typing.Sequence[typing.Any]:
+        return list(self._scan())
+
+    def page(self, limit: int, after: str | None = None) -> typing.Sequence[typing.Any]:
+        """Merge each shard's page, every one ordered by identifier"""
+        pages = [shard.page(limit, after) for shard in self.shards]
+        merged = heapq.merge(*pages, key=operator.attrgetter("identifier"))
+        return list(itertools.islice(merged, limit))
+
+    def stream(self, batch_size: int = 1000) -> typing.Iterable[typing.Any]:
+        return itertools.chain.from_iterable(
+            shard.stream(batch_size) for shard in self.shards
+        )
+
+    def summaries(
+        self, limit: int, after: str | None = None
+    ) -> typing.Sequence[tuple[str, str]]:
+        pages = [shard.summaries(limit, after) for shard in self.shards]
+        merged = heapq.merge(*pages, key=operator.itemgetter(0))
+        return list(itertools.islice(merged, limit))
+
+    def _scan(self) -> typing.Iterator[typing.Any]:
+        after = None
+        while True:
+            page = self.page(SCAN_PAGE_SIZE, after)
+            yield from page
+            if len(page) < SCAN_PAGE_SIZE:
+                return
+            after = page[-1].identifier
+
+
+class ShardedEventRepo(_ShardedRepo, repos.AbstractRepo):
+    pass
+
+
+class ShardedQuizRepo(_ShardedRepo, repos.AbstractQuizRepo):
+    shards: typing.Sequence[repos.AbstractQuizRepo]
+
+    def get(self, id_: str, load: repos.LoadProfile = "lazy") -> models.Quiz:
+        home = shard_for(id_, len(self.shards))
+        for index in (home, *(i for i in range(len(self.shards)) if i != home)):
+            try:
+                return self.shards[index].get(id_, load)
+            except NoResultFound:
+                continue
+        raise NoResultFound(f"Quiz {id_} not found in any shard")
+
+    def stream_dicts(self, batch_size: int = 1000) -> typing.Iterator[dict]:
+        return itertools.chain.from_iterable(
+            shard.stream_dicts(batch_size) for shard in self.shards
+        )
+
+
+class ShardedResponseRepo(repos.AbstractResponseRepo):
+
+    def __init__(self, shards: typing.Sequence[repos.AbstractResponseRepo]) -> None:
+        self.shards = shards
+
+    def _shard(self, quiz_identifier: str) -> repos.AbstractResponseRepo:
+        return self.shards[shard_for(quiz_identifier, len(self.shards))]
+
+    def add_all(self, responses: typing.Iterable[models.Response]) -> None:
+        by_quiz = collections.defaultdict(list)
+        for response in responses:
+            by_quiz[response.quiz_identifier].append(response)
+        for quiz_identifier, batch in by_quiz.items():
+            self._shard(quiz_identifier).add_all(batch)
+
+    def for_question(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[models.Response]:
+        return self._shard(quiz_identifier).for_question(
+            quiz_identifier, question_index
+        )
+
+    def selections(
+        self, quiz_identifier: str, question_index: int
+    ) -> typing.Sequence[tuple[str, int]]:
+        return self._shard(quiz_identifier).selections(quiz_identifier, question_index)
+
+
+class ShardedScoreRepo(repos.AbstractScoreRepo):
+
+    def __init__(self, shards: typing.Sequence[repos.AbstractScoreRepo]) -> None:
+        self.shards = shards
+
+    def _shard(self, quiz_identifier: str) -> repos.AbstractScoreRepo:
+        return self.shards[shard_for(quiz_identifier, len(self.shards))]
+
+    def replace(
+        self, quiz_identifier: str, scores: typing.Iterable[tuple[str, float]]
+    ) -> None:
+        self._shard(quiz_identifier).replace(quiz_identifier, scores)
+
+    def for_quiz(self, quiz_identifier: str) -> typing.Sequence[tuple[str, float]]:
+        return self._shard(quiz_identifier).for_quiz(quiz_identifier)
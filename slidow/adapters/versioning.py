@@ -0,0 +1,114 @@
+"""Version counters of the stored data, for conditional requests
+
+SQLAlchemy repos mark the kinds of data they write ("events",
+"quizzes", "responses", "scores") on their session, and a unit of work
+given a DataVersions bumps the marked counters in the transaction that
+commits the writes. The counters live in the database, so every worker
+process and every replica copy agrees on them, and reading one is a
+primary key lookup that leaves the data's own tables alone.
+
+Counters only order the writes to one database, so next to them an
+"epoch" row holds a random identifier of the database, created with
+its first counter. It is part of every version, so that two databases,
+or one recreated from scratch, never give the same data version to
+different data.
+"""
+
+import dataclasses
+import datetime
+import secrets
+import time
+import typing
+
+from sqlalchemy import case, select
+from sqlalchemy.dialects.sqlite import insert
+
+from slidow.adapters import orm
+
+# session.info key of the names of the data written in the transaction
+CHANGED = "slidow_changed_data"
+
+# name of the row whose version identifies the database
+EPOCH = "epoch"
+
+
+def mark_changed(session: typing.Any, *names: str) -> None:
+    session.info.setdefault(CHANGED, set()).update(names)
+
+
+def forget_changed(session: typing.Any) -> None:
+    """Drop the marks of a transaction that ended without a bump"""
+    session.info.pop(CHANGED, None)
+
+
+@dataclasses.dataclass(frozen=True)
+class Version:
+    """The combined version of some kinds of data"""
+
+    names: tuple[str, ...]
+    versions: tuple[int, ...]
+    changed_at: float | None
+    epoch: int = 0
+
+    @property
+    def etag(self) -> str:
+        counters = "-".join(str(version) for version in self.versions)
+        return f"{self.epoch:x}-{'+'.join(self.names)}-{counters}"
+
+    @property
+    def last_modified(self) -> datetime.datetime | None:
+        if self.changed_at is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.changed_at, datetime.timezone.utc)
+
+
+class DataVersions:
+    def __init__(self, clock: typing.Callable[[], float] = time.time) -> None:
+        self.clock = clock
+
+    def bump(self, session: typing.Any) -> None:
+        """Bump the counters of the data marked changed on the session
+
+        Call before committing, so the counters commit with the data.
+        The database's epoch is created along with its first counter."""
+        names = session.info.pop(CHANGED, None)
+        if not names:
+            return
+        table = orm.data_versions_table
+        now = self.clock()
+        rows = [
+            {"name": name, "version": 1, "changed_at": now} for name in sorted(names)
+        ]
+        rows.append({"name": EPOCH, "version": secrets.randbits(63), "changed_at": now})
+        statement = insert(table).values(rows)
+        is_epoch = table.c.name == EPOCH
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={
+                    "version": case(
+                        (is_epoch, table.c.version), else_=table.c.version + 1
+                    ),
+                    "changed_at": case(
+                        (is_epoch, table.c.changed_at),
+                        else_=statement.excluded.changed_at,
+                    ),
+                },
+            )
+        )
+
+    def read(self, session: typing.Any, *names: str) -> Version:
+        table = orm.data_versions_table
+        rows = session.execute(
+            select(table.c.name, table.c.version, table.c.changed_at).where(
+                table.c.name.in_((*names, EPOCH))
+            )
+        )
+        found = {name: (version, changed_at) for name, version, changed_at in rows}
+        changed = [found[name][1] for name in names if name in found]
+        return Version(
+            names,
+            tuple(found.get(name, (0, None))[0] for name in names),
+            max(changed) if changed else None,
+            found.get(EPOCH, (0, None))[0],
+        )
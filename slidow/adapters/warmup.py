@@ -0,0 +1,143 @@
+"""Warming up engines before a worker serves traffic
+
+SQLAlchemy defers work to first use: mappers are configured by the
+first query, each engine compiles a statement the first time it runs
+it, and pools connect on the first checkout. `warm_up` does all of it
+up front, so the first requests a worker serves are not the slowest.
+
+Pooled connections must not be shared across a fork, so a process
+forked after its pools were opened, e.g. a worker of `gunicorn
+--preload`, drops the connections it inherited without closing them
+and connects its own. Configured mappers and compiled statements are
+kept.
+"""
+
+import contextlib
+import dataclasses
+import functools
+import os
+import time
+import typing
+import weakref
+
+from sqlalchemy import Engine, inspect
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import Session, configure_mappers
+from sqlalchemy.pool import QueuePool
+
+from slidow.adapters import orm, repos, versioning
+
+# an identifier that no aggregate has, so that priming reads no rows
+MISSING = ""
+
+# engines whose pools are dropped in forked processes
+_fork_safe: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+@dataclasses.dataclass
+class WarmUpReport:
+    """What a warm-up did, and the seconds each phase took"""
+
+    connections: int = 0
+    statements: int = 0
+    seconds: dict[str, float] = dataclasses.field(default_factory=dict)
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+
+def warm_up(
+    engines: typing.Iterable[Engine], connections: int | None = None
+) -> WarmUpReport:
+    """Configure the mappers, then open the pool of and prime the
+    statement cache of each engine"""
+    report = WarmUpReport()
+    with _timed(report, "mappers"):
+        configure_mappers()
+    for db_engine in engines:
+        with _timed(report, "connections"):
+            report.connections += open_pool(db_engine, connections)
+        with _timed(report, "statements"):
+            report.statements += prime_statements(db_engine)
+    return report
+
+
+def open_pool(db_engine: Engine, size: int | None = None) -> int:
+    """Connect `size` connections at once and return them to the pool
+
+    By default, as many as a QueuePool keeps open, or one for other
+    pools. Returns the number of connections made."""
+    if size is None:
+        pool = db_engine.pool
+        size = pool.size() if isinstance(pool, QueuePool) else 1
+    _drop_pool_after_fork(db_engine)
+    opened = [db_engine.connect() for _ in range(size)]
+    for connection in opened:
+        connection.close()
+    return size
+
+
+def _drop_pool_after_fork(db_engine: Engine) -> None:
+    """Replace the engine's pool in forked children, leaving the parent's
+    connections open"""
+    if db_engine in _fork_safe:
+        return
+    _fork_safe.add(db_engine)
+    reference = weakref.ref(db_engine)
+
+    def dispose() -> None:
+        if (forked := reference()) is not None:
+            forked.dispose(close=False)
+
+    os.register_at_fork(after_in_child=dispose)
+
+
+def prime_statements(db_engine: Engine) -> int:
+    """Run the repos' read queries once, compiling them into the engine's
+    statement cache
+
+    The queries look up an identifier no aggregate has, in a transaction
+    that is rolled back. Nothing is run if the schema has not been
+    created yet. Returns the number of queries run."""
+    tables = set(inspect(db_engine).get_table_names())
+    if not tables.issuperset(orm.mapper_registry.metadata.tables):
+        return 0
+    with Session(db_engine) as session:
+        queries = list(_repo_queries(session))
+        for query in queries:
+            try:
+                query()
+            except NoResultFound:
+                pass
+        session.rollback()
+    return len(queries)
+
+
+def _repo_queries(session: Session) -> typing.Iterator[typing.Callable]:
+    aggregates: list[repos.AbstractRepo] = [
+        repos.EventSQLAlchemyRepo(session),
+        repos.QuizSQLAlchemyRepo(session),
+    ]
+    for repo in aggregates:
+        for load in typing.get_args(repos.LoadProfile):
+            yield functools.partial(repo.get, MISSING, load)
+        for after in (None, MISSING):
+            yield functools.partial(repo.page, 1, after)
+            yield functools.partial(repo.summaries, 1, after)
+    responses = repos.ResponseSQLAlchemyRepo(session)
+    yield functools.partial(responses.for_question, MISSING, 0)
+    yield functools.partial(responses.selections, MISSING, 0)
+    yield functools.partial(repos.ScoreSQLAlchemyRepo(session).for_quiz, MISSING)
+    yield functools.partial(versioning.DataVersions().read, session, "events")
+
+
+@contextlib.contextmanager
+def _timed(report: WarmUpReport, phase: str) -> typing.Iterator[None]:
+    """Add the time spent in the block to a phase of `report`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        report.seconds[phase] = report.seconds.get(phase, 0.0) + elapsed
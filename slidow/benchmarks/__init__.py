@@ -0,0 +1,20 @@
+"""Performance benchmarks
+
+Each module is runnable on its own, e.g.
+
+    python -m slidow.benchmarks.repo_get
+
+slidow.benchmarks.suite times the main paths at several data sizes
+and writes JSON results to compare between runs.
+"""
+
+import time
+import typing
+
+
+def per_call(func: typing.Callable[[], typing.Any], calls: int) -> float:
+    """Return the mean wall time of `func` in microseconds"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
@@ -0,0 +1,101 @@
+"""Concurrent request throughput: threads on the sync stack versus asyncio
+
+Runs the same mix of requests, one add_event for every `READS` page
+reads, with `CONCURRENCY` requests in flight at a time. The sync stack
+serves them from a thread pool, as a threaded WSGI server would; the
+async stack runs them as coroutines on a single event loop."""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from slidow.adapters import orm, repos
+from slidow.service_layer import async_services, services, unit_of_work
+
+REQUESTS = 5_000
+CONCURRENCY = 64
+READS = 4
+# seconds a connection waits on SQLite's database lock
+LOCK_TIMEOUT = 60
+
+
+def sync_requests_per_second(path: str, requests: int, concurrency: int) -> float:
+    engine = create_engine("sqlite:///" + path, pool_size=concurrency, max_overflow=0)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    def handle(i: int) -> None:
+        if i % (READS + 1) == 0:
+            services.add_event(
+                f"Event {i}", unit_of_work.SQLAlchemyUOW(session_factory)
+            )
+        else:
+            with session_factory() as session:
+                services.get_events(repos.EventSQLAlchemyRepo(session))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(handle, range(requests)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return requests / elapsed
+
+
+async def async_requests_per_second(
+    path: str, requests: int, concurrency: int
+) -> float:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///" + path,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=concurrency,
+        max_overflow=0,
+        connect_args={"timeout": LOCK_TIMEOUT},
+    )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def handle(i: int) -> None:
+        async with slots:
+            if i % (READS + 1) == 0:
+                uow = unit_of_work.AsyncSQLAlchemyUOW(session_factory)
+                await async_services.add_event(f"Event {i}", uow)
+            else:
+                async with session_factory() as session:
+                    repo = repos.AsyncEventSQLAlchemyRepo(session)
+                    await async_services.get_events(repo)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handle(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return requests / elapsed
+
+
+def main(requests: int = REQUESTS, concurrency: int = CONCURRENCY) -> None:
+    for label in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "bench.sqlite")
+            engine = create_engine("sqlite:///" + path)
+            orm.mapper_registry.metadata.create_all(engine)
+            with engine.connect() as conn:
+                # readers would otherwise hold writers off the database
+                conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            engine.dispose()
+            if label == "sync":
+                rate = sync_requests_per_second(path, requests, concurrency)
+            else:
+                rate = asyncio.run(
+                    async_requests_per_second(path, requests, concurrency)
+                )
+        print(f"{label:>5}: {rate:8.0f} requests/s at concurrency {concurrency}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,51 @@
+"""Question broadcast latency to many subscribers of one Channel
+
+Each subscriber is a thread, as with the threaded SSE endpoint, and
+records when it received each published question."""
+
+import statistics
+import sys
+import threading
+import time
+
+from slidow.service_layer import broadcast
+
+SUBSCRIBERS = 5_000
+QUESTIONS = 5
+
+
+def main(subscribers: int = SUBSCRIBERS, questions: int = QUESTIONS) -> None:
+    channel = broadcast.Channel()
+    received: list[list[float]] = [[] for _ in range(questions)]
+    ready = threading.Barrier(subscribers + 1)
+
+    def subscriber() -> None:
+        stream = channel.subscribe()
+        ready.wait()
+        for index, _ in enumerate(stream):
+            received[index].append(time.perf_counter())
+
+    threading.stack_size(256 * 1024)
+    threads = [threading.Thread(target=subscriber) for _ in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+
+    for index in range(questions):
+        published = time.perf_counter()
+        channel.publish(broadcast.sse_frame(b'{"index":%d}' % index))
+        while len(received[index]) < subscribers:
+            time.sleep(0.001)
+        latencies = sorted((at - published) * 1000 for at in received[index])
+        print(
+            f"question {index}: p50 {statistics.median(latencies):7.1f} ms,"
+            f" p99 {latencies[int(len(latencies) * 0.99)]:7.1f} ms,"
+            f" max {latencies[-1]:7.1f} ms to {subscribers} subscribers"
+        )
+    channel.close()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,44 @@
+"""Event creation throughput: looping add_event versus add_events
+
+Runs against a SQLite file so every commit pays its real journal and
+fsync cost."""
+
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from slidow.adapters import orm
+from slidow.service_layer import services, unit_of_work
+
+EVENTS = 500
+
+
+def main(events: int = EVENTS) -> None:
+    names = [f"Event {i}" for i in range(events)]
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine("sqlite:///" + os.path.join(directory, "bench.sqlite"))
+        orm.mapper_registry.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+        uow = unit_of_work.SQLAlchemyUOW(session_factory)
+
+        start = time.perf_counter()
+        for name in names:
+            services.add_event(name, uow)
+        looped = time.perf_counter() - start
+
+        start = time.perf_counter()
+        services.add_events(names, uow)
+        bulk = time.perf_counter() - start
+        engine.dispose()
+
+    print(f"  add_event loop: {events / looped:10.0f} events/s")
+    print(f"      add_events: {events / bulk:10.0f} events/s")
+    print(f"         speedup: {looped / bulk:10.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
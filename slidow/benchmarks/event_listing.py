@@ -0,0 +1,60 @@
+"""Event listing throughput: ORM entities versus column projection
+
+Compares building (identifier, name) pairs from full Event entities with
+selecting just those columns through EventSQLAlchemyRepo.summaries."""
+
+import sys
+import tracemalloc
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from slidow.adapters import orm, repos
+from slidow.benchmarks import per_call
+
+EVENTS = 100_000
+PAGE_SIZE = 1_000
+CALLS = 50
+
+
+def entity_page(repo: repos.EventSQLAlchemyRepo) -> list[tuple]:
+    return [(event.identifier, event.name) for event in repo.page(PAGE_SIZE)]
+
+
+def projected_page(repo: repos.EventSQLAlchemyRepo) -> list[tuple]:
+    return list(repo.summaries(PAGE_SIZE))
+
+
+def peak_allocation(func) -> int:
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(events: int = EVENTS) -> None:
+    engine = create_engine("sqlite:///:memory:")
+    orm.mapper_registry.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(orm.events_table),
+            [{"identifier": f"event{i}", "name": f"Event {i}"} for i in range(events)],
+        )
+
+    for label, listing in (("entities", entity_page), ("projection", projected_page)):
+        with Session(engine) as session:
+            repo = repos.EventSQLAlchemyRepo(session)
+            listing(repo)  # warm up statement caches
+            micros = per_call(lambda: listing(repo), CALLS)
+            session.expunge_all()
+            peak = peak_allocation(lambda: listing(repo))
+        print(
+            f"{label:>10}: {PAGE_SIZE / micros * 1e6:10.0f} rows/s,"
+            f" {peak / 1024:8.1f} KiB peak per {PAGE_SIZE} row page"
+        )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,56 @@
+"""Rendered /events pages per second with and without the fragment cache
+
+Cycles GET /events through PAGES pages of a seeded database, with the
+fragment cache off, warm in memory, and warm only in a shared
+FileFragmentStore, as a fresh worker process would find it."""
+
+import os
+import sys
+import tempfile
+import time
+
+from slidow.benchmarks import suite
+from slidow.entrypoints.flask_app import create_app
+
+EVENTS = 100_000
+PAGES = 50
+LIMIT = 100
+REQUESTS = 2_000
+
+
+def pages_per_second(client, cursors: list[str]) -> float:
+    for after in cursors:  # warm up
+        client.get("/events", query_string={"after": after, "limit": LIMIT})
+    start = time.perf_counter()
+    for index in range(REQUESTS):
+        after = cursors[index % len(cursors)]
+        client.get("/events", query_string={"after": after, "limit": LIMIT})
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main(events: int = EVENTS) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        data = suite.seed(directory, events)
+        step = len(data.event_ids) // PAGES
+        cursors = data.event_ids[::step][:PAGES]
+        configs: dict[str, dict] = {
+            "no cache": {"FRAGMENT_CACHE_BYTES": 0},
+            "memory": {},
+            "shared store": {
+                "FRAGMENT_CACHE_BYTES": 0,
+                "FRAGMENT_CACHE_DIR": os.path.join(directory, "fragments"),
+            },
+        }
+        for label, config in configs.items():
+            app = create_app({"TESTING": True, "DATABASE": data.database, **config})
+            rate = pages_per_second(app.test_client(), cursors)
+            stats = app.config["FRAGMENT_CACHE"].stats()
+            print(
+                f"{label:>12}: {rate:7.0f} pages/s,"
+                f" hit rate {stats['hit_rate']:.2f}"
+            )
+            app.config["DB_ROUTER"].dispose()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
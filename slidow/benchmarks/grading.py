@@ -0,0 +1,49 @@
+"""Grading throughput: vectorized grading versus per-participant loops
+
+`score` is the vectorized kernel over an array of bitmasks, `grade`
+adds converting (participant, bitmask) pairs in and a dict out."""
+
+import random
+import sys
+
+import numpy as np
+
+from slidow.benchmarks import per_call
+from slidow.service_layer import grading
+
+PARTICIPANTS = 10_000
+CALLS = 20
+MASK = 0b0110
+
+
+def loop_grade(selections: list[tuple[str, int]]) -> dict[str, float]:
+    return {participant: float(bits == MASK) for participant, bits in selections}
+
+
+def loop_partial_grade(selections: list[tuple[str, int]]) -> dict[str, float]:
+    scores = {}
+    correct = MASK.bit_count()
+    for participant, bits in selections:
+        hits = (bits & MASK).bit_count()
+        misses = (bits & ~MASK).bit_count()
+        scores[participant] = max((hits - misses) / correct, 0.0)
+    return scores
+
+
+def main(participants: int = PARTICIPANTS) -> None:
+    selections = [(f"p{i}", random.randrange(16)) for i in range(participants)]
+    selected = np.array([bits for _, bits in selections], dtype=np.uint64)
+    for label, grade in (
+        ("loop", lambda: loop_grade(selections)),
+        ("grade", lambda: grading.grade(MASK, selections)),
+        ("score", lambda: grading.score(MASK, selected)),
+        ("partial loop", lambda: loop_partial_grade(selections)),
+        ("partial grade", lambda: grading.grade(MASK, selections, partial=True)),
+        ("partial score", lambda: grading.score(MASK, selected, partial=True)),
+    ):
+        micros = per_call(grade, CALLS)
+        print(f"{label:>13}: {micros / 1000:8.3f} ms per {participants} responses")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""Small-write throughput: a commit per unit of work versus group commits
+
+Threads each add events one at a time through services.add_event,
+either with SQLAlchemyUOW, committing every event on its own, or with
+BatchingUOW, sharing commits through a GroupCommitter."""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from slidow.adapters import orm
+from slidow.service_layer import services, unit_of_work
+
+WRITES = 2_000
+THREADS = 32
+# seconds a connection waits on SQLite's database lock
+LOCK_TIMEOUT = 60
+
+
+def writes_per_second(make_uow, writes: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(
+            pool.map(
+                lambda i: services.add_event(f"Event {i}", make_uow()), range(writes)
+            )
+        )
+    return writes / (time.perf_counter() - start)
+
+
+def main(writes: int = WRITES, threads: int = THREADS) -> None:
+    for label in ("per-unit", "group"):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine = create_engine(
+                "sqlite:///" + os.path.join(tmpdir, "bench.sqlite"),
+                pool_size=threads,
+                connect_args={"timeout": LOCK_TIMEOUT},
+            )
+            orm.mapper_registry.metadata.create_all(engine)
+            session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+            committer = unit_of_work.GroupCommitter(session_factory)
+            if label == "group":
+                rate = writes_per_second(
+                    lambda: unit_of_work.BatchingUOW(committer), writes, threads
+                )
+                commits = committer.commits
+            else:
+                rate = writes_per_second(
+                    lambda: unit_of_work.SQLAlchemyUOW(session_factory),
+                    writes,
+                    threads,
+                )
+                commits = writes
+            engine.dispose()
+        print(f"{label:>8}: {rate:8.0f} writes/s in {commits} commits")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
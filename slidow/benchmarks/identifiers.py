@@ -0,0 +1,76 @@
+"""Identifier generation and insert throughput on a large event table
+
+Compares the former identifiers, 20 random letters, with ULIDs from
+slidow.identifiers: the cost of generating them, one at a time and in
+batches, and the rate of inserting events keyed by them as the table
+grows. Random keys land all over the unique identifier index, while
+ULIDs append to its right-hand edge."""
+
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from slidow import identifiers
+from slidow.adapters import engine, orm
+from slidow.benchmarks import per_call
+
+ROWS = 1_000_000
+BATCH = 10_000
+CALLS = 100_000
+
+
+def random_letters(count: int) -> list[str]:
+    return ["".join(random.choices(string.ascii_letters, k=20)) for _ in range(count)]
+
+
+def ulids(count: int) -> list[str]:
+    return identifiers.new_identifiers(count)
+
+
+def insert_rates(new_keys, rows: int) -> list[float]:
+    """Return rows/s for each tenth of the rows inserted"""
+    rates = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_engine = engine.create_sqlite_engine(
+            os.path.join(tmpdir, "bench.sqlite"),
+            # a small page cache, so index locality shows as it would on
+            # a table much larger than memory
+            engine.SQLiteProfile(journal_mode="WAL", cache_size=-8 * 1024),
+        )
+        orm.mapper_registry.metadata.create_all(db_engine)
+        tenth = max(rows // 10, BATCH)
+        for _ in range(0, rows, tenth):
+            start = time.perf_counter()
+            for _ in range(0, tenth, BATCH):
+                batch = [
+                    {"identifier": key, "name": "Event"} for key in new_keys(BATCH)
+                ]
+                with db_engine.begin() as conn:
+                    conn.execute(insert(orm.events_table), batch)
+            rates.append(tenth / (time.perf_counter() - start))
+        db_engine.dispose()
+    return rates
+
+
+def main(rows: int = ROWS) -> None:
+    generator = identifiers.ULIDGenerator()
+    print("generation, us per identifier:")
+    print(f"  random letters {per_call(lambda: random_letters(1), CALLS):6.2f}")
+    print(f"  ULID           {per_call(generator.new, CALLS):6.2f}")
+    print(
+        f"  ULID batch     {per_call(lambda: generator.batch(1000), 100) / 1000:6.2f}"
+    )
+
+    print(f"insert rows/s by tenth of {rows} rows:")
+    for label, new_keys in (("random letters", random_letters), ("ULID", ulids)):
+        rates = insert_rates(new_keys, rows)
+        print(f"  {label:>14}: " + " ".join(f"{rate:7.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,62 @@
+"""The persistent key-value store against the in-memory one
+
+Writes events through EventKeyValRepo to a dict and to a LogStore,
+then times reopening the log, fetching single events and iterating
+over all of them, and how compaction shrinks a log of overwrites."""
+
+import os
+import sys
+import tempfile
+import time
+
+from slidow import identifiers, models
+from slidow.adapters import logstore, repos
+from slidow.benchmarks import per_call
+
+EVENTS = 100_000
+CALLS = 10_000
+
+
+def write_rate(kv_store, keys: list[str]) -> float:
+    repo = repos.EventKeyValRepo(kv_store)
+    start = time.perf_counter()
+    for key in keys:
+        repo.add(models.Event(key, "Event"))
+    return len(keys) / (time.perf_counter() - start)
+
+
+def main(events: int = EVENTS) -> None:
+    keys = identifiers.new_identifiers(events)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "bench.log")
+        store = logstore.LogStore(path)
+        print(f"writes/s of {events} events:")
+        print(f"  dict     {write_rate({}, keys):9.0f}")
+        print(f"  LogStore {write_rate(store, keys):9.0f}")
+        store.close()
+
+        start = time.perf_counter()
+        store = logstore.LogStore(path)
+        print(f"reopen: {(time.perf_counter() - start) * 1e3:.1f} ms")
+        repo = repos.EventKeyValRepo(store)
+        table = store["events"]
+        middle = keys[len(keys) // 2]
+        print(f"get: {per_call(lambda: table[middle], CALLS):.2f} us")
+        start = time.perf_counter()
+        count = sum(1 for _ in repo.list())
+        print(f"list: {count / (time.perf_counter() - start):.0f} events/s")
+
+        for key in keys[: events // 2]:
+            table[key] = models.Event(key, "Renamed")
+        size = store.size
+        start = time.perf_counter()
+        store.compact()
+        print(
+            f"compact: {size} -> {store.size} bytes"
+            f" in {(time.perf_counter() - start) * 1e3:.0f} ms"
+        )
+        store.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
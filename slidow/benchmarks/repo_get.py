@@ -0,0 +1,42 @@
+"""EventSQLAlchemyRepo.get latency as the event table grows
+
+The identifier index should keep lookups flat from 1k to 1M events."""
+
+import random
+import sys
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from slidow.adapters import orm, repos
+from slidow.benchmarks import per_call
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+LOOKUPS = 2_000
+
+
+def run(size: int) -> float:
+    engine = create_engine("sqlite:///:memory:")
+    orm.mapper_registry.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(orm.events_table),
+            [{"identifier": f"event{i}", "name": f"Event {i}"} for i in range(size)],
+        )
+
+    identifiers = [f"event{random.randrange(size)}" for _ in range(LOOKUPS)]
+    with Session(engine) as session:
+        repo = repos.EventSQLAlchemyRepo(session)
+        lookups = iter(identifiers)
+        result = per_call(lambda: repo.get(next(lookups)), LOOKUPS)
+    engine.dispose()
+    return result
+
+
+def main(sizes: tuple[int, ...] = SIZES) -> None:
+    for size in sizes:
+        print(f"{size:>9} events: {run(size):8.1f} us/get")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or SIZES)
@@ -0,0 +1,62 @@
+"""Response ingestion throughput with ResponseCollector
+
+Every participant answers each question from a pool of threads against
+a SQLite file. For comparison the same responses are also written with
+one unit of work and commit each."""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from slidow import models
+from slidow.adapters import orm, versioning
+from slidow.service_layer import responses, unit_of_work
+
+PARTICIPANTS = 5_000
+QUESTIONS = 4
+THREADS = 8
+UNBATCHED = 500
+
+
+def main(participants: int = PARTICIPANTS, questions: int = QUESTIONS) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine("sqlite:///" + os.path.join(directory, "bench.sqlite"))
+        orm.mapper_registry.metadata.create_all(engine)
+        uow = unit_of_work.SQLAlchemyUOW(
+            sessionmaker(bind=engine), versions=versioning.DataVersions()
+        )
+
+        collector = responses.ResponseCollector(uow)
+        collector.start()
+        start = time.perf_counter()
+        for index in range(questions):
+            collector.open_question("quiz1", index)
+            with ThreadPoolExecutor(THREADS) as pool:
+                for participant in range(participants):
+                    pool.submit(
+                        collector.submit, f"p{participant}", "quiz1", index, 0b01
+                    )
+            collector.close_question("quiz1", index)
+        collector.stop()
+        batched = collector.flushed / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for participant in range(UNBATCHED):
+            with uow:
+                response = models.Response(f"p{participant}", "quiz2", 0, 0b01)
+                uow.responses.add_all([response])
+                uow.commit()
+        unbatched = UNBATCHED / (time.perf_counter() - start)
+        engine.dispose()
+
+    print(f"   collector: {batched:10.0f} responses/s")
+    print(f"  per-commit: {unbatched:10.0f} responses/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""Event creation throughput across hash-sharded SQLite files
+
+Threads add events through services.add_event with a
+ShardedSQLAlchemyUOW. Each event commits to its own shard, so writers
+only contend for the lock of the shard they hash to."""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+from slidow.adapters import engine, orm
+from slidow.service_layer import services, unit_of_work
+
+WRITES = 2_000
+THREADS = 16
+
+
+def writes_per_second(shards: int, writes: int, threads: int) -> float:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engines = [
+            engine.create_sqlite_engine(
+                os.path.join(tmpdir, f"shard{i}.sqlite"),
+                engine.SQLiteProfile(busy_timeout=60_000, pool_size=threads),
+            )
+            for i in range(shards)
+        ]
+        for shard_engine in engines:
+            orm.mapper_registry.metadata.create_all(shard_engine)
+        factories = [sessionmaker(bind=e, expire_on_commit=False) for e in engines]
+
+        def add(i: int) -> None:
+            uow = unit_of_work.ShardedSQLAlchemyUOW(factories)
+            services.add_event(f"Event {i}", uow)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(add, range(writes)))
+        elapsed = time.perf_counter() - start
+        for shard_engine in engines:
+            shard_engine.dispose()
+    return writes / elapsed
+
+
+def main(writes: int = WRITES, threads: int = THREADS) -> None:
+    for shards in (1, 2, 4, 8):
+        rate = writes_per_second(shards, writes, threads)
+        print(f"{shards} shard(s): {rate:8.0f} writes/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,90 @@
+"""Concurrent reads during writes under each SQLite engine profile
+
+A writer thread adds events one transaction at a time, as POST /events
+does, while reader threads list pages of events. Reports read
+throughput and latency, and write throughput, per profile."""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from slidow.adapters import engine, orm, repos
+from slidow.service_layer import services, unit_of_work
+
+EVENTS = 10_000
+READERS = 4
+SECONDS = 5
+
+
+def run(profile: str, readers: int, seconds: float) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_engine = engine.create_sqlite_engine(
+            os.path.join(tmpdir, "bench.sqlite"), profile
+        )
+        orm.mapper_registry.metadata.create_all(db_engine)
+        with db_engine.begin() as conn:
+            conn.execute(
+                insert(orm.events_table),
+                [
+                    {"identifier": f"event{i}", "name": f"Event {i}"}
+                    for i in range(EVENTS)
+                ],
+            )
+        session_factory = sessionmaker(bind=db_engine, expire_on_commit=False)
+        stop = threading.Event()
+        latencies: list[float] = []
+        errors: list[Exception] = []
+        writes = 0
+
+        def read() -> None:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with session_factory() as session:
+                        services.get_events(repos.EventSQLAlchemyRepo(session))
+                except Exception as err:
+                    errors.append(err)
+                latencies.append(time.perf_counter() - start)
+
+        def write() -> None:
+            nonlocal writes
+            while not stop.is_set():
+                try:
+                    services.add_event(
+                        "Event", unit_of_work.SQLAlchemyUOW(session_factory)
+                    )
+                    writes += 1
+                except Exception as err:
+                    errors.append(err)
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        db_engine.dispose()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{profile:>10}: {len(latencies) / seconds:8.0f} reads/s"
+        f" (p50 {quantiles[49] * 1e3:6.2f} ms, p99 {quantiles[98] * 1e3:7.2f} ms),"
+        f" {writes / seconds:6.0f} writes/s, {len(errors)} errors"
+    )
+
+
+def main(readers: int = READERS, seconds: int = SECONDS) -> None:
+    for profile in ("default", "production"):
+        run(profile, readers, seconds)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
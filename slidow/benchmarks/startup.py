@@ -0,0 +1,98 @@
+"""Worker startup: import, create_app and first requests, with and
+without WARM_UP
+
+Each run is a fresh interpreter, as a new worker process would be, on a
+database seeded with EVENTS events. Prints the median of RUNS runs of
+each phase, then the slowest modules imported by the Flask app, as
+reported by `python -X importtime`."""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from slidow.benchmarks import suite
+
+EVENTS = 10_000
+RUNS = 10
+SLOWEST_IMPORTS = 10
+
+WORKER = """
+import json, sys, time
+started = time.perf_counter()
+from slidow.entrypoints.flask_app import create_app
+imported = time.perf_counter()
+app = create_app(
+    {"TESTING": True, "DATABASE": sys.argv[1], "WARM_UP": sys.argv[2] == "1"}
+)
+created = time.perf_counter()
+client = app.test_client()
+timings = {"import": imported - started, "create_app": created - imported}
+for name, request in [
+    ("first GET", lambda: client.get("/events")),
+    ("second GET", lambda: client.get("/events", query_string={"after": "0"})),
+    ("first POST", lambda: client.post("/events", data={"name": "startup"})),
+]:
+    before = time.perf_counter()
+    request()
+    timings[name] = time.perf_counter() - before
+timings["total"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def run_worker(database: str, warm_up: bool) -> dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER, database, "1" if warm_up else "0"],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    ).stdout
+    return json.loads(output)
+
+
+def slowest_imports(count: int) -> list[tuple[int, str]]:
+    """The modules imported by the Flask app taking longest, in µs"""
+    stderr = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import slidow.entrypoints.flask_app",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    ).stderr
+    imports = []
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        # two spaces of indentation per level of nesting, after one
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1 or name.strip().startswith("slidow."):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(events: int = EVENTS, runs: int = RUNS) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        data = suite.seed(directory, events)
+        data.engine.dispose()
+        for warm_up in (False, True):
+            samples = [run_worker(data.database, warm_up) for _ in range(runs)]
+            print(f"WARM_UP={warm_up}, median of {runs} runs:")
+            for phase in samples[0]:
+                median = statistics.median(sample[phase] for sample in samples)
+                print(f"  {phase:>12}: {median * 1e3:7.1f} ms")
+    print("slowest imports:")
+    for cumulative, name in slowest_imports(SLOWEST_IMPORTS):
+        print(f"  {cumulative / 1e3:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
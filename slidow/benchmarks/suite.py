@@ -0,0 +1,306 @@
+"""Regression benchmarks for the repos, services and Flask app
+
+Times each case against a SQLite file seeded with 1k, 100k and 1M
+events, and quizzes of three questions of four options, one for every
+hundred events. Results are written as JSON, and a run can be compared
+with an earlier one, exiting non-zero when a case's median slowed down
+by more than the threshold:
+
+    python -m slidow.benchmarks.suite --output baseline.json
+    python -m slidow.benchmarks.suite --compare baseline.json
+
+The other modules of slidow.benchmarks explore single optimizations
+and print for humans; this one tracks the main paths from run to run.
+"""
+
+import argparse
+import dataclasses
+import datetime
+import importlib.metadata
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+import sqlalchemy
+from sqlalchemy import Engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from slidow import identifiers
+from slidow.adapters import engine, orm, repos
+from slidow.entrypoints.flask_app import create_app
+from slidow.service_layer import services, unit_of_work
+
+SIZES = (1_000, 100_000, 1_000_000)
+SCHEMA_VERSION = 1
+# each case runs for at least MIN_TIME seconds, in at most MAX_CALLS calls
+MIN_TIME = 0.5
+MAX_CALLS = 1_000
+THRESHOLD = 0.2
+INSERT_BATCH = 10_000
+
+
+@dataclasses.dataclass
+class Result:
+    name: str
+    rows: int
+    calls: int
+    min_us: float
+    median_us: float
+    mean_us: float
+    p95_us: float
+
+
+@dataclasses.dataclass
+class Comparison:
+    name: str
+    rows: int
+    baseline_us: float
+    current_us: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_us / self.baseline_us
+
+    def regressed(self, threshold: float) -> bool:
+        return self.ratio > 1 + threshold
+
+
+class Dataset(typing.NamedTuple):
+    database: str
+    engine: Engine
+    event_ids: list[str]
+    quiz_ids: list[str]
+
+
+def measure(
+    name: str, rows: int, func: typing.Callable[[], typing.Any], min_time: float
+) -> Result:
+    """Time calls to `func`, after one to warm up, in microseconds"""
+    func()
+    samples: list[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < MAX_CALLS and (not samples or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return Result(
+        name=name,
+        rows=rows,
+        calls=len(samples),
+        min_us=samples[0],
+        median_us=statistics.median(samples),
+        mean_us=statistics.fmean(samples),
+        p95_us=samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    )
+
+
+def seed(directory: str, rows: int) -> Dataset:
+    database = os.path.join(directory, f"bench-{rows}.sqlite")
+    db_engine = engine.create_sqlite_engine(database)
+    orm.mapper_registry.metadata.create_all(db_engine)
+    event_ids = identifiers.new_identifiers(rows)
+    quiz_ids = identifiers.new_identifiers(max(rows // 100, 1))
+    with db_engine.begin() as conn:
+        for start in range(0, rows, INSERT_BATCH):
+            conn.execute(
+                insert(orm.events_table),
+                [
+                    {"identifier": identifier, "name": "Event"}
+                    for identifier in event_ids[start : start + INSERT_BATCH]
+                ],
+            )
+        conn.execute(
+            insert(orm.quizzes_table),
+            [
+                {"id": number, "identifier": identifier, "title": "Quiz"}
+                for number, identifier in enumerate(quiz_ids, 1)
+            ],
+        )
+        questions = range(1, len(quiz_ids) * 3 + 1)
+        conn.execute(
+            insert(orm.questions_table),
+            [
+                {"id": number, "quiz_id": (number - 1) // 3 + 1, "text": "Question"}
+                for number in questions
+            ],
+        )
+        conn.execute(
+            insert(orm.options_table),
+            [
+                {"question_id": question, "text": "Option", "correct": option == 0}
+                for question in questions
+                for option in range(4)
+            ],
+        )
+    return Dataset(database, db_engine, event_ids, quiz_ids)
+
+
+def cycle(values: list[str]) -> typing.Callable[[], str]:
+    """Return a function that steps through `values`, spread over the table"""
+    step = max(len(values) // 997, 1)
+    position = 0
+
+    def next_value() -> str:
+        nonlocal position
+        position = (position + step) % len(values)
+        return values[position]
+
+    return next_value
+
+
+def repo_cases(
+    data: Dataset,
+) -> dict[str, typing.Callable[[], typing.Any]]:
+    session_factory = sessionmaker(bind=data.engine, expire_on_commit=False)
+    next_event, next_quiz = cycle(data.event_ids), cycle(data.quiz_ids)
+
+    def event_get() -> None:
+        with Session(data.engine) as session:
+            repos.EventSQLAlchemyRepo(session).get(next_event())
+
+    def event_list() -> None:
+        with Session(data.engine) as session:
+            for _ in repos.EventSQLAlchemyRepo(session).list():
+                pass
+
+    def quiz_load() -> None:
+        with Session(data.engine) as session:
+            quiz = repos.QuizSQLAlchemyRepo(session).get(next_quiz(), load="full")
+            for question in quiz.questions:
+                len(question.options)
+
+    def add_event() -> None:
+        services.add_event("Benchmark", unit_of_work.SQLAlchemyUOW(session_factory))
+
+    def get_events() -> None:
+        with Session(data.engine) as session:
+            services.get_events(repos.EventSQLAlchemyRepo(session), after=next_event())
+
+    return {
+        "services.add_event": add_event,
+        "services.get_events": get_events,
+        "EventSQLAlchemyRepo.get": event_get,
+        "EventSQLAlchemyRepo.list": event_list,
+        "QuizSQLAlchemyRepo.get_full": quiz_load,
+    }
+
+
+def flask_cases(data: Dataset) -> dict[str, typing.Callable[[], typing.Any]]:
+    app = create_app({"TESTING": True, "DATABASE": data.database})
+    client = app.test_client()
+    next_event = cycle(data.event_ids)
+
+    def get_events() -> None:
+        response = client.get("/events", query_string={"after": next_event()})
+        assert response.status_code == 200, response.status_code
+
+    def post_event() -> None:
+        response = client.post("/events", data={"name": "Benchmark"})
+        assert response.status_code == 302, response.status_code
+
+    return {"GET /events": get_events, "POST /events": post_event}
+
+
+def run(
+    sizes: typing.Iterable[int],
+    min_time: float = MIN_TIME,
+    only: str | None = None,
+) -> list[Result]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            data = seed(directory, rows)
+            cases = {**repo_cases(data), **flask_cases(data)}
+            for name, func in cases.items():
+                if only and only not in name:
+                    continue
+                result = measure(name, rows, func, min_time)
+                print(
+                    f"{rows:>9} {name:<28} {result.median_us:12.1f} us median"
+                    f" ({result.calls} calls)",
+                    file=sys.stderr,
+                )
+                results.append(result)
+            data.engine.dispose()
+    return results
+
+
+def environment() -> dict[str, str]:
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "flask": importlib.metadata.version("flask"),
+    }
+
+
+def to_json(results: list[Result]) -> dict:
+    return {
+        "schema": SCHEMA_VERSION,
+        "environment": environment(),
+        "results": [dataclasses.asdict(result) for result in results],
+    }
+
+
+def compare(baseline: dict, current: dict) -> list[Comparison]:
+    """Pair up the cases both runs measured by name and row count"""
+    before = {
+        (result["name"], result["rows"]): result["median_us"]
+        for result in baseline["results"]
+    }
+    return [
+        Comparison(
+            result["name"],
+            result["rows"],
+            before[(result["name"], result["rows"])],
+            result["median_us"],
+        )
+        for result in current["results"]
+        if (result["name"], result["rows"]) in before
+    ]
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m slidow.benchmarks.suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--only", help="run the cases whose name contains this")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results in this file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    current = to_json(run(args.sizes, args.min_time, args.only))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+    else:
+        json.dump(current, sys.stdout, indent=2)
+        print()
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as file:
+        baseline = json.load(file)
+    regressions = 0
+    for comparison in compare(baseline, current):
+        regressed = comparison.regressed(args.threshold)
+        regressions += regressed
+        print(
+            f"{comparison.rows:>9} {comparison.name:<28}"
+            f" {comparison.baseline_us:12.1f} -> {comparison.current_us:12.1f} us"
+            f" x{comparison.ratio:5.2f}{'  REGRESSED' if regressed else ''}",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
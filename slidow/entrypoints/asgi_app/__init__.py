@@ -0,0 +1,320 @@
+"""ASGI entrypoint for the live quiz paths
+
+Response ingestion, question broadcast and the event listing run as
+coroutines on a single event loop, on top of the asyncio unit of work.
+Serve it with any ASGI server, e.g.
+
+    uvicorn --factory slidow.entrypoints.asgi_app:create_app
+
+By default it serves the Flask app's development database, and creates
+the schema on startup if it is missing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import typing
+import urllib.parse
+
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import slidow
+from slidow.adapters import engine, orm, repos, versioning
+from slidow.service_layer import (
+    async_services,
+    broadcast,
+    grading,
+    launch,
+    responses,
+    services,
+    unit_of_work,
+)
+
+MAX_PAGE_SIZE = 100
+# the instance folder of the Flask app, run from a checkout
+INSTANCE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(slidow.__file__))), "instance"
+)
+KEEPALIVE_SECONDS = 15.0
+
+logger = logging.getLogger(__name__)
+
+Handler = typing.Callable[..., typing.Awaitable[tuple[int, typing.Any]]]
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, msg: str = "") -> None:
+        self.status = status
+        self.msg = msg
+
+
+class SlidowASGI:
+
+    def __init__(
+        self, database: str, profile: engine.SQLiteProfile | str = "default"
+    ) -> None:
+        self.engine = engine.create_async_sqlite_engine(database, profile)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.versions = versioning.DataVersions()
+        self.broadcaster = broadcast.AsyncBroadcaster()
+        self.collector = responses.AsyncResponseCollector(self.uow())
+        self.launched_quizzes: dict[str, launch.QuizSnapshot] = {}
+        self.routes: list[tuple[str, re.Pattern, Handler]] = [
+            ("GET", re.compile(r"/events"), self.list_events),
+            ("POST", re.compile(r"/events"), self.add_event),
+            ("POST", re.compile(r"/quizzes/([^/]+)/launch"), self.launch_quiz),
+            (
+                "POST",
+                re.compile(r"/quizzes/([^/]+)/questions/(\d+)/publish"),
+                self.publish_question,
+            ),
+            (
+                "POST",
+                re.compile(r"/quizzes/([^/]+)/questions/(\d+)/responses"),
+                self.submit_response,
+            ),
+            (
+                "POST",
+                re.compile(r"/quizzes/([^/]+)/questions/(\d+)/close"),
+                self.close_question,
+            ),
+            ("POST", re.compile(r"/quizzes/([^/]+)/close"), self.close_quiz),
+        ]
+        self.stream_route = re.compile(r"/quizzes/([^/]+)/stream")
+
+    def uow(self) -> unit_of_work.AsyncSQLAlchemyUOW:
+        return unit_of_work.AsyncSQLAlchemyUOW(self.session_factory, self.versions)
+
+    async def startup(self) -> None:
+        async with self.engine.begin() as connection:
+            await connection.run_sync(orm.mapper_registry.metadata.create_all)
+            await connection.run_sync(orm.create_indexes)
+        self.collector.start()
+
+    async def shutdown(self) -> None:
+        await self.collector.stop()
+        await self.engine.dispose()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path, method = scope["path"], scope["method"]
+        if method == "GET" and (match := self.stream_route.fullmatch(path)):
+            await self.stream_quiz(receive, send, match.group(1))
+            return
+
+        for route_method, pattern, handler in self.routes:
+            if route_method == method and (match := pattern.fullmatch(path)):
+                break
+        else:
+            await _send_json(send, 404, {"error": "Not Found"})
+            return
+        request = {
+            "query": urllib.parse.parse_qs(scope["query_string"].decode()),
+            "body": await _read_body(receive),
+        }
+        try:
+            status, payload = await handler(request, *match.groups())
+        except HTTPError as err:
+            status, payload = err.status, {"error": err.msg}
+        await _send_json(send, status, payload)
+
+    async def list_events(self, request) -> tuple[int, typing.Any]:
+        limit = _int_arg(request["query"], "limit", services.DEFAULT_PAGE_SIZE)
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        after = request["query"].get("after", [None])[0]
+        async with self.session_factory() as session:
+            repo = repos.AsyncEventSQLAlchemyRepo(session)
+            events = await async_services.get_events(repo, limit, after)
+        return 200, [{"identifier": i, "name": name} for i, name in events]
+
+    async def add_event(self, request) -> tuple[int, typing.Any]:
+        name = _json_body(request).get("name")
+        if not isinstance(name, str):
+            raise HTTPError(400, "Event name is required")
+        try:
+            identifier = await async_services.add_event(name, self.uow())
+        except services.InvalidEventNameError as err:
+            raise HTTPError(400, err.msg)
+        return 201, {"identifier": identifier}
+
+    async def launch_quiz(self, request, identifier: str) -> tuple[int, typing.Any]:
+        try:
+            snapshot = await async_services.launch_quiz(identifier, self.uow())
+        except NoResultFound:
+            raise HTTPError(404, "Quiz not found")
+        except grading.TooManyOptionsError as err:
+            raise HTTPError(422, err.msg)
+        self.launched_quizzes[identifier] = snapshot
+        return 201, {"quiz": identifier, "questions": len(snapshot)}
+
+    async def publish_question(
+        self, request, identifier: str, index: str
+    ) -> tuple[int, typing.Any]:
+        snapshot = self._snapshot(identifier, int(index))
+        # a closed question stays closed when it is shown again
+        if not self.collector.is_closed(identifier, int(index)):
+            self.collector.open_question(identifier, int(index))
+        frame = broadcast.sse_frame(snapshot.question(int(index)))
+        sequence = self.broadcaster.publish(identifier, frame)
+        return 200, {"quiz": identifier, "sequence": sequence}
+
+    async def submit_response(
+        self, request, identifier: str, index: str
+    ) -> tuple[int, typing.Any]:
+        snapshot = self._snapshot(identifier, int(index))
+        body = _json_body(request)
+        participant, selected = body.get("participant"), body.get("selected")
+        # bool is a subclass of int, but not a selection
+        if (
+            not isinstance(participant, str)
+            or not isinstance(selected, int)
+            or isinstance(selected, bool)
+        ):
+            raise HTTPError(400, "participant and selected are required")
+        if not snapshot.is_selection(int(index), selected):
+            raise HTTPError(400, "selected must be a bitmask of the options")
+        try:
+            accepted = self.collector.submit(
+                participant, identifier, int(index), selected
+            )
+        except responses.QuestionClosedError as err:
+            raise HTTPError(409, err.msg)
+        return 202, {"accepted": accepted}
+
+    async def close_question(
+        self, request, identifier: str, index: str
+    ) -> tuple[int, typing.Any]:
+        await self.collector.close_question(identifier, int(index))
+        return 200, {"quiz": identifier, "question": int(index)}
+
+    async def close_quiz(self, request, identifier: str) -> tuple[int, typing.Any]:
+        self.broadcaster.close(identifier)
+        return 200, {"quiz": identifier}
+
+    async def stream_quiz(self, receive, send, identifier: str) -> None:
+        if identifier not in self.launched_quizzes:
+            await _send_json(send, 404, {"error": "Quiz not launched"})
+            return
+        subscription = self.broadcaster.subscribe(identifier, timeout=KEEPALIVE_SECONDS)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"retry: 3000\n\n",
+                "more_body": True,
+            }
+        )
+
+        async def forward() -> None:
+            async for frame in subscription:
+                body = b": keepalive\n\n" if frame is None else frame
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": True}
+                )
+
+        async def disconnected() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        forwarding = asyncio.ensure_future(forward())
+        disconnect = asyncio.ensure_future(disconnected())
+        await asyncio.wait(
+            {forwarding, disconnect}, return_when=asyncio.FIRST_COMPLETED
+        )
+        disconnect.cancel()
+        if forwarding.done():
+            await send({"type": "http.response.body", "body": b""})
+        else:
+            forwarding.cancel()
+
+    def _snapshot(self, identifier: str, index: int) -> launch.QuizSnapshot:
+        snapshot = self.launched_quizzes.get(identifier)
+        if snapshot is None or index >= len(snapshot):
+            raise HTTPError(404, "Question not found")
+        return snapshot
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as err:
+                    logger.exception("Startup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(err)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_app(
+    database: str | None = None, profile: engine.SQLiteProfile | str | None = None
+) -> SlidowASGI:
+    if database is None:
+        database = os.environ.get("SLIDOW_DATABASE")
+    if database is None:
+        os.makedirs(INSTANCE_PATH, exist_ok=True)
+        database = os.path.join(INSTANCE_PATH, "slidow-dev.sqlite")
+    if profile is None:
+        profile = os.environ.get("SLIDOW_SQLITE_PROFILE", "default")
+    return SlidowASGI(database, profile)
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+def _json_body(request) -> dict:
+    try:
+        body = json.loads(request["body"] or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Invalid JSON")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return body
+
+
+def _int_arg(query: dict[str, list[str]], name: str, default: int) -> int:
+    try:
+        return int(query[name][0])
+    except (KeyError, ValueError):
+        return default
+
+
+async def _send_json(send, status: int, payload: typing.Any) -> None:
+    body = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
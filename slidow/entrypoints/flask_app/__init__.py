@@ -1,79 +1,394 @@
+import dataclasses
+import functools
 import os
+import time
+import typing
 
 import click
 from flask import (
     Blueprint,
     Flask,
+    Response,
+    abort,
     current_app,
     flash,
     g,
+    make_response,
     redirect,
     render_template,
     request,
+    session,
     url_for,
 )
-from sqlalchemy import create_engine
+from flask.cli import with_appcontext
+from markupsafe import Markup
+from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import scoped_session, sessionmaker
+from werkzeug.http import is_resource_modified
 
-from slidow.adapters import orm, repos
-from slidow.service_layer import services, unit_of_work
+from slidow.adapters import (
+    caching,
+    engine,
+    fragments,
+    metrics,
+    orm,
+    profiling,
+    repos,
+    sharding,
+    versioning,
+    warmup,
+)
+from slidow.service_layer import broadcast, grading, launch, services, unit_of_work
 
 slidow_bp = Blueprint("slidow", __name__)
 
+MAX_PAGE_SIZE = 100
+KEEPALIVE_SECONDS = 15.0
+
+
+@dataclasses.dataclass
+class LiveQuizzes:
+    """The app's runtime state of live quizzes, kept in app.extensions"""
+
+    launched_quizzes: dict[str, launch.QuizSnapshot] = dataclasses.field(
+        default_factory=dict
+    )
+    broadcaster: broadcast.Broadcaster = dataclasses.field(
+        default_factory=broadcast.Broadcaster
+    )
+
 
 @slidow_bp.route("/", methods=("GET",))
 def root():
     return "<p> Welcome to slidow!</p>"
 
 
+def get_data_version(*names: str) -> versioning.Version | None:
+    """The versions of the named data, as read by this request
+
+    None with shards, whose writes do not bump the primary's versions."""
+    if current_app.config["SHARD_SESSION_FACTORIES"]:
+        return None
+    if "data_versions" not in g:
+        g.data_versions = {}
+    if names not in g.data_versions:
+        g.data_versions[names] = current_app.config["DATA_VERSIONS"].read(
+            get_db_session(), *names
+        )
+    return g.data_versions[names]
+
+
+def conditional(*names: str):
+    """Answer GETs with 304 Not Modified while the named data is unchanged
+
+    Responses carry an ETag and Last-Modified from the data's versions,
+    which are read without running the view."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def conditional_view(*args, **kwargs):
+            # a pending flash message is rendered into the page
+            if request.method != "GET" or "_flashes" in session:
+                return view(*args, **kwargs)
+            version = get_data_version(*names)
+            if version is None:
+                return view(*args, **kwargs)
+            if not is_resource_modified(
+                request.environ, etag=version.etag, last_modified=version.last_modified
+            ):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(version.etag, weak=True)
+            response.last_modified = version.last_modified
+            return response
+
+        return conditional_view
+
+    return decorator
+
+
+def render_fragment(
+    template: str,
+    names: tuple[str, ...],
+    key: tuple,
+    context: typing.Callable[[], dict],
+) -> Markup:
+    """Render a partial template, cached by the version of the named data
+
+    `key` holds whatever else the fragment depends on, e.g. a page
+    cursor. `context` is only called to render a miss, so it should be
+    what queries the data."""
+    version = get_data_version(*names)
+    if version is None:
+        return Markup(render_template(template, **context()))
+    fragment = current_app.config["FRAGMENT_CACHE"].get_or_render(
+        (template, version.etag, *key),
+        lambda: render_template(template, **context()),
+    )
+    return Markup(fragment)
+
+
 @slidow_bp.route("/events", methods=("GET", "POST"))
+@conditional("events")
 def events_list():
 
     status_code: int = 200
 
-    session_factory = get_db_session_factory()
-
     if request.method == "POST":
         event_name = request.form.get("name")
         if event_name is not None:
-            sqlalchemy_uow = unit_of_work.SQLAlchemyUOW(session_factory)
             try:
-                services.add_event(event_name, sqlalchemy_uow)
+                services.add_event(event_name, get_write_uow())
             except services.InvalidEventNameError as err:
                 flash(err.msg)
             else:
+                mark_written()
                 return redirect(url_for("slidow.events_list"))
         else:
             flash("Event name is required", "error")
         status_code = 400
 
-    session = get_db_session()
-    events_repo = repos.EventSQLAlchemyRepo(session)
-    events = services.get_events(events_repo)
-    return render_template("events.html", events=events), status_code
+    limit = request.args.get("limit", services.DEFAULT_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    after = request.args.get("after")
+
+    def listing_context() -> dict:
+        events = services.get_events(get_events_repo(), limit, after)
+        next_after = events[-1][0] if len(events) == limit else None
+        return dict(events=events, limit=limit, next_after=next_after)
+
+    listing = render_fragment(
+        "_events.html", ("events",), (limit, after), listing_context
+    )
+    return render_template("events.html", listing=listing), status_code
+
+
+@slidow_bp.route("/quizzes/<identifier>/launch", methods=("POST",))
+def launch_quiz(identifier: str):
+    try:
+        snapshot = services.launch_quiz(identifier, get_read_uow())
+    except NoResultFound:
+        abort(404)
+    except grading.TooManyOptionsError as err:
+        return {"error": err.msg}, 422
+    get_launched_quizzes()[identifier] = snapshot
+    return {"quiz": identifier, "questions": len(snapshot)}, 201
+
+
+@slidow_bp.route("/quizzes/<identifier>/questions/<int:index>", methods=("GET",))
+def quiz_question(identifier: str, index: int):
+    snapshot = get_launched_quizzes().get(identifier)
+    if snapshot is None or index >= len(snapshot):
+        abort(404)
+    return Response(snapshot.question(index), mimetype="application/json")
+
+
+@slidow_bp.route(
+    "/quizzes/<identifier>/questions/<int:index>/publish", methods=("POST",)
+)
+def publish_question(identifier: str, index: int):
+    snapshot = get_launched_quizzes().get(identifier)
+    if snapshot is None or index >= len(snapshot):
+        abort(404)
+    frame = broadcast.sse_frame(snapshot.question(index))
+    sequence = get_broadcaster().publish(identifier, frame)
+    return {"quiz": identifier, "sequence": sequence}
+
+
+@slidow_bp.route("/quizzes/<identifier>/close", methods=("POST",))
+def close_quiz(identifier: str):
+    get_broadcaster().close(identifier)
+    return "", 204
+
+
+@slidow_bp.route("/quizzes/<identifier>/stream", methods=("GET",))
+def quiz_stream(identifier: str):
+    if identifier not in get_launched_quizzes():
+        abort(404)
+    subscription = get_broadcaster().subscribe(identifier, timeout=KEEPALIVE_SECONDS)
+
+    def frames():
+        # sent straight away so the response headers reach the client
+        yield b"retry: 3000\n\n"
+        for frame in subscription:
+            yield b": keepalive\n\n" if frame is None else frame
+
+    return Response(
+        frames(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@slidow_bp.route("/metrics", methods=("GET",))
+def metrics_endpoint():
+    registry = current_app.config.get("METRICS_REGISTRY")
+    if registry is None:
+        abort(404)
+    text = registry.render()
+    text += metrics.render_stats(
+        "slidow_aggregate_cache", current_app.config["AGGREGATE_CACHE"].stats()
+    )
+    text += metrics.render_stats(
+        "slidow_fragment_cache", current_app.config["FRAGMENT_CACHE"].stats()
+    )
+    return Response(text, mimetype="text/plain; version=0.0.4")
+
+
+def get_launched_quizzes() -> dict[str, launch.QuizSnapshot]:
+    """Snapshots of the app's launched quizzes, by quiz identifier"""
+    return current_app.extensions["slidow"].launched_quizzes
+
+
+def get_broadcaster() -> broadcast.Broadcaster:
+    return current_app.extensions["slidow"].broadcaster
 
 
 def get_db_session():
+    """The request's session for reads, bound to a replica if any"""
     if "db_session" not in g:
-        Session = current_app.config["DB_SESSION_FACTORY"]
-        g.db_session = Session()
+        Session = current_app.config["DB_READ_SESSION_FACTORY"]
+        router = current_app.config["DB_ROUTER"]
+        g.db_session = Session(bind=router.read_engine(session.get("wrote_at")))
     return g.db_session
 
 
 def get_db_session_factory():
+    """Session factory for units of work that write, bound to the primary"""
     return current_app.config["DB_SESSION_FACTORY"]
 
 
+def get_read_session_factory(bind=None):
+    """Session factory for read-only units of work, bound to `bind` or
+    to the engine the router picks"""
+    Session = current_app.config["DB_READ_SESSION_FACTORY"].session_factory
+    if bind is None:
+        bind = current_app.config["DB_ROUTER"].read_engine(session.get("wrote_at"))
+    return functools.partial(Session, bind=bind)
+
+
+def mark_written():
+    """Send this client's reads to the primary until replicas catch up"""
+    if current_app.config["DB_ROUTER"].replicas:
+        session["wrote_at"] = current_app.config["DB_ROUTER"].clock()
+
+
+def get_shard_sessions() -> list:
+    if "shard_sessions" not in g:
+        factories = current_app.config["SHARD_SESSION_FACTORIES"]
+        g.shard_sessions = [factory() for factory in factories]
+    return g.shard_sessions
+
+
+def get_events_repo() -> repos.AbstractRepo:
+    """The events repo for listing, merged across shards if any"""
+    if current_app.config["SHARD_SESSION_FACTORIES"]:
+        return sharding.ShardedEventRepo(
+            [repos.EventSQLAlchemyRepo(s) for s in get_shard_sessions()]
+        )
+    return repos.EventSQLAlchemyRepo(get_db_session())
+
+
+def get_read_uow() -> unit_of_work.AbstractUOW:
+    """A unit of work for read-only service calls"""
+    if factories := current_app.config["SHARD_SESSION_FACTORIES"]:
+        return unit_of_work.ShardedSQLAlchemyUOW(factories)
+    router = current_app.config["DB_ROUTER"]
+    bind = router.read_engine(session.get("wrote_at"))
+    # replicas may lag, so only reads from the primary fill the cache
+    return unit_of_work.SQLAlchemyUOW(
+        get_read_session_factory(bind),
+        cache=current_app.config["AGGREGATE_CACHE"],
+        fill_cache=bind is router.primary,
+    )
+
+
+def get_write_uow() -> unit_of_work.AbstractUOW:
+    """A unit of work for small writes, batched when GROUP_COMMIT is set"""
+    if factories := current_app.config["SHARD_SESSION_FACTORIES"]:
+        return unit_of_work.ShardedSQLAlchemyUOW(factories)
+    committer = current_app.config.get("GROUP_COMMITTER")
+    if committer is not None:
+        return unit_of_work.BatchingUOW(committer, get_db_session_factory())
+    return unit_of_work.SQLAlchemyUOW(
+        get_db_session_factory(),
+        cache=current_app.config["AGGREGATE_CACHE"],
+        versions=current_app.config["DATA_VERSIONS"],
+    )
+
+
+def get_bulk_uow() -> unit_of_work.AbstractUOW:
+    """A unit of work for importing and exporting, over the shards if any"""
+    if factories := current_app.config["SHARD_SESSION_FACTORIES"]:
+        return unit_of_work.ShardedSQLAlchemyUOW(factories)
+    return unit_of_work.SQLAlchemyUOW(
+        get_db_session_factory(),
+        cache=current_app.config["AGGREGATE_CACHE"],
+        versions=current_app.config["DATA_VERSIONS"],
+    )
+
+
 def close_db(e=None):
     g.pop("db_session", None)
-    Session = current_app.config["DB_SESSION_FACTORY"]
-    Session.remove()
+    for shard_session in g.pop("shard_sessions", []):
+        shard_session.close()
+    current_app.config["DB_SESSION_FACTORY"].remove()
+    current_app.config["DB_READ_SESSION_FACTORY"].remove()
+
+
+def start_request_metrics():
+    metrics.start_request(request.endpoint)
+
+
+def finish_request_metrics(response):
+    if (stats := metrics.current_request()) is not None:
+        registry = current_app.config["METRICS_REGISTRY"]
+        registry.finish_request(stats, request.method, response.status_code)
+    return response
+
+
+def fail_request_metrics(e=None):
+    # after_request is skipped when a view raises
+    if (stats := metrics.current_request()) is not None:
+        registry = current_app.config["METRICS_REGISTRY"]
+        registry.finish_request(stats, request.method, 500)
+
+
+def start_query_log():
+    g.query_log = current_app.config["QUERY_PROFILER"].start()
+
+
+def report_query_log(e=None):
+    log = g.pop("query_log", None)
+    if log is None:
+        return
+    current_app.config["QUERY_PROFILER"].stop(log)
+    for problem in log.problems():
+        current_app.logger.warning("%s %s: %s", request.method, request.path, problem)
 
 
 def init_db():
-    Session = get_db_session()
-    engine = Session.get_bind()
-    orm.mapper_registry.metadata.create_all(engine)
+    primary = get_db_session_factory().get_bind()
+    for db_engine in (primary, *current_app.config["SHARD_ENGINES"]):
+        orm.mapper_registry.metadata.create_all(db_engine)
+        orm.create_indexes(db_engine)
+
+
+def warm_up(app: Flask, engines: typing.Iterable) -> warmup.WarmUpReport:
+    """Prepare the app's engines and templates before it serves requests"""
+    report = warmup.warm_up(engines, app.config.get("WARM_UP_CONNECTIONS"))
+    started = time.perf_counter()
+    for template in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template)
+    report.seconds["templates"] = time.perf_counter() - started
+    app.logger.info(
+        "warmed up in %.1f ms: %d connections, %d statements",
+        report.total * 1e3,
+        report.connections,
+        report.statements,
+    )
+    return report
 
 
 @click.command("init-db")
@@ -82,10 +397,34 @@ def init_db_command():
     click.echo("Initialized the DB")
 
 
+@click.command("import-quizzes")
+@click.argument("file", type=click.File("r"))
+@with_appcontext
+def import_quizzes_command(file):
+    """Import quizzes from a JSON Lines FILE"""
+    try:
+        count = services.import_quizzes(file, get_bulk_uow())
+    except services.InvalidQuizDocumentError as err:
+        raise click.ClickException(err.msg)
+    click.echo(f"Imported {count} quizzes")
+
+
+@click.command("export-quizzes")
+@click.argument("file", type=click.File("w"))
+@with_appcontext
+def export_quizzes_command(file):
+    """Export all quizzes to a JSON Lines FILE"""
+    file.writelines(services.export_quizzes(get_bulk_uow()))
+
+
 def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
-        SECRET_KEY="dev", DATABASE=os.path.join(app.instance_path, "slidow-dev.sqlite")
+        SECRET_KEY="dev",
+        DATABASE=os.path.join(app.instance_path, "slidow-dev.sqlite"),
+        SQLITE_PROFILE="default",
+        METRICS=True,
+        WARM_UP=True,
     )
     if test_config is None:
         app.config.from_pyfile("config.py", silent=True)
@@ -94,11 +433,105 @@ def create_app(test_config=None):
         if db_name := test_config.get("db_name"):
             app.config.from_mapping(DATABASE=os.path.join(app.instance_path, db_name))
 
+    # Connections count the rows they fetch for METRICS
+    engine_options = metrics.engine_options() if app.config["METRICS"] else {}
+
     # Create a scoped session factory for use in views
-    db_engine = create_engine("sqlite:///" + app.config["DATABASE"])
+    # SQLITE_PROFILE names one of engine.PROFILES or is a SQLiteProfile
+    db_engine = engine.create_sqlite_engine(
+        app.config["DATABASE"], app.config["SQLITE_PROFILE"], **engine_options
+    )
     Session = scoped_session(sessionmaker(bind=db_engine, expire_on_commit=False))
     app.config.from_mapping(DB_SESSION_FACTORY=Session)
 
+    # Reads go to REPLICA_DATABASES, if any, except for READ_YOUR_WRITES
+    # seconds after the same client wrote
+    replicas = [
+        engine.create_sqlite_engine(
+            path, app.config["SQLITE_PROFILE"], **engine_options
+        )
+        for path in app.config.get("REPLICA_DATABASES", [])
+    ]
+    router = engine.ReplicaRouter(
+        db_engine, replicas, app.config.get("READ_YOUR_WRITES", 5.0)
+    )
+    ReadSession = scoped_session(sessionmaker(expire_on_commit=False))
+    app.config.from_mapping(DB_ROUTER=router, DB_READ_SESSION_FACTORY=ReadSession)
+
+    # Events, quizzes and responses are hashed over SHARD_DATABASES, if
+    # set, instead of being kept in DATABASE
+    shard_engines = [
+        engine.create_sqlite_engine(
+            path, app.config["SQLITE_PROFILE"], **engine_options
+        )
+        for path in app.config.get("SHARD_DATABASES", [])
+    ]
+    shard_factories = [
+        sessionmaker(bind=shard_engine, expire_on_commit=False)
+        for shard_engine in shard_engines
+    ]
+    app.config.from_mapping(
+        SHARD_ENGINES=shard_engines, SHARD_SESSION_FACTORIES=shard_factories
+    )
+
+    # Versions of the data, bumped on commit, for conditional GETs
+    versions = versioning.DataVersions()
+    app.config.from_mapping(DATA_VERSIONS=versions)
+
+    # Events and quizzes read by identifier, invalidated on commit
+    aggregate_cache = caching.AggregateCache()
+    app.config.from_mapping(AGGREGATE_CACHE=aggregate_cache)
+
+    # Concurrent small writes share transactions when GROUP_COMMIT is set
+    if app.config.get("GROUP_COMMIT"):
+        committer = unit_of_work.GroupCommitter(
+            sessionmaker(bind=db_engine, expire_on_commit=False),
+            versions=versions,
+            cache=aggregate_cache,
+        )
+        app.config.from_mapping(GROUP_COMMITTER=committer)
+
+    # Snapshots of launched quizzes, served without touching the db, and
+    # the channels their questions are broadcast on
+    app.extensions["slidow"] = LiveQuizzes()
+
+    # Rendered fragments keyed by data version, shared between worker
+    # processes through FRAGMENT_CACHE_DIR if set
+    fragment_store = None
+    if fragment_dir := app.config.get("FRAGMENT_CACHE_DIR"):
+        fragment_store = fragments.FileFragmentStore(fragment_dir)
+    app.config.from_mapping(
+        FRAGMENT_CACHE=fragments.FragmentCache(
+            app.config.get("FRAGMENT_CACHE_BYTES", 8 << 20), fragment_store
+        )
+    )
+
+    # Latency, SQL and commit metrics per endpoint, served at /metrics
+    if app.config["METRICS"]:
+        registry = metrics.Metrics()
+        for instrumented in (db_engine, *replicas, *shard_engines):
+            registry.instrument_engine(instrumented)
+        for factory in (Session, ReadSession, *shard_factories):
+            registry.instrument_sessions(factory)
+        if "GROUP_COMMITTER" in app.config:
+            registry.instrument_sessions(app.config["GROUP_COMMITTER"].session_factory)
+        app.config.from_mapping(METRICS_REGISTRY=registry)
+        app.before_request(start_request_metrics)
+        app.after_request(finish_request_metrics)
+        app.teardown_request(fail_request_metrics)
+
+    # QUERY_PROFILING logs likely N+1 loops, and statements slower than
+    # SLOW_QUERY_SECONDS, of each request; meant for staging, not production
+    if app.config.get("QUERY_PROFILING"):
+        profiler = profiling.QueryProfiler(
+            app.config.get("SLOW_QUERY_SECONDS", profiling.SLOW_SECONDS)
+        )
+        for instrumented in (db_engine, *replicas, *shard_engines):
+            profiler.instrument(instrumented)
+        app.config.from_mapping(QUERY_PROFILER=profiler)
+        app.before_request(start_query_log)
+        app.teardown_request(report_query_log)
+
     # create instance folder in dev
     try:
         os.makedirs(app.instance_path)
@@ -109,4 +542,13 @@ def create_app(test_config=None):
     app.register_blueprint(slidow_bp)
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(import_quizzes_command)
+    app.cli.add_command(export_quizzes_command)
+
+    # WARM_UP configures the mappers, connects WARM_UP_CONNECTIONS per
+    # engine (by default the pool size), compiles the repos' queries and
+    # loads the templates now rather than on the first requests
+    if app.config["WARM_UP"]:
+        report = warm_up(app, (db_engine, *replicas, *shard_engines))
+        app.config.from_mapping(WARM_UP_REPORT=report)
     return app
@@ -0,0 +1,102 @@
+"""Time-sortable unique identifiers for aggregates
+
+Identifiers follow the ULID layout: a 48-bit millisecond timestamp and
+80 random bits, written as 26 Crockford base32 characters. They sort in
+creation order, so new rows land at the right-hand edge of identifier
+indexes, and an identifier doubles as a chronological keyset cursor.
+"""
+
+import os
+import threading
+import time
+import typing
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TIME_BITS = 48
+RANDOM_BITS = 80
+
+_RANDOM_LIMIT = 1 << RANDOM_BITS
+# base32 digit pairs for every 10-bit value, to encode two digits a lookup
+_PAIRS = [a + b for a in ALPHABET for b in ALPHABET]
+
+
+class IdentifierGenerator(typing.Protocol):
+    def new(self) -> str: ...
+
+    def batch(self, count: int) -> list[str]: ...
+
+
+class ULIDGenerator:
+    """Generates ULIDs that strictly increase within the process
+
+    The random part is drawn from os.urandom once per millisecond and
+    incremented for further identifiers in the same millisecond, as the
+    ULID monotonic variant does. Identifiers from one millisecond are
+    therefore guessable from each other; they are unique, not secret."""
+
+    def __init__(
+        self, clock: typing.Callable[[], int] = lambda: time.time_ns() // 1_000_000
+    ) -> None:
+        self.clock = clock
+        self._last_ms = -1
+        self._last_random = 0
+        self._lock = threading.Lock()
+
+    def new(self) -> str:
+        return self.batch(1)[0]
+
+    def batch(self, count: int) -> list[str]:
+        """Return `count` increasing identifiers, encoding the time once"""
+        with self._lock:
+            ms = self.clock()
+            if ms > self._last_ms:
+                first = _random()
+            else:
+                ms, first = self._last_ms, self._last_random + 1
+            if first + count > _RANDOM_LIMIT:
+                # borrow the next millisecond rather than wrap around
+                ms, first = ms + 1, _random() >> 1
+            self._last_ms, self._last_random = ms, first + count - 1
+        prefix = _encode_time(ms)
+        return [prefix + _encode_random(value) for value in range(first, first + count)]
+
+
+def _random() -> int:
+    return int.from_bytes(os.urandom(RANDOM_BITS // 8))
+
+
+def _encode_time(ms: int) -> str:
+    # 48 bits padded to 50, five digit pairs
+    return "".join(_PAIRS[(ms >> shift) & 0x3FF] for shift in (40, 30, 20, 10, 0))
+
+
+def _encode_random(value: int) -> str:
+    pairs = _PAIRS
+    return (
+        pairs[value >> 70]
+        + pairs[(value >> 60) & 0x3FF]
+        + pairs[(value >> 50) & 0x3FF]
+        + pairs[(value >> 40) & 0x3FF]
+        + pairs[(value >> 30) & 0x3FF]
+        + pairs[(value >> 20) & 0x3FF]
+        + pairs[(value >> 10) & 0x3FF]
+        + pairs[value & 0x3FF]
+    )
+
+
+_generator: IdentifierGenerator = ULIDGenerator()
+
+
+def set_generator(generator: IdentifierGenerator) -> IdentifierGenerator:
+    """Use `generator` for new identifiers, returning the previous one"""
+    global _generator
+    previous, _generator = _generator, generator
+    return previous
+
+
+def new_identifier() -> str:
+    return _generator.new()
+
+
+def new_identifiers(count: int) -> list[str]:
+    return _generator.batch(count)
@@ -1,10 +1,15 @@
 """These are the slidow entities with related methods"""
 
-import random
-import string
 import typing
 from dataclasses import dataclass, field
 
+from slidow import identifiers
+
+
+def random_identifier() -> str:
+    """Return a new unique identifier, see slidow.identifiers"""
+    return identifiers.new_identifier()
+
 
 @dataclass
 class Event:
@@ -19,10 +24,8 @@ class Event:
 
     @classmethod
     def with_random_identifier(cls, event_name: str):
-        """Return an event with a randomly generated identifier"""
-        # todo: generate real randoms
-        random_str = "".join([random.choice(string.ascii_letters) for _ in range(20)])
-        return cls(random_str, event_name)
+        """Return an event with a newly generated identifier"""
+        return cls(random_identifier(), event_name)
 
 
 @dataclass
@@ -36,6 +39,11 @@ class Quiz:
             return False
         return self.identifier == other.identifier
 
+    @classmethod
+    def with_random_identifier(cls, title: str, questions: list["Question"]):
+        """Return a quiz with a newly generated identifier"""
+        return cls(random_identifier(), title, questions)
+
 
 @dataclass
 class Question:
@@ -47,3 +55,17 @@ class Question:
 class Option:
     text: str
     correct: bool = False
+
+
+@dataclass
+class Response:
+    """A participant's answer to one question of a quiz
+
+    The chosen options are kept as a bitmask of their positions in
+    the question's option list, bit 0 being the first option."""
+
+    participant: str
+    quiz_identifier: str
+    question_index: int
+    selected: int
+    answered_at: float = 0.0
@@ -0,0 +1,49 @@
+"""Coroutine versions of the services for the asyncio stack"""
+
+import typing
+
+from .. import models
+from ..adapters.repos import AbstractAsyncRepo
+from . import grading, launch, unit_of_work
+from .services import DEFAULT_PAGE_SIZE, InvalidEventNameError, get_question
+
+
+async def add_event(event_name: str, uow: unit_of_work.AbstractAsyncUOW) -> str:
+    """Adds a new event, see services.add_event"""
+    if len(event_name) == 0:
+        raise InvalidEventNameError(event_name)
+    async with uow:
+        event = models.Event.with_random_identifier(event_name)
+        await uow.events.add_all([event])
+        await uow.commit()
+    return event.identifier
+
+
+async def get_events(
+    repo: AbstractAsyncRepo, limit: int = DEFAULT_PAGE_SIZE, after: str | None = None
+) -> typing.Sequence[tuple]:
+    """Returns a page of (identifier, name) pairs, see services.get_events"""
+    return await repo.summaries(limit, after)
+
+
+async def launch_quiz(
+    quiz_identifier: str, uow: unit_of_work.AbstractAsyncUOW
+) -> launch.QuizSnapshot:
+    """Compiles a quiz into a snapshot, see services.launch_quiz"""
+    async with uow:
+        quiz = await uow.quizzes.get(quiz_identifier, load="full")
+        return launch.compile_quiz(quiz)
+
+
+async def grade_question(
+    quiz_identifier: str,
+    question_index: int,
+    uow: unit_of_work.AbstractAsyncUOW,
+    partial: bool = False,
+) -> dict[str, float]:
+    """Grades every response to a question, see services.grade_question"""
+    async with uow:
+        quiz = await uow.quizzes.get(quiz_identifier, load="full")
+        mask = grading.correct_mask(get_question(quiz, question_index))
+        selections = await uow.responses.selections(quiz_identifier, question_index)
+    return grading.grade(mask, selections, partial)
@@ -0,0 +1,245 @@
+"""Fan-out of published messages to every subscriber of a channel"""
+
+import asyncio
+import collections
+import functools
+import threading
+import typing
+
+
+class Channel:
+    """A stream of messages that any number of subscribers follow
+
+    Publishing stores the message once and wakes the subscribers, so
+    its cost does not grow with their number. Each subscriber picks up
+    every message published since it last looked, from a history of the
+    last `history` messages; one that falls further behind skips ahead.
+    A new subscriber starts from the latest message.
+
+    `on_idle` is called with the channel when its last subscriber
+    leaves before anything was published."""
+
+    def __init__(
+        self,
+        history: int = 16,
+        on_idle: typing.Callable[["Channel"], None] | None = None,
+    ) -> None:
+        self.on_idle = on_idle
+        self._condition = threading.Condition()
+        self._messages: collections.deque[tuple[int, bytes]] = collections.deque(
+            maxlen=history
+        )
+        self._sequence = 0
+        self._subscribers = 0
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def idle(self) -> bool:
+        """Whether the channel has neither subscribers nor messages"""
+        return self._subscribers == 0 and not self._messages
+
+    def publish(self, message: bytes) -> int:
+        """Publish a message, returning its sequence number"""
+        with self._condition:
+            if self._closed:
+                raise ValueError("Channel is closed")
+            self._sequence += 1
+            self._messages.append((self._sequence, message))
+            self._condition.notify_all()
+            return self._sequence
+
+    def close(self) -> None:
+        """End the stream once subscribers have received what is left"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def subscribe(self, timeout: float | None = None) -> typing.Iterator[bytes | None]:
+        """Yield messages as they are published until the channel closes
+
+        The subscription starts when this is called, not on iteration.
+        If `timeout` seconds pass without a message, None is yielded
+        so the caller can send a keep-alive."""
+        with self._condition:
+            seen = self._sequence - 1 if self._messages else 0
+            self._subscribers += 1
+        return self._follow(seen, timeout)
+
+    def _follow(
+        self, seen: int, timeout: float | None
+    ) -> typing.Iterator[bytes | None]:
+        try:
+            while True:
+                with self._condition:
+                    has_news = self._condition.wait_for(
+                        lambda: self._sequence > seen or self._closed, timeout
+                    )
+                    pending = [m for m in self._messages if m[0] > seen]
+                    closed = self._closed
+                if not has_news:
+                    yield None
+                    continue
+                for seen, message in pending:
+                    yield message
+                if closed:
+                    return
+        finally:
+            self._unsubscribe()
+
+    def _unsubscribe(self) -> None:
+        with self._condition:
+            self._subscribers -= 1
+            idle = self.idle
+        if idle and self.on_idle is not None:
+            self.on_idle(self)
+
+
+class AsyncChannel:
+    """A Channel whose subscribers are coroutines on one event loop
+
+    Publishing sets the current asyncio.Event, waking every waiting
+    subscriber, and replaces it for the next message."""
+
+    def __init__(
+        self,
+        history: int = 16,
+        on_idle: typing.Callable[["AsyncChannel"], None] | None = None,
+    ) -> None:
+        self.on_idle = on_idle
+        self._messages: collections.deque[tuple[int, bytes]] = collections.deque(
+            maxlen=history
+        )
+        self._sequence = 0
+        self._subscribers = 0
+        self._closed = False
+        self._published = asyncio.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def idle(self) -> bool:
+        """Whether the channel has neither subscribers nor messages"""
+        return self._subscribers == 0 and not self._messages
+
+    def publish(self, message: bytes) -> int:
+        """Publish a message, returning its sequence number"""
+        if self._closed:
+            raise ValueError("Channel is closed")
+        self._sequence += 1
+        self._messages.append((self._sequence, message))
+        self._wake()
+        return self._sequence
+
+    def close(self) -> None:
+        """End the stream once subscribers have received what is left"""
+        self._closed = True
+        self._wake()
+
+    def subscribe(
+        self, timeout: float | None = None
+    ) -> typing.AsyncIterator[bytes | None]:
+        """Yield messages as they are published until the channel closes
+
+        The subscription starts when this is called, not on iteration.
+        If `timeout` seconds pass without a message, None is yielded
+        so the caller can send a keep-alive."""
+        seen = self._sequence - 1 if self._messages else 0
+        self._subscribers += 1
+        return self._follow(seen, timeout)
+
+    async def _follow(
+        self, seen: int, timeout: float | None
+    ) -> typing.AsyncIterator[bytes | None]:
+        try:
+            while True:
+                pending = [m for m in self._messages if m[0] > seen]
+                for seen, message in pending:
+                    yield message
+                if pending:
+                    continue
+                if self._closed:
+                    return
+                try:
+                    await asyncio.wait_for(self._published.wait(), timeout)
+                except TimeoutError:
+                    yield None
+        finally:
+            self._subscribers -= 1
+            if self.idle and self.on_idle is not None:
+                self.on_idle(self)
+
+    def _wake(self) -> None:
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+
+ChannelT = typing.TypeVar("ChannelT", Channel, AsyncChannel)
+
+
+class _Broadcaster(typing.Generic[ChannelT]):
+    """Channels by key, e.g. one per running quiz
+
+    A channel is dropped when it is closed, or when its last subscriber
+    leaves before anything was published to it. Channels holding a
+    published message are kept for subscribers that reconnect."""
+
+    channel_class: type[ChannelT]
+
+    def __init__(self, history: int = 16) -> None:
+        self.history = history
+        self._channels: dict[str, ChannelT] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def channel(self, key: str) -> ChannelT:
+        with self._lock:
+            return self._channel(key)
+
+    def subscribe(self, key: str, timeout: float | None = None) -> typing.Any:
+        """Subscribe to a key's channel, see Channel.subscribe"""
+        with self._lock:
+            return self._channel(key).subscribe(timeout)
+
+    def publish(self, key: str, message: bytes) -> int:
+        return self.channel(key).publish(message)
+
+    def close(self, key: str) -> None:
+        with self._lock:
+            channel = self._channels.pop(key, None)
+        if channel is not None:
+            channel.close()
+
+    def _channel(self, key: str) -> ChannelT:
+        channel = self._channels.get(key)
+        if channel is None or channel.closed:
+            channel = self.channel_class(
+                self.history, functools.partial(self._drop_idle, key)
+            )
+            self._channels[key] = channel
+        return channel
+
+    def _drop_idle(self, key: str, channel: ChannelT) -> None:
+        with self._lock:
+            if channel.idle and self._channels.get(key) is channel:
+                del self._channels[key]
+
+
+class Broadcaster(_Broadcaster[Channel]):
+    channel_class = Channel
+
+
+class AsyncBroadcaster(_Broadcaster[AsyncChannel]):
+    channel_class = AsyncChannel
+
+
+def sse_frame(payload: bytes) -> bytes:
+    """Format a single line payload as a Server-Sent Events message"""
+    return b"data: " + payload + b"\n\n"
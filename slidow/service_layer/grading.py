@@ -0,0 +1,60 @@
+"""Grading of participant responses
+
+numpy is imported on first use, so processes that never grade, such as
+web workers, do not pay for importing it at startup.
+"""
+
+import typing
+
+from .. import models
+
+if typing.TYPE_CHECKING:
+    import numpy as np
+
+# selections are stored as signed 64-bit SQLite INTEGERs, so the top
+# option's bit must stay below 1 << 63
+MAX_OPTIONS = 63
+
+
+class TooManyOptionsError(ValueError):
+    def __init__(self, count: int) -> None:
+        self.msg = f"Questions are limited to {MAX_OPTIONS} options, not {count}"
+
+
+def correct_mask(question: models.Question) -> int:
+    """Return the bitmask of a question's correct option positions
+
+    Raises TooManyOptionsError past MAX_OPTIONS options"""
+    if len(question.options) > MAX_OPTIONS:
+        raise TooManyOptionsError(len(question.options))
+    return sum(1 << i for i, option in enumerate(question.options) if option.correct)
+
+
+def grade(
+    mask: int, selections: typing.Sequence[tuple[str, int]], partial: bool = False
+) -> dict[str, float]:
+    """Score every (participant, selected bitmask) pair against `mask`"""
+    import numpy as np
+
+    selected = np.fromiter(
+        (bits for _, bits in selections), dtype=np.uint64, count=len(selections)
+    )
+    scores = score(mask, selected, partial).tolist()
+    return dict(zip((participant for participant, _ in selections), scores))
+
+
+def score(mask: int, selected: "np.ndarray", partial: bool = False) -> "np.ndarray":
+    """Score an array of selected bitmasks against `mask` in one pass
+
+    By default a response scores 1 only if it selects exactly the
+    correct options. With `partial`, each correct option selected earns
+    a share of the point and each incorrect one selected takes a share
+    away, never going below 0."""
+    import numpy as np
+
+    correct = np.uint64(mask)
+    if partial and mask:
+        hits = np.bitwise_count(selected & correct).astype(np.float64)
+        misses = np.bitwise_count(selected & ~correct).astype(np.float64)
+        return np.clip((hits - misses) / int(mask).bit_count(), 0.0, None)
+    return (selected == correct).astype(np.float64)
@@ -0,0 +1,59 @@
+"""Read-only quiz snapshots for serving a launched quiz"""
+
+import json
+import typing
+from dataclasses import dataclass
+
+from .. import models
+from . import grading
+
+
+@dataclass(frozen=True, slots=True)
+class QuizSnapshot:
+    """A launched quiz compiled for serving without the database
+
+    Each question's participant-facing payload is serialized to JSON
+    once, at launch. Correct answers are only kept as bitmasks in
+    `correct_masks` and never appear in the payloads."""
+
+    quiz_identifier: str
+    title: str
+    payloads: tuple[bytes, ...]
+    correct_masks: tuple[int, ...]
+    option_counts: tuple[int, ...]
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def question(self, index: int) -> bytes:
+        return self.payloads[index]
+
+    def correct_mask(self, index: int) -> int:
+        return self.correct_masks[index]
+
+    def is_selection(self, index: int, selected: int) -> bool:
+        """Whether `selected` is a bitmask of the question's options"""
+        return 0 <= selected < 1 << self.option_counts[index]
+
+
+def compile_quiz(quiz: models.Quiz) -> QuizSnapshot:
+    """Compile a fully loaded quiz into a snapshot"""
+    payloads = tuple(
+        _dumps(
+            {
+                "quiz": quiz.identifier,
+                "index": index,
+                "count": len(quiz.questions),
+                "text": question.text,
+                "options": [option.text for option in question.options],
+            }
+        )
+        for index, question in enumerate(quiz.questions)
+    )
+    masks = tuple(grading.correct_mask(question) for question in quiz.questions)
+    counts = tuple(len(question.options) for question in quiz.questions)
+    return QuizSnapshot(quiz.identifier, quiz.title, payloads, masks, counts)
+
+
+def _dumps(payload: dict[str, typing.Any]) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode()
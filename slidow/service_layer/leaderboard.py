@@ -0,0 +1,125 @@
+"""Quiz leaderboards that update as graded results arrive"""
+
+import random
+import typing
+
+MAX_LEVELS = 24
+
+
+class Leaderboard:
+    """Participants of a quiz ranked by their total score
+
+    Ties are broken by participant name. Adding points is O(log n),
+    reading the top k is O(k) and looking up a rank is O(log n)."""
+
+    def __init__(
+        self, quiz_identifier: str, scores: typing.Iterable[tuple[str, float]] = ()
+    ) -> None:
+        self.quiz_identifier = quiz_identifier
+        self._scores: dict[str, float] = {}
+        self._ranking = _IndexableSkipList()
+        for participant, points in scores:
+            self.add(participant, points)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def add(self, participant: str, points: float) -> float:
+        """Add points to a participant's total, returning the new total"""
+        previous = self._scores.get(participant)
+        if previous is not None:
+            self._ranking.remove((-previous, participant))
+        total = (previous or 0.0) + points
+        self._scores[participant] = total
+        self._ranking.insert((-total, participant))
+        return total
+
+    def add_all(self, scores: typing.Mapping[str, float]) -> None:
+        """Add a graded question's scores, as returned by grade_question"""
+        for participant, points in scores.items():
+            self.add(participant, points)
+
+    def score(self, participant: str) -> float:
+        return self._scores[participant]
+
+    def rank(self, participant: str) -> int:
+        """Return a participant's 1-based position on the leaderboard"""
+        return self._ranking.index((-self._scores[participant], participant)) + 1
+
+    def top(self, k: int) -> list[tuple[str, float]]:
+        return [(participant, -score) for score, participant in self._ranking.head(k)]
+
+    def scores(self) -> typing.Iterator[tuple[str, float]]:
+        return iter(self._scores.items())
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: typing.Any, levels: int) -> None:
+        self.key = key
+        self.next: list[_Node | None] = [None] * levels
+        # number of level 0 steps to the next node on each level
+        self.width = [1] * levels
+
+
+class _IndexableSkipList:
+    """Sorted keys with O(log n) insert, remove and position lookup"""
+
+    def __init__(self) -> None:
+        self._head = _Node(None, MAX_LEVELS)
+
+    def insert(self, key: typing.Any) -> None:
+        chain, steps_at_level = self._find(key)
+        levels = 1
+        while levels < MAX_LEVELS and random.random() < 0.5:
+            levels += 1
+        node = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+
+    def remove(self, key: typing.Any) -> None:
+        chain, _ = self._find(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        levels = len(node.next)
+        for level in range(levels):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] -= 1
+
+    def index(self, key: typing.Any) -> int:
+        _, steps_at_level = self._find(key)
+        return sum(steps_at_level)
+
+    def head(self, k: int) -> typing.Iterator[typing.Any]:
+        node = self._head.next[0]
+        while node is not None and k > 0:
+            yield node.key
+            node = node.next[0]
+            k -= 1
+
+    def _find(self, key: typing.Any) -> tuple[list[_Node], list[int]]:
+        """Return the last node before `key` on each level
+
+        along with the number of level 0 steps taken on each level"""
+        chain = [self._head] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self._head
+        for level in reversed(range(MAX_LEVELS)):
+            while (next_node := node.next[level]) is not None and next_node.key < key:
+                steps_at_level[level] += node.width[level]
+                node = next_node
+            chain[level] = node
+        return chain, steps_at_level
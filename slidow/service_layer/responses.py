@@ -0,0 +1,341 @@
+"""Collection of participant responses during a live quiz"""
+
+import asyncio
+import logging
+import threading
+import time
+import typing
+
+from sqlalchemy.exc import OperationalError
+
+from .. import models
+from . import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionClosedError(ValueError):
+    def __init__(self, arg: object) -> None:
+        self.msg = f"Question is not accepting responses: {arg}"
+
+
+class _ResponseBuffer:
+    """Responses waiting to be written, at most one per participant
+
+    The participants who answered a question are remembered after it
+    closes, so reopening it does not let them answer again."""
+
+    def __init__(
+        self,
+        max_batch: int,
+        max_delay: float,
+        clock: typing.Callable[[], float],
+        wall_clock: typing.Callable[[], float],
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.flushed = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self._pending: list[models.Response] = []
+        self._oldest_pending: float | None = None
+        self._participants: dict[tuple[str, int], set[str]] = {}
+        self._closed: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+    def open_question(self, quiz_identifier: str, question_index: int) -> None:
+        question = (quiz_identifier, question_index)
+        with self._lock:
+            self._participants.setdefault(question, set())
+            self._closed.discard(question)
+
+    def is_closed(self, quiz_identifier: str, question_index: int) -> bool:
+        with self._lock:
+            return (quiz_identifier, question_index) in self._closed
+
+    def _close_question(self, quiz_identifier: str, question_index: int) -> None:
+        question = (quiz_identifier, question_index)
+        with self._lock:
+            if question in self._participants:
+                self._closed.add(question)
+
+    def _buffer(
+        self,
+        participant: str,
+        quiz_identifier: str,
+        question_index: int,
+        selected: int,
+    ) -> tuple[bool, bool]:
+        """Buffer a response, returning whether it was kept and a flush is due"""
+        now = self.clock()
+        question = (quiz_identifier, question_index)
+        with self._lock:
+            participants = self._participants.get(question)
+            if participants is None or question in self._closed:
+                raise QuestionClosedError(question)
+            if participant in participants:
+                self.duplicates += 1
+                return False, False
+            participants.add(participant)
+            self._pending.append(
+                models.Response(
+                    participant,
+                    quiz_identifier,
+                    question_index,
+                    selected,
+                    self.wall_clock(),
+                )
+            )
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+            return True, self._is_due(now)
+
+    def _take_pending(self) -> list[models.Response]:
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._oldest_pending = None
+        return batch
+
+    def _requeue(self, batch: list[models.Response]) -> None:
+        # keep responses the database could not take for the next flush
+        with self._lock:
+            self._pending[:0] = batch
+            self._oldest_pending = self.clock()
+
+    def _due(self) -> bool:
+        with self._lock:
+            return self._is_due(self.clock())
+
+    def _is_due(self, now: float) -> bool:
+        if len(self._pending) >= self.max_batch:
+            return True
+        return (
+            self._oldest_pending is not None
+            and now - self._oldest_pending >= self.max_delay
+        )
+
+
+class ResponseCollector(_ResponseBuffer):
+    """Buffers responses in memory and writes them in group commits
+
+    Responses for the open questions are kept in one in-memory buffer
+    and written with a single bulk insert and commit once `max_batch`
+    of them are pending or the oldest has waited `max_delay` seconds.
+    A participant's first response to a question is the one kept.
+
+    A batch the database cannot take, e.g. while it is locked, is kept
+    for the next flush. A batch failing for any other reason is written
+    one response at a time instead, and the responses that still fail
+    are logged and dropped, so one bad response cannot hold up the rest.
+    `clock` times the batches and `wall_clock` stamps the responses.
+
+    `submit` only checks the time trigger when it is called. Call
+    `start` to also flush from a background thread while submissions
+    are quiet, and `stop` to end it."""
+
+    def __init__(
+        self,
+        uow: unit_of_work.AbstractUOW,
+        max_batch: int = 1000,
+        max_delay: float = 0.05,
+        clock: typing.Callable[[], float] = time.monotonic,
+        wall_clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(max_batch, max_delay, clock, wall_clock)
+        self.uow = uow
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def close_question(self, quiz_identifier: str, question_index: int) -> None:
+        """Stop accepting responses to a question and write pending ones"""
+        self._close_question(quiz_identifier, question_index)
+        self.flush()
+
+    def submit(
+        self,
+        participant: str,
+        quiz_identifier: str,
+        question_index: int,
+        selected: int,
+    ) -> bool:
+        """Buffer a response, returning False if it is a duplicate"""
+        kept, due = self._buffer(participant, quiz_identifier, question_index, selected)
+        if due:
+            self.flush()
+        return kept
+
+    def flush(self) -> int:
+        """Write all pending responses in one transaction
+
+        Returns the number of responses written"""
+        with self._flush_lock:
+            batch = self._take_pending()
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except OperationalError:
+                self._requeue(batch)
+                raise
+            except Exception:
+                logger.exception("Writing %d responses failed", len(batch))
+                return self._write_each(batch)
+            self.flushed += len(batch)
+            return len(batch)
+
+    def flush_if_due(self) -> int:
+        return self.flush() if self._due() else 0
+
+    def _write(self, batch: list[models.Response]) -> None:
+        with self.uow:
+            self.uow.responses.add_all(batch)
+            self.uow.commit()
+
+    def _write_each(self, batch: list[models.Response]) -> int:
+        written = 0
+        for position, response in enumerate(batch):
+            try:
+                self._write([response])
+            except OperationalError:
+                self._requeue(batch[position:])
+                raise
+            except Exception:
+                logger.exception("Dropped response %r", response)
+                self.dropped += 1
+            else:
+                # counted one by one, as a later response may raise
+                self.flushed += 1
+                written += 1
+        return written
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+        self._flusher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _run_flusher(self) -> None:
+        while not self._stopped.wait(self.max_delay / 2):
+            try:
+                self.flush_if_due()
+            except Exception:
+                logger.exception("Flushing responses failed")
+
+
+class AsyncResponseCollector(_ResponseBuffer):
+    """ResponseCollector for an asyncio event loop
+
+    `submit` never waits: when a flush is due it is scheduled as a task
+    on the running loop, so request handlers and broadcasts carry on
+    while the batch is written. Failed writes are handled as by
+    ResponseCollector, and errors of scheduled flushes are logged."""
+
+    def __init__(
+        self,
+        uow: unit_of_work.AbstractAsyncUOW,
+        max_batch: int = 1000,
+        max_delay: float = 0.05,
+        clock: typing.Callable[[], float] = time.monotonic,
+        wall_clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(max_batch, max_delay, clock, wall_clock)
+        self.uow = uow
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def close_question(self, quiz_identifier: str, question_index: int) -> None:
+        """Stop accepting responses to a question and write pending ones"""
+        self._close_question(quiz_identifier, question_index)
+        await self.flush()
+
+    def submit(
+        self,
+        participant: str,
+        quiz_identifier: str,
+        question_index: int,
+        selected: int,
+    ) -> bool:
+        """Buffer a response, returning False if it is a duplicate"""
+        kept, due = self._buffer(participant, quiz_identifier, question_index, selected)
+        if due:
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushed)
+        return kept
+
+    def _flushed(self, task: asyncio.Task) -> None:
+        self._flushes.discard(task)
+        if not task.cancelled() and (error := task.exception()) is not None:
+            logger.error("Flushing responses failed", exc_info=error)
+
+    async def flush(self) -> int:
+        """Write all pending responses in one transaction
+
+        Returns the number of responses written"""
+        async with self._flush_lock:
+            batch = self._take_pending()
+            if not batch:
+                return 0
+            try:
+                await self._write(batch)
+            except OperationalError:
+                self._requeue(batch)
+                raise
+            except Exception:
+                logger.exception("Writing %d responses failed", len(batch))
+                return await self._write_each(batch)
+            self.flushed += len(batch)
+            return len(batch)
+
+    async def flush_if_due(self) -> int:
+        return await self.flush() if self._due() else 0
+
+    async def _write(self, batch: list[models.Response]) -> None:
+        async with self.uow:
+            await self.uow.responses.add_all(batch)
+            await self.uow.commit()
+
+    async def _write_each(self, batch: list[models.Response]) -> int:
+        written = 0
+        for position, response in enumerate(batch):
+            try:
+                await self._write([response])
+            except OperationalError:
+                self._requeue(batch[position:])
+                raise
+            except Exception:
+                logger.exception("Dropped response %r", response)
+                self.dropped += 1
+            else:
+                # counted one by one, as a later response may raise
+                self.flushed += 1
+                written += 1
+        return written
+
+    def start(self) -> None:
+        self._flusher = asyncio.get_running_loop().create_task(self._run_flusher())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+    async def _run_flusher(self) -> None:
+        while True:
+            await asyncio.sleep(self.max_delay / 2)
+            try:
+                await self.flush_if_due()
+            except Exception:
+                logger.exception("Flushing responses failed")
@@ -1,8 +1,14 @@
+import itertools
+import json
 import typing
 
-from .. import models
+from sqlalchemy.exc import IntegrityError
+
+from .. import identifiers, models
 from ..adapters.repos import AbstractRepo
-from . import unit_of_work
+from . import grading, launch, leaderboard, unit_of_work
+
+DEFAULT_PAGE_SIZE = 50
 
 
 class InvalidEventNameError(ValueError):
@@ -10,6 +16,21 @@ class InvalidEventNameError(ValueError):
         self.msg = f"Invalid Event Name: {arg}"
 
 
+class InvalidQuizTitleError(ValueError):
+    def __init__(self, arg: object) -> None:
+        self.msg = f"Invalid Quiz Title: {arg}"
+
+
+class InvalidQuestionIndexError(ValueError):
+    def __init__(self, quiz_identifier: str, arg: object) -> None:
+        self.msg = f"Invalid Question Index for quiz {quiz_identifier}: {arg}"
+
+
+class InvalidQuizDocumentError(ValueError):
+    def __init__(self, line_number: int, arg: object) -> None:
+        self.msg = f"Invalid Quiz on line {line_number}: {arg}"
+
+
 def add_event(event_name: str, uow: unit_of_work.AbstractUOW) -> str:
     """Adds a new event
 
@@ -24,5 +45,197 @@ def add_event(event_name: str, uow: unit_of_work.AbstractUOW) -> str:
     return event.identifier
 
 
-def get_events(repo: AbstractRepo) -> list[tuple]:
-    return [(event.identifier, event.name) for event in repo.list()]
+def add_events(
+    event_names: typing.Iterable[str], uow: unit_of_work.AbstractUOW
+) -> list[str]:
+    """Adds many new events in a single transaction
+
+    Returns the generated identifiers in the order of the given names"""
+    event_names = list(event_names)
+    for event_name in event_names:
+        if len(event_name) == 0:
+            raise InvalidEventNameError(event_name)
+    events = [
+        models.Event(identifier, event_name)
+        for identifier, event_name in zip(
+            identifiers.new_identifiers(len(event_names)), event_names
+        )
+    ]
+    with uow:
+        uow.events.add_all(events)
+        uow.commit()
+    return [event.identifier for event in events]
+
+
+def add_quizzes(
+    quizzes: typing.Iterable[tuple[str, list[models.Question]]],
+    uow: unit_of_work.AbstractUOW,
+) -> list[str]:
+    """Adds many new quizzes with their questions in a single transaction
+
+    Each quiz is given as a (title, questions) pair. Returns the
+    generated identifiers in the order the quizzes were given"""
+    quizzes = list(quizzes)
+    for title, _ in quizzes:
+        if len(title) == 0:
+            raise InvalidQuizTitleError(title)
+    new_quizzes = [
+        models.Quiz(identifier, title, questions)
+        for identifier, (title, questions) in zip(
+            identifiers.new_identifiers(len(quizzes)), quizzes
+        )
+    ]
+    with uow:
+        uow.quizzes.add_all(new_quizzes)
+        uow.commit()
+    return [quiz.identifier for quiz in new_quizzes]
+
+
+def get_events(
+    repo: AbstractRepo, limit: int = DEFAULT_PAGE_SIZE, after: str | None = None
+) -> typing.Sequence[tuple]:
+    """Returns a page of (identifier, name) pairs ordered by identifier
+
+    Pass the identifier of the last event of a page as `after`
+    to get the next one"""
+    return repo.summaries(limit, after)
+
+
+def grade_question(
+    quiz_identifier: str,
+    question_index: int,
+    uow: unit_of_work.AbstractUOW,
+    partial: bool = False,
+) -> dict[str, float]:
+    """Grades every response to a question
+
+    Returns each responding participant's score, between 0 and 1. Raises
+    InvalidQuestionIndexError if the quiz has no such question"""
+    with uow:
+        quiz = uow.quizzes.get(quiz_identifier, load="full")
+        mask = grading.correct_mask(get_question(quiz, question_index))
+        selections = uow.responses.selections(quiz_identifier, question_index)
+        return grading.grade(mask, selections, partial)
+
+
+def get_question(quiz: models.Quiz, question_index: int) -> models.Question:
+    """Returns a quiz's question, raising InvalidQuestionIndexError if
+    it has no question at `question_index`"""
+    if not 0 <= question_index < len(quiz.questions):
+        raise InvalidQuestionIndexError(quiz.identifier, question_index)
+    return quiz.questions[question_index]
+
+
+def launch_quiz(
+    quiz_identifier: str, uow: unit_of_work.AbstractUOW
+) -> launch.QuizSnapshot:
+    """Compiles a quiz into a snapshot that serves it without the database"""
+    with uow:
+        quiz = uow.quizzes.get(quiz_identifier, load="full")
+        return launch.compile_quiz(quiz)
+
+
+def save_leaderboard(
+    board: leaderboard.Leaderboard, uow: unit_of_work.AbstractUOW
+) -> None:
+    """Saves the totals of a leaderboard, replacing any saved earlier"""
+    with uow:
+        uow.scores.replace(board.quiz_identifier, board.scores())
+        uow.commit()
+
+
+def load_leaderboard(
+    quiz_identifier: str, uow: unit_of_work.AbstractUOW
+) -> leaderboard.Leaderboard:
+    """Restores a quiz's leaderboard from its saved totals"""
+    with uow:
+        return leaderboard.Leaderboard(
+            quiz_identifier, uow.scores.for_quiz(quiz_identifier)
+        )
+
+
+def import_quizzes(
+    lines: typing.Iterable[str], uow: unit_of_work.AbstractUOW, chunk_size: int = 500
+) -> int:
+    """Imports quizzes from JSON Lines, one quiz document per line
+
+    Quizzes are bulk inserted and committed `chunk_size` at a time so
+    only one chunk is held in memory. A document without an identifier
+    is given a random one. If a line is invalid, or repeats an identifier
+    already imported, chunks committed before it are kept and
+    InvalidQuizDocumentError is raised.
+    Returns the number of quizzes imported"""
+    documents = (
+        (line_number, line)
+        for line_number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    imported = 0
+    with uow:
+        while chunk := list(itertools.islice(documents, chunk_size)):
+            quizzes = [_quiz_from_json(number, line) for number, line in chunk]
+            try:
+                uow.quizzes.add_all(quizzes)
+            except IntegrityError:
+                uow.rollback()
+                _raise_duplicate(uow, [number for number, _ in chunk], quizzes)
+                raise
+            uow.commit()
+            imported += len(quizzes)
+    return imported
+
+
+def _raise_duplicate(
+    uow: unit_of_work.AbstractUOW,
+    line_numbers: list[int],
+    quizzes: list[models.Quiz],
+) -> None:
+    """Add the quizzes of a chunk that failed one at a time to find the
+    line whose identifier is taken, then roll back the chunk"""
+    for line_number, quiz in zip(line_numbers, quizzes):
+        try:
+            uow.quizzes.add_all([quiz])
+        except IntegrityError as err:
+            uow.rollback()
+            raise InvalidQuizDocumentError(
+                line_number, f"duplicate identifier {quiz.identifier!r}"
+            ) from err
+    uow.rollback()
+
+
+def export_quizzes(
+    uow: unit_of_work.AbstractUOW, batch_size: int = 1000
+) -> typing.Iterator[str]:
+    """Exports quizzes as JSON Lines, the format read by import_quizzes"""
+    with uow:
+        for document in uow.quizzes.stream_dicts(batch_size):
+            yield json.dumps(document) + "\n"
+
+
+def _quiz_from_json(line_number: int, line: str) -> models.Quiz:
+    try:
+        document = json.loads(line)
+        questions = [
+            models.Question(
+                question["text"],
+                [
+                    models.Option(option["text"], _is_correct(option))
+                    for option in question["options"]
+                ],
+            )
+            for question in document.get("questions", [])
+        ]
+        title = document["title"]
+        identifier = document.get("identifier") or models.random_identifier()
+    except (ValueError, KeyError, TypeError, AttributeError) as err:
+        raise InvalidQuizDocumentError(line_number, err) from err
+    if not isinstance(title, str) or len(title) == 0:
+        raise InvalidQuizDocumentError(line_number, "title cannot be empty")
+    return models.Quiz(identifier, title, questions)
+
+
+def _is_correct(option: dict) -> bool:
+    correct = option.get("correct", False)
+    if not isinstance(correct, bool):
+        raise TypeError(f"correct must be true or false, not {correct!r}")
+    return correct
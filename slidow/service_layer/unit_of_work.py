@@ -1,13 +1,22 @@
 """Encapsulation of transaction boundaries"""
 
 import abc
+import threading
+import time
+import typing
 
-from slidow.adapters import repos
+from sqlalchemy import event
+
+from slidow import models
+from slidow.adapters import caching, logstore, repos, sharding, versioning
 
 
 class AbstractUOW(abc.ABC):
 
     events: repos.AbstractRepo
+    quizzes: repos.AbstractQuizRepo
+    responses: repos.AbstractResponseRepo
+    scores: repos.AbstractScoreRepo
 
     def __enter__(self) -> "AbstractUOW":
         return self
@@ -25,32 +34,440 @@ class AbstractUOW(abc.ABC):
 
 
 class SQLAlchemyUOW(AbstractUOW):
+    """Unit of work over a SQLAlchemy session
+
+    Given an AggregateCache, events and quizzes are read through it,
+    and the aggregates this unit of work writes are invalidated once
+    it commits. Without `fill_cache`, as for sessions bound to a replica
+    that may lag, cached aggregates are served but misses are not
+    cached. Given DataVersions, the versions of the data written
+    are bumped in the same transaction."""
 
-    def __init__(self, session_factory):
+    def __init__(
+        self,
+        session_factory,
+        cache: caching.AggregateCache | None = None,
+        versions: versioning.DataVersions | None = None,
+        fill_cache: bool = True,
+    ):
         self.session_factory = session_factory
+        self.cache = cache
+        self.versions = versions
+        self.fill_cache = fill_cache
 
     def __enter__(self):
         self.session = self.session_factory()
         self.events = repos.EventSQLAlchemyRepo(self.session)
+        self.quizzes = repos.QuizSQLAlchemyRepo(self.session)
+        self.responses = repos.ResponseSQLAlchemyRepo(self.session)
+        self.scores = repos.ScoreSQLAlchemyRepo(self.session)
+        if self.cache is not None:
+            self.written: set[caching.CacheKey] = set()
+            self.written_unknown = False
+            self.events = caching.CachingEventRepo(
+                self.events, self.session, self.cache, self.written, self.fill_cache
+            )
+            self.quizzes = caching.CachingQuizRepo(
+                self.quizzes, self.session, self.cache, self.written, self.fill_cache
+            )
+            event.listen(self.session, "after_flush", self._collect_written)
         return super().__enter__()
 
     def __exit__(self, *args):
-        super().__exit__(*args)
+        # after a commit there is no transaction left to roll back
+        if self.session.in_transaction():
+            super().__exit__(*args)
+        if self.cache is not None:
+            event.remove(self.session, "after_flush", self._collect_written)
         self.session.close()
 
     def commit(self):
+        if self.versions is not None:
+            self.versions.bump(self.session)
         self.session.commit()
+        versioning.forget_changed(self.session)
+        if self.cache is not None:
+            if self.written_unknown:
+                self.cache.clear()
+            else:
+                self.cache.invalidate(self.written)
+            self.written.clear()
+            self.written_unknown = False
 
     def rollback(self):
         self.session.rollback()
+        versioning.forget_changed(self.session)
+        if self.cache is not None:
+            self.written.clear()
+            self.written_unknown = False
 
+    def _collect_written(self, session, flush_context) -> None:
+        if not _collect_flushed(session, self.written):
+            self.written_unknown = True
 
-class DummyUOW(AbstractUOW):
-    def __init__(self):
-        self.events = repos.EventKeyValRepo({})
+
+def _collect_flushed(session, written: set[caching.CacheKey]) -> bool:
+    """Add the keys of the aggregates a session is flushing to `written`
+
+    Returns False if some aggregate cannot be told without a query."""
+    known = True
+    for model in (*session.new, *session.dirty, *session.deleted):
+        try:
+            written.add(caching.aggregate_key(model))
+        except LookupError:
+            known = False
+    return known
+
+
+class ShardedSQLAlchemyUOW(AbstractUOW):
+    """Unit of work over one session per shard database
+
+    Each repo routes an aggregate to its shard's session, see
+    slidow.adapters.sharding. Commit commits every shard in turn, so a
+    unit that writes to several shards is not atomic across them; one
+    that writes a single aggregate only touches its own shard. Shards
+    are not read through an AggregateCache, so there is none to
+    invalidate."""
+
+    def __init__(self, session_factories: typing.Sequence):
+        self.session_factories = session_factories
+
+    def __enter__(self):
+        self.sessions = [factory() for factory in self.session_factories]
+        self.events = sharding.ShardedEventRepo(
+            [repos.EventSQLAlchemyRepo(session) for session in self.sessions]
+        )
+        self.quizzes = sharding.ShardedQuizRepo(
+            [repos.QuizSQLAlchemyRepo(session) for session in self.sessions]
+        )
+        self.responses = sharding.ShardedResponseRepo(
+            [repos.ResponseSQLAlchemyRepo(session) for session in self.sessions]
+        )
+        self.scores = sharding.ShardedScoreRepo(
+            [repos.ScoreSQLAlchemyRepo(session) for session in self.sessions]
+        )
+        return super().__enter__()
+
+    def __exit__(self, *args):
+        super().__exit__(*args)
+        for session in self.sessions:
+            session.close()
+
+    def commit(self):
+        for session in self.sessions:
+            if session.in_transaction():
+                session.commit()
+
+    def rollback(self):
+        for session in self.sessions:
+            if session.in_transaction():
+                session.rollback()
+
+
+# (repo name, method name, arguments) of a deferred repository write
+Operation = tuple[str, str, tuple]
+
+
+class _PendingCommit:
+    def __init__(self, operations: list[Operation]) -> None:
+        self.operations = operations
+        self.error: Exception | None = None
+        self.lead = False
+        self.wake = threading.Event()
+
+
+class GroupCommitter:
+    """Commits the writes of concurrent units of work together
+
+    The first caller to arrive becomes the leader: it waits up to
+    `max_wait` seconds for others to queue up, then writes up to
+    `max_batch` units in one transaction and one commit, and hands
+    leadership to the next caller in the queue. If the shared commit
+    fails, each unit in it is retried in its own transaction, so every
+    caller learns whether its own writes were committed.
+
+    `session_factory` must hand out a new session per call, not a
+    scoped_session shared with the callers' threads, and should not
+    expire on commit, as callers go on to read what they wrote. Given
+    DataVersions, each commit bumps the versions of the data written.
+    Given an AggregateCache, the aggregates written are invalidated once
+    they are committed."""
+
+    def __init__(
+        self,
+        session_factory,
+        max_batch: int = 256,
+        max_wait: float = 0.001,
+        versions: versioning.DataVersions | None = None,
+        cache: caching.AggregateCache | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.versions = versions
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.commits = 0
+        self.units = 0
+        self._queue: list[_PendingCommit] = []
+        self._leading = False
+        self._lock = threading.Lock()
+
+    def commit(self, operations: list[Operation]) -> None:
+        """Write the operations in the next group commit
+
+        Blocks until they are committed and raises if they failed."""
+        pending = _PendingCommit(operations)
+        with self._lock:
+            self._queue.append(pending)
+            if not self._leading:
+                self._leading = pending.lead = True
+        if not pending.lead:
+            pending.wake.wait()
+        if pending.lead:
+            self._lead()
+        if pending.error is not None:
+            raise pending.error
+
+    def _lead(self) -> None:
+        if self.max_wait:
+            time.sleep(self.max_wait)
+        with self._lock:
+            batch = self._queue[: self.max_batch]
+            del self._queue[: self.max_batch]
+        self._write(batch)
+        with self._lock:
+            if self._queue:
+                successor = self._queue[0]
+                successor.lead = True
+                successor.wake.set()
+            else:
+                self._leading = False
+        for pending in batch:
+            pending.wake.set()
+
+    def _write(self, batch: list[_PendingCommit]) -> None:
+        try:
+            self._apply(batch)
+        except Exception as err:
+            if len(batch) == 1:
+                batch[0].error = err
+                return
+            for pending in batch:
+                try:
+                    self._apply([pending])
+                except Exception as err:
+                    pending.error = err
+
+    def _apply(self, batch: list[_PendingCommit]) -> None:
+        written: set[caching.CacheKey] = set()
+        known = True
+
+        def collect(session, flush_context) -> None:
+            nonlocal known
+            known = _collect_flushed(session, written) and known
+
+        with self.session_factory() as session:
+            targets: dict[str, typing.Any] = {
+                "events": repos.EventSQLAlchemyRepo(session),
+                "quizzes": repos.QuizSQLAlchemyRepo(session),
+                "responses": repos.ResponseSQLAlchemyRepo(session),
+                "scores": repos.ScoreSQLAlchemyRepo(session),
+            }
+            if self.cache is not None:
+                event.listen(session, "after_flush", collect)
+            for pending in batch:
+                for repo, method, args in pending.operations:
+                    getattr(targets[repo], method)(*args)
+                    if self.cache is not None and repo in ("events", "quizzes"):
+                        # bulk inserts are not seen by the flush listener
+                        added = args[0] if method == "add_all" else args
+                        written.update(map(caching.aggregate_key, added))
+            if self.versions is not None:
+                self.versions.bump(session)
+            session.commit()
+        if self.cache is not None:
+            if known:
+                self.cache.invalidate(written)
+            else:
+                self.cache.clear()
+        self.commits += 1
+        self.units += len(batch)
+
+
+class _DeferredWrites:
+    """Records a repo's writes for a GroupCommitter instead of running them"""
+
+    name: str
+
+    def __init__(self, session, operations: list[Operation]) -> None:
+        self.session = session
+        self.operations = operations
+
+    def _defer(self, method: str, *args) -> None:
+        self.operations.append((self.name, method, args))
+
+
+class _DeferredEventRepo(_DeferredWrites, repos.EventSQLAlchemyRepo):
+    name = "events"
+
+    def add(self, event: models.Event) -> None:
+        self._defer("add", event)
+
+    def add_all(self, events: typing.Iterable[models.Event]) -> None:
+        self._defer("add_all", list(events))
+
+
+class _DeferredQuizRepo(_DeferredWrites, repos.QuizSQLAlchemyRepo):
+    name = "quizzes"
+
+    def add(self, quiz: models.Quiz) -> None:
+        self._defer("add", quiz)
+
+    def add_all(self, quizzes: typing.Iterable[models.Quiz]) -> None:
+        self._defer("add_all", list(quizzes))
+
+
+class _DeferredResponseRepo(_DeferredWrites, repos.ResponseSQLAlchemyRepo):
+    name = "responses"
+
+    def add_all(self, responses: typing.Iterable[models.Response]) -> None:
+        self._defer("add_all", list(responses))
+
+
+class _DeferredScoreRepo(_DeferredWrites, repos.ScoreSQLAlchemyRepo):
+    name = "scores"
+
+    def replace(
+        self, quiz_identifier: str, scores: typing.Iterable[tuple[str, float]]
+    ) -> None:
+        self._defer("replace", quiz_identifier, list(scores))
+
+
+class BatchingUOW(AbstractUOW):
+    """Unit of work whose writes join a group commit
+
+    Reads go through the unit's own session as with SQLAlchemyUOW, but
+    writes are only recorded, and `commit` hands them to a shared
+    GroupCommitter. It returns once they are committed together with
+    those of other units, or raises if they failed. Aggregates written
+    must be new, not ones loaded through this unit's session."""
+
+    def __init__(self, committer: GroupCommitter, session_factory=None):
+        self.committer = committer
+        self.session_factory = session_factory or committer.session_factory
+
+    def __enter__(self):
+        self.session = self.session_factory()
+        self.operations: list[Operation] = []
+        self.events = _DeferredEventRepo(self.session, self.operations)
+        self.quizzes = _DeferredQuizRepo(self.session, self.operations)
+        self.responses = _DeferredResponseRepo(self.session, self.operations)
+        self.scores = _DeferredScoreRepo(self.session, self.operations)
+        return super().__enter__()
+
+    def __exit__(self, *args):
+        super().__exit__(*args)
+        self.session.close()
+
+    def commit(self):
+        operations = self.operations[:]
+        self.operations.clear()
+        if operations:
+            self.committer.commit(operations)
+
+    def rollback(self):
+        self.operations.clear()
+        if self.session.in_transaction():
+            self.session.rollback()
+
+
+class KeyValUOW(AbstractUOW):
+    """Unit of work over a key-value store, see repos.KeyValRepo
+
+    Writes reach the store as soon as they are made, so a rollback only
+    forgets the changes made to fetched aggregates. Commit writes those
+    back and, for a LogStore, syncs the log to disk."""
+
+    def __init__(self, kv_store: typing.MutableMapping):
+        self.kv_store = kv_store
+        self.events = repos.EventKeyValRepo(kv_store)
+        self.quizzes = repos.QuizKeyValRepo(kv_store)
+        self.responses = repos.ResponseKeyValRepo(kv_store)
+        self.scores = repos.ScoreKeyValRepo(kv_store)
         self.committed = False
 
+    def _repos(self) -> list[repos.KeyValRepo]:
+        kv_repos = [self.events, self.quizzes, self.responses, self.scores]
+        return kv_repos  # type: ignore[return-value]
+
     def commit(self):
+        for repo in self._repos():
+            repo.flush()
+        if isinstance(self.kv_store, logstore.LogStore):
+            self.kv_store.sync()
         self.committed = True
 
-    def rollback(self): ...
+    def rollback(self):
+        for repo in self._repos():
+            repo.loaded.clear()
+
+
+class DummyUOW(KeyValUOW):
+    def __init__(self):
+        super().__init__({})
+
+
+class AbstractAsyncUOW(abc.ABC):
+    """The AbstractUOW contract for use with `async with`"""
+
+    events: repos.AbstractAsyncRepo
+    quizzes: repos.AbstractAsyncRepo
+    responses: repos.AbstractAsyncResponseRepo
+
+    async def __aenter__(self) -> "AbstractAsyncUOW":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.rollback()
+
+    @abc.abstractmethod
+    async def commit(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def rollback(self):
+        raise NotImplementedError
+
+
+class AsyncSQLAlchemyUOW(AbstractAsyncUOW):
+    """Unit of work over an AsyncSession
+
+    Given DataVersions, the versions of the data written are bumped in
+    the same transaction."""
+
+    def __init__(
+        self, session_factory, versions: versioning.DataVersions | None = None
+    ):
+        self.session_factory = session_factory
+        self.versions = versions
+
+    async def __aenter__(self):
+        self.session = self.session_factory()
+        self.events = repos.AsyncEventSQLAlchemyRepo(self.session)
+        self.quizzes = repos.AsyncQuizSQLAlchemyRepo(self.session)
+        self.responses = repos.AsyncResponseSQLAlchemyRepo(self.session)
+        return await super().__aenter__()
+
+    async def __aexit__(self, *args):
+        await super().__aexit__(*args)
+        await self.session.close()
+
+    async def commit(self):
+        if self.versions is not None:
+            await self.session.run_sync(self.versions.bump)
+        await self.session.commit()
+        versioning.forget_changed(self.session)
+
+    async def rollback(self):
+        await self.session.rollback()
+        versioning.forget_changed(self.session)
@@ -0,0 +1,254 @@
+import asyncio
+import contextlib
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from slidow import models
+from slidow.adapters import orm
+from slidow.entrypoints.asgi_app import create_app
+from slidow.entrypoints.flask_app import create_app as flask_create_app
+from slidow.service_layer import grading
+
+
+class ASGIAppTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = create_app(os.path.join(self.tmpdir.name, "slidow-test.sqlite"))
+        async with self.app.engine.begin() as connection:
+            await connection.run_sync(orm.mapper_registry.metadata.create_all)
+        await self.app.startup()
+
+    async def asyncTearDown(self):
+        await self.app.shutdown()
+        self.tmpdir.cleanup()
+
+    async def request(self, method: str, path: str, body=None, query: str = ""):
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": query.encode(),
+        }
+        messages = [{"type": "http.request", "body": json.dumps(body or {}).encode()}]
+        sent: list[dict] = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        return sent[0]["status"], json.loads(sent[1]["body"])
+
+    async def add_quiz(self):
+        quiz = models.Quiz(
+            "quiz1",
+            "Quiz1",
+            [models.Question("Q1", [models.Option("A", True), models.Option("B")])],
+        )
+        async with self.app.uow() as uow:
+            uow.quizzes.add(quiz)
+            await uow.commit()
+
+    async def test_can_add_and_page_events(self):
+        for name in ("Event1", "Event2", "Event3"):
+            status, _ = await self.request("POST", "/events", {"name": name})
+            self.assertEqual(status, 201)
+
+        status, first = await self.request("GET", "/events", query="limit=2")
+        _, rest = await self.request(
+            "GET", "/events", query=f"limit=2&after={first[-1]['identifier']}"
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(
+            sorted(e["name"] for e in first + rest), ["Event1", "Event2", "Event3"]
+        )
+
+    async def test_empty_event_name_is_rejected(self):
+        status, body = await self.request("POST", "/events", {"name": ""})
+
+        self.assertEqual(status, 400)
+        self.assertIn("error", body)
+
+    async def test_quiz_with_too_many_options_is_unprocessable(self):
+        options = [models.Option(str(i)) for i in range(grading.MAX_OPTIONS + 1)]
+        async with self.app.uow() as uow:
+            uow.quizzes.add(
+                models.Quiz("quiz1", "Quiz1", [models.Question("?", options)])
+            )
+            await uow.commit()
+
+        status, body = await self.request("POST", "/quizzes/quiz1/launch")
+
+        self.assertEqual(status, 422)
+        self.assertIn("limited to", body["error"])
+
+    async def test_unknown_quiz_is_not_found(self):
+        status, _ = await self.request("POST", "/quizzes/nope/launch")
+
+        self.assertEqual(status, 404)
+
+    async def test_responses_to_published_question_are_collected(self):
+        await self.add_quiz()
+        await self.request("POST", "/quizzes/quiz1/launch")
+        status, _ = await self.request("POST", "/quizzes/quiz1/questions/0/publish")
+        self.assertEqual(status, 200)
+
+        path = "/quizzes/quiz1/questions/0/responses"
+        status, body = await self.request(
+            "POST", path, {"participant": "alice", "selected": 1}
+        )
+        self.assertEqual((status, body), (202, {"accepted": True}))
+        _, body = await self.request(
+            "POST", path, {"participant": "alice", "selected": 2}
+        )
+        self.assertEqual(body, {"accepted": False})
+
+        await self.request("POST", "/quizzes/quiz1/questions/0/close")
+        status, _ = await self.request(
+            "POST", path, {"participant": "bob", "selected": 1}
+        )
+        self.assertEqual(status, 409)
+        async with self.app.uow() as uow:
+            selections = await uow.responses.selections("quiz1", 0)
+        self.assertEqual(list(selections), [("alice", 1)])
+
+    async def test_quiz_must_be_launched_to_be_streamed(self):
+        status, _ = await self.request("GET", "/quizzes/quiz1/stream")
+
+        self.assertEqual(status, 404)
+        self.assertEqual(len(self.app.broadcaster), 0)
+
+    async def test_invalid_selections_are_rejected(self):
+        await self.add_quiz()
+        await self.request("POST", "/quizzes/quiz1/launch")
+        await self.request("POST", "/quizzes/quiz1/questions/0/publish")
+        path = "/quizzes/quiz1/questions/0/responses"
+
+        for selected in (True, -1, 0b100, 1 << 70, "1"):
+            status, _ = await self.request(
+                "POST", path, {"participant": "alice", "selected": selected}
+            )
+            self.assertEqual(status, 400, selected)
+
+    async def test_republished_question_stays_closed(self):
+        await self.add_quiz()
+        await self.request("POST", "/quizzes/quiz1/launch")
+        await self.request("POST", "/quizzes/quiz1/questions/0/publish")
+        await self.request("POST", "/quizzes/quiz1/questions/0/close")
+
+        status, _ = await self.request("POST", "/quizzes/quiz1/questions/0/publish")
+        self.assertEqual(status, 200)
+        status, _ = await self.request(
+            "POST",
+            "/quizzes/quiz1/questions/0/responses",
+            {"participant": "alice", "selected": 1},
+        )
+        self.assertEqual(status, 409)
+
+    async def test_repeated_after_uses_the_first(self):
+        await self.request("POST", "/events", {"name": "Event1"})
+
+        status, events = await self.request("GET", "/events", query="after=0&after=z")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(events), 1)
+
+    async def test_subscribers_receive_published_questions(self):
+        await self.add_quiz()
+        await self.request("POST", "/quizzes/quiz1/launch")
+        sent: list[dict] = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/quizzes/quiz1/stream",
+            "query_string": b"",
+        }
+        stream = asyncio.create_task(self.app(scope, receive, send))
+        await asyncio.sleep(0)
+        await self.request("POST", "/quizzes/quiz1/questions/0/publish")
+        await self.request("POST", "/quizzes/quiz1/close")
+        await asyncio.wait_for(stream, 5)
+
+        frames = [m["body"] for m in sent[1:] if m["body"].startswith(b"data: ")]
+        [frame] = frames
+        self.assertEqual(json.loads(frame[len(b"data: ") :])["text"], "Q1")
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertFalse(sent[-1].get("more_body", False))
+
+
+class ASGILifespanTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        self.tmpdir.cleanup()
+
+    async def lifespan(self, app) -> list[dict]:
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent: list[dict] = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await app({"type": "lifespan"}, receive, send)
+        return sent
+
+    async def test_startup_creates_the_schema(self):
+        path = os.path.join(self.tmpdir.name, "new.sqlite")
+
+        sent = await self.lifespan(create_app(path))
+
+        self.assertEqual(
+            [m["type"] for m in sent],
+            ["lifespan.startup.complete", "lifespan.shutdown.complete"],
+        )
+        with contextlib.closing(sqlite3.connect(path)) as connection:
+            tables = {
+                row[0] for row in connection.execute("SELECT name FROM sqlite_master")
+            }
+        self.assertTrue(tables.issuperset(orm.mapper_registry.metadata.tables))
+
+    async def test_failed_startup_is_reported(self):
+        missing = os.path.join(self.tmpdir.name, "missing", "new.sqlite")
+        app = create_app(missing)
+
+        with self.assertLogs("slidow.entrypoints.asgi_app", "ERROR"):
+            sent = await self.lifespan(app)
+
+        self.assertEqual([m["type"] for m in sent], ["lifespan.startup.failed"])
+        await app.engine.dispose()
+
+    def test_default_database_is_the_flask_apps(self):
+        flask_app = flask_create_app({"TESTING": True, "WARM_UP": False})
+        with mock.patch.dict(os.environ):
+            os.environ.pop("SLIDOW_DATABASE", None)
+            app = create_app()
+
+        self.assertEqual(
+            app.engine.url.database,
+            os.path.join(flask_app.instance_path, "slidow-dev.sqlite"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,18 @@
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
+from sqlalchemy import event
 from sqlalchemy import text as T
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.orm import sessionmaker
 
-from slidow.adapters import orm
-from slidow.entrypoints.flask_app import create_app
+from slidow import models
+from slidow.adapters import orm, profiling, repos
+from slidow.entrypoints.flask_app import create_app, get_write_uow, init_db
+from slidow.service_layer import grading, unit_of_work
 
 
 class FlaskAppTestCase(unittest.TestCase):
@@ -48,6 +57,35 @@ class FlaskAppTestCase(unittest.TestCase):
         self.assertIn("Event1", response.text)
         self.assertIn("Event2", response.text)
 
+    def test_events_are_added_through_group_commits(self):
+        self.app.config["GROUP_COMMITTER"] = unit_of_work.GroupCommitter(
+            sessionmaker(bind=self.session.get_bind(), expire_on_commit=False),
+            max_wait=0,
+        )
+
+        response = self.client.post("/events", data={"name": "Event1"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("Event1", self.client.get("/events").text)
+        self.assertEqual(self.app.config["GROUP_COMMITTER"].commits, 1)
+
+    def test_can_page_through_events(self):
+        for i in range(3):
+            self.client.post("/events", data={"name": f"Event{i}"})
+
+        response = self.client.get("/events?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text.count("<li>"), 2)
+        self.assertIn("Next", response.text)
+
+        [(last_identifier,)] = self.session.execute(
+            T("SELECT identifier FROM event ORDER BY identifier LIMIT 1 OFFSET 1")
+        )
+        response = self.client.get(f"/events?limit=2&after={last_identifier}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text.count("<li>"), 1)
+        self.assertNotIn("Next", response.text)
+
     def test_can_add_an_event(self):
 
         response = self.client.post("/events", data={"name": "Event1"})
@@ -57,11 +95,440 @@ class FlaskAppTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("Event1", response.text)
 
+    def test_can_import_and_export_quizzes(self):
+        quiz_line = (
+            '{"identifier": "quiz1", "title": "warmup quiz", "questions": ['
+            '{"text": "Is Bitcoin Dead?", "options": ['
+            '{"text": "yes", "correct": false}, {"text": "no", "correct": true}]}]}'
+        )
+        runner = self.app.test_cli_runner()
+
+        with tempfile.TemporaryDirectory() as directory:
+            import_path = os.path.join(directory, "quizzes.jsonl")
+            export_path = os.path.join(directory, "exported.jsonl")
+            with open(import_path, "w") as f:
+                f.write(quiz_line + "\n")
+
+            result = runner.invoke(args=["import-quizzes", import_path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("Imported 1 quizzes", result.output)
+            version = self.app.config["DATA_VERSIONS"].read(self.session, "quizzes")
+            self.assertEqual(version.versions, (1,))
+
+            result = runner.invoke(args=["export-quizzes", export_path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(export_path) as f:
+                self.assertEqual(json.loads(f.read()), json.loads(quiz_line))
+
+    def test_writes_are_read_back_through_the_aggregate_cache(self):
+        repos.QuizSQLAlchemyRepo(self.session).add(models.Quiz("quiz1", "Before", []))
+        self.session.commit()
+        self.client.post("/quizzes/quiz1/launch")
+
+        with self.app.test_request_context():
+            with get_write_uow() as uow:
+                uow.quizzes.get("quiz1").title = "After"
+                uow.commit()
+        self.client.post("/quizzes/quiz1/launch")
+
+        self.assertEqual(
+            self.app.extensions["slidow"].launched_quizzes["quiz1"].title, "After"
+        )
+
+    def test_can_launch_a_quiz_and_get_its_questions(self):
+        question = models.Question(
+            "Is Bitcoin Dead?", [models.Option("yes"), models.Option("no", True)]
+        )
+        repos.QuizSQLAlchemyRepo(self.session).add(
+            models.Quiz("quiz1", "warmup quiz", [question])
+        )
+        self.session.commit()
+
+        response = self.client.post("/quizzes/quiz1/launch")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json, {"quiz": "quiz1", "questions": 1})
+
+        response = self.client.get("/quizzes/quiz1/questions/0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["options"], ["yes", "no"])
+
+        response = self.client.get("/quizzes/quiz1/questions/1")
+        self.assertEqual(response.status_code, 404)
+
+    def test_published_questions_are_streamed(self):
+        question = models.Question("Is Bitcoin Dead?", [models.Option("no", True)])
+        repos.QuizSQLAlchemyRepo(self.session).add(
+            models.Quiz("quiz1", "warmup quiz", [question])
+        )
+        self.session.commit()
+        self.client.post("/quizzes/quiz1/launch")
+
+        stream = self.client.get("/quizzes/quiz1/stream", buffered=False)
+        self.assertEqual(stream.mimetype, "text/event-stream")
+
+        response = self.client.post("/quizzes/quiz1/questions/0/publish")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post("/quizzes/quiz1/close")
+        self.assertEqual(response.status_code, 204)
+
+        [frame] = [f for f in stream.response if f.startswith(b"data: ")]
+        self.assertEqual(json.loads(frame[len(b"data: ") :])["index"], 0)
+
+    def test_quiz_must_be_launched_to_be_streamed(self):
+        response = self.client.get("/quizzes/quiz1/stream")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.app.extensions["slidow"].broadcaster), 0)
+
+    def test_quiz_with_too_many_options_cannot_be_launched(self):
+        options = [models.Option(str(i)) for i in range(grading.MAX_OPTIONS + 1)]
+        repos.QuizSQLAlchemyRepo(self.session).add(
+            models.Quiz("quiz1", "Quiz1", [models.Question("?", options)])
+        )
+        self.session.commit()
+
+        response = self.client.post("/quizzes/quiz1/launch")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("limited to", response.json["error"])
+        self.assertNotIn("quiz1", self.app.extensions["slidow"].launched_quizzes)
+
+    def test_unknown_quiz_cannot_be_launched(self):
+        response = self.client.post("/quizzes/quiz1/launch")
+        self.assertEqual(response.status_code, 404)
+
     def test_must_specify_event_name(self):
 
         response = self.client.post("/events")
         self.assertEqual(response.status_code, 400)
 
 
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = create_app(
+            {"TESTING": True, "DATABASE": os.path.join(self.tmpdir.name, "db.sqlite")}
+        )
+        with self.app.app_context():
+            init_db()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+
+        self.app.config["DB_ROUTER"].dispose()
+        self.tmpdir.cleanup()
+
+    def sample(self, text: str, name: str) -> float:
+        [line] = [line for line in text.splitlines() if line.startswith(name + " ")]
+        return float(line.rsplit(" ", 1)[1])
+
+    def test_metrics_count_requests_queries_rows_and_commits(self):
+        self.client.post("/events", data={"name": "Event1"})
+        self.client.get("/events")
+
+        text = self.client.get("/metrics").text
+
+        endpoint = 'endpoint="slidow.events_list"'
+        self.assertEqual(
+            self.sample(
+                text,
+                f'slidow_requests_total{{{endpoint},method="GET",status="200"}}',
+            ),
+            1,
+        )
+        self.assertEqual(
+            self.sample(text, f"slidow_request_duration_seconds_count{{{endpoint}}}"), 2
+        )
+        self.assertGreater(
+            self.sample(text, f"slidow_request_queries_sum{{{endpoint}}}"), 1
+        )
+        # the data version, the database's epoch and the event
+        self.assertEqual(
+            self.sample(text, f"slidow_db_rows_fetched_total{{{endpoint}}}"), 3
+        )
+        self.assertEqual(
+            self.sample(text, f"slidow_commit_duration_seconds_count{{{endpoint}}}"), 1
+        )
+
+    def test_metrics_can_be_turned_off(self):
+        app = create_app(
+            {
+                "TESTING": True,
+                "DATABASE": os.path.join(self.tmpdir.name, "db.sqlite"),
+                "METRICS": False,
+            }
+        )
+
+        self.assertEqual(app.test_client().get("/metrics").status_code, 404)
+
+
+class QueryProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "DATABASE": os.path.join(self.tmpdir.name, "db.sqlite"),
+                "QUERY_PROFILING": True,
+                "SLOW_QUERY_SECONDS": 0.0,
+            }
+        )
+        with self.app.app_context():
+            init_db()
+
+    def tearDown(self):
+
+        self.app.config["DB_ROUTER"].dispose()
+        self.tmpdir.cleanup()
+
+    def test_slow_queries_are_logged(self):
+
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            self.app.test_client().get("/events")
+
+        self.assertIn("GET /events: slow query", logs.output[0])
+        self.assertTrue(any("FROM event " in line for line in logs.output))
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = create_app(
+            {"TESTING": True, "DATABASE": os.path.join(self.tmpdir.name, "db.sqlite")}
+        )
+        with self.app.app_context():
+            init_db()
+        self.client = self.app.test_client()
+        self.client.post("/events", data={"name": "Event1"})
+
+    def tearDown(self):
+
+        self.app.config["DB_ROUTER"].dispose()
+        self.tmpdir.cleanup()
+
+    def test_unchanged_events_are_not_modified(self):
+        etag = self.client.get("/events").headers["ETag"]
+        profiler = profiling.QueryProfiler()
+        profiler.instrument(self.app.config["DB_ROUTER"].primary)
+
+        with profiler.record() as log:
+            response = self.client.get("/events", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        [query] = log.queries
+        self.assertIn("FROM data_version", query.statement)
+
+    def test_new_events_change_the_etag(self):
+        first = self.client.get("/events")
+
+        self.client.post("/events", data={"name": "Event2"})
+        response = self.client.get(
+            "/events", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Event2", response.text)
+        self.assertNotEqual(response.headers["ETag"], first.headers["ETag"])
+
+    def test_event_listings_are_rendered_once_per_version(self):
+        cache = self.app.config["FRAGMENT_CACHE"]
+
+        self.client.get("/events")
+        self.client.get("/events")
+        self.client.post("/events", data={"name": "Event2"})
+        response = self.client.get("/events")
+
+        self.assertIn("Event2", response.text)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIn("slidow_fragment_cache_hits 1", self.client.get("/metrics").text)
+
+    def test_if_modified_since_is_honoured(self):
+        last_modified = self.client.get("/events").headers["Last-Modified"]
+
+        response = self.client.get(
+            "/events", headers={"If-Modified-Since": last_modified}
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+
+class WarmUpTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config = {
+            "TESTING": True,
+            "DATABASE": os.path.join(self.tmpdir.name, "db.sqlite"),
+        }
+        app = create_app(self.config)
+        with app.app_context():
+            init_db()
+        app.config["DB_ROUTER"].dispose()
+
+    def tearDown(self):
+
+        self.tmpdir.cleanup()
+
+    def test_app_is_warmed_up_before_serving(self):
+        app = create_app(self.config)
+        report = app.config["WARM_UP_REPORT"]
+        cache_hits = []
+        event.listen(
+            app.config["DB_ROUTER"].primary,
+            "after_cursor_execute",
+            lambda *args: cache_hits.append(args[4].cache_hit == CACHE_HIT),
+        )
+
+        response = app.test_client().get("/events")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(report.statements, 0)
+        self.assertIn("templates", report.seconds)
+        # the data version and the listing, both compiled by the warm-up
+        self.assertEqual(cache_hits, [True, True])
+        app.config["DB_ROUTER"].dispose()
+
+    def test_warm_up_can_be_disabled(self):
+        app = create_app({**self.config, "WARM_UP": False})
+
+        self.assertNotIn("WARM_UP_REPORT", app.config)
+        app.config["DB_ROUTER"].dispose()
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.primary = os.path.join(self.tmpdir.name, "primary.sqlite")
+        self.replica = os.path.join(self.tmpdir.name, "replica.sqlite")
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "DATABASE": self.primary,
+                "REPLICA_DATABASES": [self.replica],
+            }
+        )
+        with self.app.app_context():
+            init_db()
+        self.replicate()
+
+    def tearDown(self):
+
+        self.app.config["DB_ROUTER"].dispose()
+        self.tmpdir.cleanup()
+
+    def replicate(self):
+        shutil.copyfile(self.primary, self.replica)
+
+    def test_writer_reads_its_own_writes(self):
+        client = self.app.test_client()
+
+        client.post("/events", data={"name": "Event1"})
+
+        self.assertIn("Event1", client.get("/events").text)
+
+    def test_other_clients_read_from_replicas(self):
+        self.app.test_client().post("/events", data={"name": "Event1"})
+        reader = self.app.test_client()
+
+        self.assertNotIn("Event1", reader.get("/events").text)
+        self.replicate()
+        self.assertIn("Event1", reader.get("/events").text)
+
+    def test_only_reads_from_the_primary_fill_the_aggregate_cache(self):
+        with self.app.config["DB_SESSION_FACTORY"]() as session:
+            repos.QuizSQLAlchemyRepo(session).add(
+                models.Quiz("quiz1", "Quiz1", [models.Question("Q1", [])])
+            )
+            session.commit()
+        self.replicate()
+        cache = self.app.config["AGGREGATE_CACHE"]
+
+        self.app.test_client().post("/quizzes/quiz1/launch")
+        self.assertEqual(len(cache), 0)
+
+        writer = self.app.test_client()
+        writer.post("/events", data={"name": "Event1"})
+        writer.post("/quizzes/quiz1/launch")
+        self.assertEqual(len(cache), 1)
+
+
+class ShardedAppTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        shards = [os.path.join(self.tmpdir.name, f"shard{i}.sqlite") for i in range(3)]
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "DATABASE": os.path.join(self.tmpdir.name, "primary.sqlite"),
+                "SHARD_DATABASES": shards,
+            }
+        )
+        with self.app.app_context():
+            init_db()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+
+        for shard_engine in self.app.config["SHARD_ENGINES"]:
+            shard_engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_events_are_listed_across_shards(self):
+        for i in range(6):
+            self.client.post("/events", data={"name": f"Event{i}"})
+
+        response = self.client.get("/events?limit=4")
+        names = [f"Event{i}" for i in range(6) if f"Event{i}" in response.text]
+        self.assertEqual(len(names), 4)
+
+        stored = 0
+        for shard_engine in self.app.config["SHARD_ENGINES"]:
+            with shard_engine.connect() as conn:
+                stored += conn.execute(T("SELECT count(*) FROM event")).scalar()
+        self.assertEqual(stored, 6)
+
+    def test_quizzes_are_imported_to_and_exported_from_the_shards(self):
+        lines = [
+            json.dumps({"identifier": f"quiz{i}", "title": f"Quiz{i}", "questions": []})
+            for i in range(6)
+        ]
+        runner = self.app.test_cli_runner()
+
+        with tempfile.TemporaryDirectory() as directory:
+            import_path = os.path.join(directory, "quizzes.jsonl")
+            export_path = os.path.join(directory, "exported.jsonl")
+            with open(import_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+
+            result = runner.invoke(args=["import-quizzes", import_path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            result = runner.invoke(args=["export-quizzes", export_path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(export_path) as f:
+                self.assertEqual(sorted(f.read().splitlines()), lines)
+
+        per_shard = []
+        for shard_engine in self.app.config["SHARD_ENGINES"]:
+            with shard_engine.connect() as conn:
+                per_shard.append(conn.execute(T("SELECT count(*) FROM quiz")).scalar())
+        self.assertEqual(sum(per_shard), 6)
+        self.assertEqual(per_shard.count(6), 0)
+        primary = self.app.config["DB_SESSION_FACTORY"].get_bind()
+        with primary.connect() as conn:
+            self.assertEqual(conn.execute(T("SELECT count(*) FROM quiz")).scalar(), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,187 @@
+"""Asyncio unit of work, repository and service tests"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text as T
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from slidow import models
+from slidow.adapters import orm, repos, versioning
+from slidow.service_layer import async_services, responses, unit_of_work
+
+
+class AsyncSQLAlchemyUOWTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "slidow-test.sqlite")
+        self.engine = create_async_engine("sqlite+aiosqlite:///" + path)
+        async with self.engine.begin() as connection:
+            await connection.run_sync(orm.mapper_registry.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def uow(self) -> unit_of_work.AsyncSQLAlchemyUOW:
+        return unit_of_work.AsyncSQLAlchemyUOW(self.session_factory)
+
+    async def test_uow_can_add_an_event(self):
+
+        async with self.uow() as uow:
+            uow.events.add(models.Event("event1", "Event1"))
+            await uow.commit()
+
+        async with self.session_factory() as session:
+            result = await session.execute(T("SELECT identifier, name FROM event"))
+            self.assertEqual(list(result), [("event1", "Event1")])
+
+    async def test_uncommitted_transactions_not_persisted(self):
+
+        async with self.uow() as uow:
+            uow.events.add(models.Event("event1", "Event1"))
+
+        async with self.session_factory() as session:
+            result = await session.execute(T("SELECT * FROM event"))
+            self.assertEqual(list(result), [])
+
+    async def test_get_loads_the_whole_quiz(self):
+        quiz = models.Quiz(
+            "quiz1",
+            "Quiz1",
+            [models.Question("Q1", [models.Option("A", True), models.Option("B")])],
+        )
+        async with self.uow() as uow:
+            uow.quizzes.add(quiz)
+            await uow.commit()
+
+        async with self.uow() as uow:
+            loaded = await uow.quizzes.get("quiz1")
+            options = [o.text for o in loaded.questions[0].options]
+
+        self.assertEqual(options, ["A", "B"])
+
+    async def test_bulk_saved_quizzes_keep_their_questions_and_options(self):
+        quizzes = [
+            models.Quiz(
+                f"quiz{i}",
+                f"Quiz{i}",
+                [models.Question("Q1", [models.Option("A", True), models.Option("B")])],
+            )
+            for i in range(2)
+        ]
+        async with self.uow() as uow:
+            await uow.quizzes.add_all(quizzes)
+            await uow.commit()
+
+        async with self.uow() as uow:
+            loaded = await uow.quizzes.get("quiz1")
+            options = [(o.text, o.correct) for o in loaded.questions[0].options]
+        self.assertEqual(options, [("A", True), ("B", False)])
+
+    async def test_bulk_saved_events_keep_their_quizzes(self):
+        versions = versioning.DataVersions()
+        quiz = models.Quiz("quiz1", "Quiz1", [])
+        async with unit_of_work.AsyncSQLAlchemyUOW(
+            self.session_factory, versions
+        ) as uow:
+            await uow.events.add_all(
+                [
+                    models.Event("event1", "Event1", quizzes=[quiz]),
+                    models.Event("e2", "E2"),
+                ]
+            )
+            await uow.commit()
+
+        async with self.uow() as uow:
+            loaded = await uow.events.get("event1")
+            quizzes = [q.identifier for q in loaded.quizzes]
+        async with self.session_factory() as session:
+            version = await session.run_sync(versions.read, "events", "quizzes")
+        self.assertEqual(quizzes, ["quiz1"])
+        self.assertEqual(version.versions, (1, 1))
+
+    async def test_services_add_and_page_events(self):
+        identifiers = [
+            await async_services.add_event(name, self.uow()) for name in "abc"
+        ]
+
+        async with self.session_factory() as session:
+            repo = repos.AsyncEventSQLAlchemyRepo(session)
+            first = await async_services.get_events(repo, limit=2)
+            rest = await async_services.get_events(repo, 2, after=first[-1][0])
+
+        self.assertEqual([i for i, _ in (*first, *rest)], sorted(identifiers))
+
+    async def test_collected_responses_are_graded(self):
+        quiz = models.Quiz(
+            "quiz1",
+            "Quiz1",
+            [models.Question("Q1", [models.Option("A", True), models.Option("B")])],
+        )
+        async with self.uow() as uow:
+            uow.quizzes.add(quiz)
+            await uow.commit()
+        collector = responses.AsyncResponseCollector(self.uow(), max_batch=2)
+        collector.open_question("quiz1", 0)
+
+        self.assertTrue(collector.submit("alice", "quiz1", 0, 0b01))
+        self.assertFalse(collector.submit("alice", "quiz1", 0, 0b10))
+        self.assertTrue(collector.submit("bob", "quiz1", 0, 0b10))
+        await collector.close_question("quiz1", 0)
+
+        with self.assertRaises(responses.QuestionClosedError):
+            collector.submit("carol", "quiz1", 0, 0b01)
+        scores = await async_services.grade_question("quiz1", 0, self.uow())
+        self.assertEqual(scores, {"alice": 1.0, "bob": 0.0})
+
+    async def test_collected_responses_bump_their_version(self):
+        versions = versioning.DataVersions()
+        collector = responses.AsyncResponseCollector(
+            unit_of_work.AsyncSQLAlchemyUOW(self.session_factory, versions)
+        )
+        collector.open_question("quiz1", 0)
+
+        collector.submit("alice", "quiz1", 0, 0b01)
+        await collector.close_question("quiz1", 0)
+
+        async with self.session_factory() as session:
+            version = await session.run_sync(versions.read, "responses")
+        self.assertEqual(version.versions, (1,))
+
+    async def test_collector_drops_a_bad_response_and_keeps_flushing(self):
+        collector = responses.AsyncResponseCollector(self.uow(), max_batch=2)
+        collector.open_question("quiz1", 0)
+
+        with self.assertLogs("slidow.service_layer.responses", "ERROR") as logs:
+            collector.submit("alice", "quiz1", 0, 1 << 70)
+            collector.submit("bob", "quiz1", 0, 0b01)
+            await collector.stop()
+
+        async with self.uow() as uow:
+            selections = await uow.responses.selections("quiz1", 0)
+        self.assertEqual(list(selections), [("bob", 1)])
+        self.assertEqual((collector.flushed, collector.dropped), (1, 1))
+        self.assertIn("Dropped response", "\n".join(logs.output))
+
+    async def test_failed_scheduled_flushes_are_logged(self):
+        collector = responses.AsyncResponseCollector(self.uow(), max_batch=1)
+        collector.open_question("quiz1", 0)
+
+        async def flush():
+            raise RuntimeError("disk full")
+
+        collector.flush = flush  # type: ignore[method-assign]
+        with self.assertLogs("slidow.service_layer.responses", "ERROR") as logs:
+            collector.submit("alice", "quiz1", 0, 0b01)
+            await asyncio.sleep(0.01)
+
+        self.assertIn("disk full", "\n".join(logs.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
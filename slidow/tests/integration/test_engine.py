@@ -0,0 +1,99 @@
+"""SQLite engine profile tests"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text as T
+
+from slidow.adapters import engine
+
+
+class SQLiteProfileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmpdir.name, "slidow-test.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_production_profile_is_applied_on_connect(self):
+
+        db_engine = engine.create_sqlite_engine(self.database, "production")
+        with db_engine.connect() as conn:
+            journal_mode = conn.execute(T("PRAGMA journal_mode")).scalar()
+            synchronous = conn.execute(T("PRAGMA synchronous")).scalar()
+            busy_timeout = conn.execute(T("PRAGMA busy_timeout")).scalar()
+        db_engine.dispose()
+
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual(synchronous, 1)  # NORMAL
+        self.assertEqual(busy_timeout, 5000)
+        self.assertEqual(db_engine.pool.size(), 16)  # type: ignore[attr-defined]
+
+    def test_default_profile_keeps_sqlite_defaults(self):
+
+        db_engine = engine.create_sqlite_engine(self.database)
+        with db_engine.connect() as conn:
+            journal_mode = conn.execute(T("PRAGMA journal_mode")).scalar()
+        db_engine.dispose()
+
+        self.assertEqual(journal_mode, "delete")
+
+    def test_in_memory_database_ignores_pool_settings(self):
+
+        db_engine = engine.create_sqlite_engine(":memory:", "production")
+        with db_engine.connect() as conn:
+            self.assertEqual(conn.execute(T("PRAGMA busy_timeout")).scalar(), 5000)
+
+    def test_unknown_profile_is_rejected(self):
+
+        with self.assertRaises(ValueError):
+            engine.create_sqlite_engine(self.database, "turbo")
+
+    def test_async_engine_applies_profile(self):
+
+        async def journal_mode():
+            db_engine = engine.create_async_sqlite_engine(self.database, "production")
+            async with db_engine.connect() as conn:
+                mode = (await conn.execute(T("PRAGMA journal_mode"))).scalar()
+            await db_engine.dispose()
+            return mode
+
+        self.assertEqual(asyncio.run(journal_mode()), "wal")
+
+
+class ReplicaRouterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.primary, *self.replicas = [
+            engine.create_sqlite_engine(":memory:") for _ in range(3)
+        ]
+        self.router = engine.ReplicaRouter(
+            self.primary, self.replicas, read_your_writes=5.0, clock=lambda: self.now
+        )
+
+    def test_reads_are_spread_over_replicas(self):
+
+        reads = [self.router.read_engine() for _ in range(4)]
+
+        self.assertEqual(reads, self.replicas * 2)
+        self.assertIs(self.router.write_engine(), self.primary)
+
+    def test_reads_follow_recent_writes_to_the_primary(self):
+
+        self.assertIs(self.router.read_engine(last_write=96.0), self.primary)
+        self.assertIn(self.router.read_engine(last_write=95.0), self.replicas)
+
+    def test_reads_go_to_the_primary_without_replicas(self):
+
+        router = engine.ReplicaRouter(self.primary)
+
+        self.assertIs(router.read_engine(), self.primary)
+
+
+if __name__ == "__main__":
+    unittest.main()
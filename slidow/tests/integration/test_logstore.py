@@ -0,0 +1,191 @@
+"""Persistent key-value store tests"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from slidow import models
+from slidow.adapters import logstore, repos
+from slidow.service_layer import services, unit_of_work
+
+
+class LogStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "slidow.log")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open(self, **kwargs) -> logstore.LogStore:
+        store = logstore.LogStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_values_persist_across_reopening(self):
+        store = self.open()
+        store["events"] = {}
+        store["events"]["event1"] = models.Event("event1", "Friday Hangout")
+        store["events"]["event2"] = models.Event("event2", "Happy Hour")
+        store["events"]["event1"] = models.Event("event1", "Renamed")
+        del store["events"]["event2"]
+        store.close()
+
+        reopened = logstore.LogStore(self.path)
+        self.addCleanup(reopened.close)
+
+        self.assertEqual(list(reopened), ["events"])
+        self.assertEqual(
+            list(reopened["events"].values()), [models.Event("event1", "Renamed")]
+        )
+
+    def test_compaction_drops_overwritten_records(self):
+        store = self.open()
+        store["scores"] = {}
+        for round_ in range(50):
+            store["scores"]["quiz1"] = [("alice", float(round_))]
+        size = store.size
+
+        store.compact()
+
+        self.assertLess(store.size, size / 10)
+        self.assertEqual(store.garbage, 0)
+        self.assertEqual(store["scores"]["quiz1"], [("alice", 49.0)])
+        store.close()
+        reopened = logstore.LogStore(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened["scores"]["quiz1"], [("alice", 49.0)])
+
+    def test_compacts_once_garbage_passes_the_ratio(self):
+        store = self.open(compact_ratio=0.5, compact_min_bytes=1024)
+        store["scores"] = {}
+
+        for round_ in range(100):
+            store["scores"]["quiz1"] = [("alice", float(round_))]
+
+        self.assertGreater(store.compactions, 0)
+        self.assertLess(store.garbage, store.size)
+        self.assertEqual(store["scores"]["quiz1"], [("alice", 99.0)])
+
+    def test_a_torn_final_record_is_dropped(self):
+        store = self.open()
+        store["events"] = {}
+        store["events"]["event1"] = models.Event("event1", "Kept")
+        store["events"]["event2"] = models.Event("event2", "Torn")
+        store.close()
+        with open(self.path, "r+b") as log:
+            log.truncate(os.path.getsize(self.path) - 3)
+
+        reopened = logstore.LogStore(self.path)
+        self.addCleanup(reopened.close)
+        reopened["events"]["event3"] = models.Event("event3", "Written after")
+
+        self.assertEqual(sorted(reopened["events"]), ["event1", "event3"])
+        self.assertEqual(reopened["events"]["event3"].name, "Written after")
+
+    def test_reads_run_concurrently_with_compaction(self):
+        store = self.open(compact_ratio=0.5, compact_min_bytes=1024)
+        store["scores"] = {"quiz1": [("alice", 0.0)]}
+        table = store["scores"]
+        writing = threading.Event()
+        writing.set()
+        errors: list[Exception] = []
+
+        def read():
+            while writing.is_set():
+                try:
+                    table["quiz1"]
+                except Exception as err:
+                    errors.append(err)
+                    return
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for round_ in range(1, 500):
+            table["quiz1"] = [("alice", float(round_))]
+        writing.clear()
+        for reader in readers:
+            reader.join(timeout=5)
+
+        self.assertEqual(errors, [])
+        self.assertGreater(store.compactions, 5)
+        self.assertEqual(table["quiz1"], [("alice", 499.0)])
+
+    def test_index_lookup_follows_writes(self):
+        store = self.open()
+        store["events"] = {
+            "event1": models.Event("event1", "Quiz Night"),
+            "event2": models.Event("event2", "Hangout"),
+        }
+        table = store["events"]
+        table.add_index("name", lambda event: event.name)
+
+        table["event3"] = models.Event("event3", "Quiz Night")
+        table["event1"] = models.Event("event1", "Renamed")
+
+        found = [event.identifier for event in table.lookup("name", "Quiz Night")]
+        self.assertEqual(found, ["event3"])
+        self.assertEqual(list(table.lookup("name", "Missing")), [])
+
+
+class KeyValUOWTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "slidow.log")
+
+    def test_services_run_on_a_log_store(self):
+        store = logstore.LogStore(self.path)
+        question = models.Question("Is Bitcoin Dead?", [models.Option("no", True)])
+        event_identifier = services.add_event(
+            "Quiz Night", unit_of_work.KeyValUOW(store)
+        )
+        [quiz_identifier] = services.add_quizzes(
+            [("warmup", [question])], unit_of_work.KeyValUOW(store)
+        )
+        store.close()
+
+        store = logstore.LogStore(self.path)
+        self.addCleanup(store.close)
+        uow = unit_of_work.KeyValUOW(store)
+        with uow:
+            self.assertEqual(uow.events.get(event_identifier).name, "Quiz Night")
+            self.assertEqual(uow.quizzes.get(quiz_identifier).title, "warmup")
+
+    def test_commit_writes_back_fetched_aggregates(self):
+        store = logstore.LogStore(self.path)
+        self.addCleanup(store.close)
+        repos.EventKeyValRepo(store).add(models.Event("event1", "Before"))
+
+        with unit_of_work.KeyValUOW(store) as uow:
+            uow.events.get("event1").name = "Rolled back"
+        with unit_of_work.KeyValUOW(store) as uow:
+            uow.events.get("event1").name = "After"
+            uow.commit()
+
+        self.assertEqual(store["events"]["event1"].name, "After")
+
+    def test_responses_for_a_question_use_an_index(self):
+        store = logstore.LogStore(self.path)
+        self.addCleanup(store.close)
+        repo = repos.ResponseKeyValRepo(store)
+        repo.add_all(
+            [
+                models.Response("alice", "quiz1", 0, 1),
+                models.Response("alice", "quiz1", 1, 0),
+                models.Response("bob", "quiz1", 0, 0),
+            ]
+        )
+
+        selections = repo.selections("quiz1", 0)
+
+        self.assertTrue(store["responses"].has_index("question"))
+        self.assertEqual(sorted(selections), [("alice", 1), ("bob", 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Schema tests"""
+
+import unittest
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy import text as T
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from slidow import models
+from slidow.adapters import orm
+
+
+class SchemaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_lookup_and_foreign_key_columns_are_indexed(self):
+        orm.mapper_registry.metadata.create_all(self.engine)
+
+        indexed = self.indexed_columns()
+
+        self.assertIn(("event", ("identifier",), True), indexed)
+        self.assertIn(("quiz", ("identifier",), True), indexed)
+        self.assertIn(("event_quiz", ("event_id", "quiz_id"), True), indexed)
+        self.assertIn(("event_quiz", ("quiz_id",), False), indexed)
+        self.assertIn(("question", ("quiz_id",), False), indexed)
+        self.assertIn(("option", ("question_id",), False), indexed)
+
+    def test_event_identifiers_are_unique(self):
+        orm.mapper_registry.metadata.create_all(self.engine)
+        session = sessionmaker(bind=self.engine)()
+
+        session.add(models.Event("event1", "Event1"))
+        session.add(models.Event("event1", "Event2"))
+
+        with self.assertRaises(IntegrityError):
+            session.commit()
+        session.close()
+
+    def test_can_add_indexes_to_existing_database(self):
+        with self.engine.begin() as conn:
+            for table in ("event", "quiz", "event_quiz", "question", "option"):
+                conn.execute(T(f'CREATE TABLE "{table}" (id INTEGER PRIMARY KEY)'))
+            conn.execute(T('ALTER TABLE "event" ADD COLUMN identifier TEXT'))
+            conn.execute(T('ALTER TABLE "quiz" ADD COLUMN identifier TEXT'))
+            conn.execute(T('ALTER TABLE "event_quiz" ADD COLUMN event_id INTEGER'))
+            conn.execute(T('ALTER TABLE "event_quiz" ADD COLUMN quiz_id INTEGER'))
+            conn.execute(T('ALTER TABLE "question" ADD COLUMN quiz_id INTEGER'))
+            conn.execute(T('ALTER TABLE "option" ADD COLUMN question_id INTEGER'))
+        self.assertEqual(self.indexed_columns(), set())
+
+        # as init-db does, create missing tables then missing indexes
+        orm.mapper_registry.metadata.create_all(self.engine)
+        orm.create_indexes(self.engine)
+        # safe to run repeatedly
+        orm.create_indexes(self.engine)
+
+        self.assertIn(("event", ("identifier",), True), self.indexed_columns())
+        self.assertIn(("option", ("question_id",), False), self.indexed_columns())
+
+    def indexed_columns(self) -> set[tuple]:
+        inspector = inspect(self.engine)
+        return {
+            (table, tuple(index["column_names"]), bool(index["unique"]))
+            for table in inspector.get_table_names()
+            for index in inspector.get_indexes(table)
+        }
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,8 @@ from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 
 from slidow import models
-from slidow.adapters import orm, repos
+from slidow.adapters import orm, profiling, repos
+from slidow.service_layer import grading
 
 Session = sessionmaker()
 
@@ -29,6 +30,9 @@ def do_begin(conn):
 
 orm.mapper_registry.metadata.create_all(engine)
 
+profiler = profiling.QueryProfiler()
+profiler.instrument(engine)
+
 
 class SQLAlchemyRepositoryTestCase(unittest.TestCase):
 
@@ -87,6 +91,41 @@ class SQLAlchemyRepositoryTestCase(unittest.TestCase):
         self.assertTrue(event1 in retrieved_events)
         self.assertTrue(event2 in retrieved_events)
 
+    def test_can_page_through_events(self):
+
+        for i in range(5):
+            self.insert_event(self.session, f"event{i}", f"Event {i}")
+        repo = repos.EventSQLAlchemyRepo(self.session)
+
+        first_page = repo.page(2)
+        second_page = repo.page(2, after=first_page[-1].identifier)
+        last_page = repo.page(2, after=second_page[-1].identifier)
+
+        self.assertEqual([e.identifier for e in first_page], ["event0", "event1"])
+        self.assertEqual([e.identifier for e in second_page], ["event2", "event3"])
+        self.assertEqual([e.identifier for e in last_page], ["event4"])
+
+    def test_can_get_event_summaries(self):
+
+        for i in range(3):
+            self.insert_event(self.session, f"event{i}", f"Event {i}")
+        repo = repos.EventSQLAlchemyRepo(self.session)
+
+        summaries = repo.summaries(2, after="event0")
+
+        self.assertEqual(summaries, [("event1", "Event 1"), ("event2", "Event 2")])
+        self.assertEqual(len(self.session.identity_map), 0)
+
+    def test_can_stream_events(self):
+
+        for i in range(5):
+            self.insert_event(self.session, f"event{i}", f"Event {i}")
+        repo = repos.EventSQLAlchemyRepo(self.session)
+
+        identifiers = {event.identifier for event in repo.stream(batch_size=2)}
+
+        self.assertEqual(identifiers, {f"event{i}" for i in range(5)})
+
     def test_can_save_a_quiz(self):
         quiz = self.create_quiz()
 
@@ -157,6 +196,219 @@ class SQLAlchemyRepositoryTestCase(unittest.TestCase):
             rows, [(option1.text, option1.correct), (option2.text, option2.correct)]
         )
 
+    def test_can_bulk_save_events(self):
+
+        events = [models.Event(f"event{i}", f"Event {i}") for i in range(3)]
+        repo = repos.EventSQLAlchemyRepo(self.session)
+
+        repo.add_all(events)
+        self.session.commit()
+
+        result = self.session.execute(text('SELECT identifier FROM "event"'))
+        self.assertEqual(sorted(result.scalars()), ["event0", "event1", "event2"])
+
+    def test_can_bulk_save_quizzes(self):
+
+        quizzes = [self.create_large_quiz(f"quiz{i}", questions=3) for i in range(2)]
+        repo = repos.QuizSQLAlchemyRepo(self.session)
+
+        repo.add_all(quizzes)
+        self.session.commit()
+
+        for quiz in quizzes:
+            retrieved_quiz = repo.get(quiz.identifier, load="full")
+            self.assertEqual(retrieved_quiz.questions, quiz.questions)
+
+    def test_can_stream_quizzes_as_dicts(self):
+
+        quiz = self.create_quiz()
+        empty_quiz = models.Quiz("quiz2", "empty quiz", questions=[])
+        repo = repos.QuizSQLAlchemyRepo(self.session)
+        repo.add_all([quiz, empty_quiz])
+        self.session.commit()
+
+        documents = list(repo.stream_dicts(batch_size=1))
+
+        self.assertEqual(
+            documents,
+            [
+                {
+                    "identifier": "quiz1",
+                    "title": "warmup quiz",
+                    "questions": [
+                        {
+                            "text": "Is Bitcoin Dead?",
+                            "options": [
+                                {"text": "yes", "correct": False},
+                                {"text": "no", "correct": True},
+                            ],
+                        }
+                    ],
+                },
+                {"identifier": "quiz2", "title": "empty quiz", "questions": []},
+            ],
+        )
+
+    def test_can_bulk_save_responses(self):
+
+        repo = repos.ResponseSQLAlchemyRepo(self.session)
+        repo.add_all(
+            [
+                models.Response("alice", "quiz1", 0, 0b01),
+                models.Response("bob", "quiz1", 0, 0b10),
+                models.Response("alice", "quiz1", 1, 0b10),
+            ]
+        )
+        self.session.commit()
+
+        retrieved = repo.for_question("quiz1", 0)
+
+        self.assertEqual(
+            sorted((r.participant, r.selected) for r in retrieved),
+            [("alice", 0b01), ("bob", 0b10)],
+        )
+        self.assertEqual(
+            sorted(repo.selections("quiz1", 0)), [("alice", 0b01), ("bob", 0b10)]
+        )
+
+    def test_can_save_a_response_selecting_the_last_option(self):
+
+        top = 1 << (grading.MAX_OPTIONS - 1)
+        repo = repos.ResponseSQLAlchemyRepo(self.session)
+        repo.add_all([models.Response("alice", "quiz1", 0, top)])
+        self.session.commit()
+
+        self.assertEqual(list(repo.selections("quiz1", 0)), [("alice", top)])
+
+    def test_later_responses_of_a_participant_are_skipped(self):
+
+        repo = repos.ResponseSQLAlchemyRepo(self.session)
+        repo.add_all([models.Response("alice", "quiz1", 0, 0b01)])
+        self.session.commit()
+        repo.add_all(
+            [
+                models.Response("alice", "quiz1", 0, 0b10),
+                models.Response("bob", "quiz1", 0, 0b10),
+            ]
+        )
+        self.session.commit()
+
+        self.assertEqual(
+            sorted(repo.selections("quiz1", 0)), [("alice", 0b01), ("bob", 0b10)]
+        )
+
+    def test_can_replace_quiz_scores(self):
+
+        repo = repos.ScoreSQLAlchemyRepo(self.session)
+        repo.replace("quiz1", [("alice", 1.0), ("bob", 0.5)])
+        repo.replace("quiz2", [("alice", 3.0)])
+        self.session.commit()
+
+        repo.replace("quiz1", [("alice", 2.0), ("bob", 1.5)])
+        self.session.commit()
+
+        self.assertEqual(sorted(repo.for_quiz("quiz1")), [("alice", 2.0), ("bob", 1.5)])
+        self.assertEqual(list(repo.for_quiz("quiz2")), [("alice", 3.0)])
+
+    def test_full_quiz_load_takes_constant_queries(self):
+
+        quiz = self.create_large_quiz("quiz1", questions=50)
+        repos.QuizSQLAlchemyRepo(self.session).add(quiz)
+        self.session.commit()
+        self.session.expunge_all()
+
+        repo = repos.QuizSQLAlchemyRepo(self.session)
+        profiles: tuple[tuple[repos.LoadProfile, int], ...] = (
+            ("full", 3),
+            ("joined", 1),
+        )
+        for load, expected_queries in profiles:
+            with profiler.record() as log:
+                retrieved_quiz = repo.get("quiz1", load=load)
+                options = [o for q in retrieved_quiz.questions for o in q.options]
+            self.assertEqual(len(log.selects()), expected_queries, load)
+            self.assertEqual(len(options), 200)
+            self.session.expunge_all()
+
+    def test_full_event_load_takes_constant_queries(self):
+
+        quizzes = [self.create_large_quiz(f"quiz{i}", questions=10) for i in range(5)]
+        event = models.Event("event1", "Friday Funday", quizzes=quizzes)
+        repos.EventSQLAlchemyRepo(self.session).add(event)
+        self.session.commit()
+        self.session.expunge_all()
+
+        repo = repos.EventSQLAlchemyRepo(self.session)
+        profiles: tuple[tuple[repos.LoadProfile, int], ...] = (
+            ("full", 4),
+            ("joined", 1),
+        )
+        for load, expected_queries in profiles:
+            with profiler.record() as log:
+                retrieved_event = repo.get("event1", load=load)
+                options = [
+                    option
+                    for quiz in retrieved_event.quizzes
+                    for question in quiz.questions
+                    for option in question.options
+                ]
+            self.assertEqual(len(log.selects()), expected_queries, load)
+            self.assertEqual(len(options), 200)
+            self.session.expunge_all()
+
+    def test_lazy_loads_in_a_loop_are_flagged(self):
+
+        repo = repos.QuizSQLAlchemyRepo(self.session)
+        repo.add(self.create_large_quiz("quiz1", questions=5))
+        self.session.commit()
+        self.session.expunge_all()
+
+        with profiler.record() as log:
+            quiz = repo.get("quiz1", load="lazy")
+            [option.text for q in quiz.questions for option in q.options]
+        self.session.expunge_all()
+
+        [(statement, runs)] = log.repeated().items()
+        self.assertIn("FROM option", statement)
+        self.assertEqual(runs, 5)
+        with profiler.expect(max_queries=3):
+            quiz = repo.get("quiz1", load="full")
+            [option.text for q in quiz.questions for option in q.options]
+
+    def test_query_budget_is_enforced(self):
+
+        repo = repos.QuizSQLAlchemyRepo(self.session)
+        repo.add(self.create_large_quiz("quiz1", questions=5))
+        self.session.commit()
+        self.session.expunge_all()
+
+        with self.assertRaises(AssertionError):
+            with profiler.expect(max_queries=10):
+                quiz = repo.get("quiz1", load="lazy")
+                [option.text for q in quiz.questions for option in q.options]
+        with self.assertRaises(profiling.QueryBudgetError):
+            with profiler.expect(max_queries=1, allow_repeats=True):
+                repo.get("quiz1", load="full").questions[0].options
+
+    def test_unknown_load_profile_is_rejected(self):
+
+        repo = repos.QuizSQLAlchemyRepo(self.session)
+        with self.assertRaises(ValueError):
+            repo.get("quiz1", load="eager")  # type: ignore[arg-type]
+
+    def create_large_quiz(self, identifier, questions):
+        return models.Quiz(
+            identifier,
+            f"{identifier} title",
+            questions=[
+                models.Question(
+                    f"{identifier} question {i}",
+                    [models.Option(f"option {j}", correct=j == 0) for j in range(4)],
+                )
+                for i in range(questions)
+            ],
+        )
+
     def create_quiz(self):
         option1 = models.Option("yes")
         option2 = models.Option("no", correct=True)
@@ -191,7 +443,8 @@ class SQLAlchemyRepositoryTestCase(unittest.TestCase):
     def insert_option(self, session, question_id, option_text, correct) -> int:
         session.execute(
             text(
-                "INSERT INTO option (question_id, text, correct) VALUES (:question_id, :text, :correct)"
+                "INSERT INTO option (question_id, text, correct)"
+                " VALUES (:question_id, :text, :correct)"
             ),
             dict(question_id=question_id, text=option_text, correct=correct),
         )
@@ -249,6 +502,34 @@ class KeyValRepositoryTestCase(unittest.TestCase):
         self.assertTrue(event1 in retrieved_events)
         self.assertTrue(event2 in retrieved_events)
 
+    def test_can_page_through_events(self):
+        key_value_store: dict[str, dict] = {
+            "events": {
+                f"event{i}": models.Event(f"event{i}", "Event") for i in range(5)
+            }
+        }
+        repo = repos.EventKeyValRepo(key_value_store)
+
+        first_page = repo.page(3)
+        second_page = repo.page(3, after=first_page[-1].identifier)
+
+        self.assertEqual(
+            [e.identifier for e in first_page], ["event0", "event1", "event2"]
+        )
+        self.assertEqual([e.identifier for e in second_page], ["event3", "event4"])
+
+    def test_can_get_event_summaries(self):
+        key_value_store: dict[str, dict] = {
+            "events": {
+                f"event{i}": models.Event(f"event{i}", "Event") for i in range(3)
+            }
+        }
+        repo = repos.EventKeyValRepo(key_value_store)
+
+        summaries = repo.summaries(2, after="event0")
+
+        self.assertEqual(summaries, [("event1", "Event"), ("event2", "Event")])
+
     def test_can_save_a_quiz(self):
         text = "What is trending most on X?"
         option1 = models.Option(text="Bitcoin ETF", correct=True)
@@ -1,14 +1,18 @@
 """Unit of work tests"""
 
+import os
+import tempfile
+import threading
 import unittest
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy import text as T
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 
 from slidow import models
-from slidow.adapters import orm
-from slidow.service_layer import unit_of_work
+from slidow.adapters import caching, orm, profiling, sharding, versioning
+from slidow.service_layer import services, unit_of_work
 
 
 class SQLAlchemyUOWTestCase(unittest.TestCase):
@@ -59,6 +63,393 @@ class SQLAlchemyUOWTestCase(unittest.TestCase):
         results = list(new_session.execute(T("SELECT * FROM event")))
         self.assertEqual(results, [])
 
+    def test_import_reports_the_line_of_a_duplicate_identifier(self):
+        uow = unit_of_work.SQLAlchemyUOW(self.session_factory)
+        services.import_quizzes(['{"identifier": "quiz1", "title": "Quiz1"}'], uow)
+        lines = [
+            '{"identifier": "quiz2", "title": "Quiz2"}',
+            '{"identifier": "quiz3", "title": "Quiz3"}',
+            '{"identifier": "quiz1", "title": "Again"}',
+        ]
+
+        with self.assertRaises(services.InvalidQuizDocumentError) as raised:
+            services.import_quizzes(lines, uow)
+
+        self.assertEqual(
+            raised.exception.msg,
+            "Invalid Quiz on line 3: duplicate identifier 'quiz1'",
+        )
+        session = self.session_factory()
+        titles = session.execute(T("SELECT title FROM quiz")).scalars().all()
+        self.assertEqual(titles, ["Quiz1"])
+
+
+class ServiceQueryBudgetTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.engine = create_engine("sqlite:///:memory:")
+        orm.mapper_registry.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.profiler = profiling.QueryProfiler()
+        self.profiler.instrument(self.engine)
+
+    def tearDown(self):
+
+        self.profiler.uninstrument(self.engine)
+        self.engine.dispose()
+
+    def uow(self):
+        return unit_of_work.SQLAlchemyUOW(self.session_factory)
+
+    def test_adding_events_takes_one_insert(self):
+
+        with self.profiler.expect(max_queries=1) as log:
+            services.add_events([f"Event{i}" for i in range(50)], self.uow())
+
+        [insert] = log.queries
+        self.assertTrue(insert.statement.startswith("INSERT INTO event"))
+
+    def test_grading_takes_constant_queries(self):
+
+        questions = [
+            models.Question(f"Q{n}", [models.Option(str(i)) for i in range(4)])
+            for n in range(3)
+        ]
+        [identifier] = services.add_quizzes([("quiz", questions)], self.uow())
+        with self.uow() as uow:
+            uow.responses.add_all(
+                models.Response(f"p{i}", identifier, 0, 1) for i in range(100)
+            )
+            uow.commit()
+
+        with self.profiler.expect(max_queries=4):
+            services.grade_question(identifier, 0, self.uow())
+
+
+class DataVersionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.engine = create_engine("sqlite:///:memory:")
+        orm.mapper_registry.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.versions = versioning.DataVersions(clock=lambda: 1700000000.0)
+
+    def uow(self):
+        return unit_of_work.SQLAlchemyUOW(self.session_factory, versions=self.versions)
+
+    def read(self, *names):
+        with self.session_factory() as session:
+            return self.versions.read(session, *names)
+
+    def test_commits_bump_the_versions_of_the_data_written(self):
+
+        self.assertEqual(self.read("events").versions, (0,))
+        services.add_event("Event1", self.uow())
+        services.add_events(["Event2", "Event3"], self.uow())
+        services.add_quizzes([("quiz", [])], self.uow())
+
+        version = self.read("events", "quizzes")
+        self.assertEqual(version.versions, (2, 1))
+        self.assertEqual(version.etag, f"{version.epoch:x}-events+quizzes-2-1")
+        self.assertEqual(version.last_modified.timestamp(), 1700000000.0)
+
+    def test_versions_of_another_database_differ(self):
+
+        services.add_event("Event1", self.uow())
+        epoch = self.read("events").epoch
+        services.add_event("Event2", self.uow())
+        self.assertEqual(self.read("events").epoch, epoch)
+        other = create_engine("sqlite:///:memory:")
+        orm.mapper_registry.metadata.create_all(other)
+        other_uow = unit_of_work.SQLAlchemyUOW(
+            sessionmaker(bind=other, expire_on_commit=False), versions=self.versions
+        )
+
+        services.add_event("Event1", other_uow)
+        services.add_event("Event2", other_uow)
+
+        with sessionmaker(bind=other)() as session:
+            version = self.versions.read(session, "events")
+        self.assertEqual(version.versions, self.read("events").versions)
+        self.assertNotEqual(version.etag, self.read("events").etag)
+
+    def test_rollback_keeps_the_versions(self):
+
+        with self.uow() as uow:
+            uow.events.add(models.Event("event1", "Event1"))
+
+        services.add_event("Event2", self.uow())
+
+        self.assertEqual(self.read("events").versions, (1,))
+
+
+class CachingSQLAlchemyUOWTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.engine = create_engine("sqlite:///:memory:")
+        orm.mapper_registry.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.cache = caching.AggregateCache()
+        self.queries: list[str] = []
+        event.listen(self.engine, "before_cursor_execute", self.count_query)
+
+        quiz = models.Quiz(
+            "quiz1", "Quiz1", [models.Question("Q1", [models.Option("A", True)])]
+        )
+        with self.uow() as uow:
+            uow.events.add(models.Event("event1", "Event1", quizzes=[quiz]))
+            uow.commit()
+
+    def tearDown(self):
+
+        orm.mapper_registry.metadata.drop_all(self.engine)
+
+    def count_query(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    def uow(self) -> unit_of_work.SQLAlchemyUOW:
+        return unit_of_work.SQLAlchemyUOW(self.session_factory, cache=self.cache)
+
+    def get_quiz(self) -> tuple[str, str]:
+        with self.uow() as uow:
+            quiz = uow.quizzes.get("quiz1")
+            return quiz.title, quiz.questions[0].options[0].text
+
+    def test_repeated_reads_do_not_query(self):
+
+        self.get_quiz()
+        self.queries.clear()
+
+        self.assertEqual(self.get_quiz(), ("Quiz1", "A"))
+        self.assertEqual(self.queries, [])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_committed_write_invalidates_the_aggregate(self):
+
+        self.get_quiz()
+        with self.uow() as uow:
+            uow.session.get(models.Quiz, 1).title = "Renamed"
+            uow.commit()
+
+        self.assertEqual(self.get_quiz()[0], "Renamed")
+
+    def test_writes_to_a_child_invalidate_its_aggregate_and_dependents(self):
+
+        with self.uow() as uow:
+            uow.events.get("event1")
+        with self.uow() as uow:
+            question = uow.quizzes.repo.get("quiz1", load="full").questions[0]
+            question.text = "Q1, reworded"
+            uow.commit()
+
+        self.assertEqual(len(self.cache), 0)
+        with self.uow() as uow:
+            event_ = uow.events.get("event1")
+            self.assertEqual(event_.quizzes[0].questions[0].text, "Q1, reworded")
+
+    def test_rolled_back_write_keeps_the_cached_aggregate(self):
+
+        self.get_quiz()
+        with self.uow() as uow:
+            uow.session.get(models.Quiz, 1).title = "Renamed"
+            uow.session.flush()
+
+        self.assertEqual(self.get_quiz()[0], "Quiz1")
+        self.assertEqual(self.cache.invalidations, 0)
+
+    def test_units_that_do_not_fill_the_cache_still_read_from_it(self):
+
+        with unit_of_work.SQLAlchemyUOW(
+            self.session_factory, cache=self.cache, fill_cache=False
+        ) as uow:
+            self.assertEqual(uow.quizzes.get("quiz1").title, "Quiz1")
+        self.assertEqual(len(self.cache), 0)
+
+        self.get_quiz()
+        self.queries.clear()
+        with unit_of_work.SQLAlchemyUOW(
+            self.session_factory, cache=self.cache, fill_cache=False
+        ) as uow:
+            self.assertEqual(uow.quizzes.get("quiz1").title, "Quiz1")
+        self.assertEqual(self.queries, [])
+
+    def test_changes_to_a_read_aggregate_are_not_seen_by_other_readers(self):
+
+        self.get_quiz()
+        with self.uow() as uow:
+            uow.quizzes.get("quiz1").title = "Renamed"
+            uow.session.flush()
+
+        self.assertEqual(self.get_quiz()[0], "Quiz1")
+
+    def test_changes_to_a_cached_aggregate_are_committed(self):
+
+        self.get_quiz()
+        with self.uow() as uow:
+            quiz = uow.quizzes.get("quiz1")
+            quiz.title = "Renamed"
+            quiz.questions[0].options[0].text = "B"
+            uow.commit()
+
+        self.assertEqual(self.get_quiz(), ("Renamed", "B"))
+        with self.session_factory() as session:
+            text = session.scalar(T("SELECT text FROM option"))
+        self.assertEqual(text, "B")
+
+
+class BatchingUOWTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "slidow-test.sqlite")
+        self.engine = create_engine("sqlite:///" + path)
+        orm.mapper_registry.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.committer = unit_of_work.GroupCommitter(
+            self.session_factory, max_wait=0.01
+        )
+
+    def tearDown(self):
+
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def stored_events(self) -> list[str]:
+        with self.session_factory() as session:
+            return list(session.scalars(T("SELECT identifier FROM event")))
+
+    def add_event(self, identifier: str) -> None:
+        with unit_of_work.BatchingUOW(self.committer) as uow:
+            uow.events.add(models.Event(identifier, identifier.title()))
+            uow.commit()
+
+    def test_committed_aggregates_are_invalidated(self):
+
+        cache = caching.AggregateCache()
+        self.committer.cache = cache
+        cache.put((models.Event, "event1"), "stale", cache.generation)
+        cache.put((models.Event, "event2"), "kept", cache.generation)
+
+        self.add_event("event1")
+
+        self.assertIsNone(cache.get((models.Event, "event1")))
+        self.assertEqual(cache.get((models.Event, "event2")), "kept")
+
+    def test_concurrent_units_share_commits(self):
+
+        errors: list[Exception] = []
+
+        def add(identifier):
+            try:
+                self.add_event(identifier)
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=add, args=(f"event{i}",)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.stored_events()), 20)
+        self.assertEqual(self.committer.units, 20)
+        self.assertLess(self.committer.commits, 20)
+
+    def test_failed_unit_is_reported_to_its_caller_only(self):
+
+        self.add_event("event1")
+        outcomes: dict[str, Exception | None] = {}
+        start = threading.Barrier(2)
+
+        def add(identifier, key):
+            start.wait()
+            try:
+                self.add_event(identifier)
+            except Exception as err:
+                outcomes[key] = err
+            else:
+                outcomes[key] = None
+
+        threads = [
+            threading.Thread(target=add, args=("event1", "duplicate")),
+            threading.Thread(target=add, args=("event2", "new")),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertIsInstance(outcomes["duplicate"], IntegrityError)
+        self.assertIsNone(outcomes["new"])
+        self.assertEqual(sorted(self.stored_events()), ["event1", "event2"])
+
+    def test_uncommitted_writes_are_discarded(self):
+
+        with unit_of_work.BatchingUOW(self.committer) as uow:
+            uow.events.add(models.Event("event1", "Event1"))
+
+        self.assertEqual(self.stored_events(), [])
+        self.assertEqual(self.committer.commits, 0)
+
+
+class ShardedSQLAlchemyUOWTestCase(unittest.TestCase):
+
+    def setUp(self):
+
+        self.engines = [create_engine("sqlite:///:memory:") for _ in range(3)]
+        for engine in self.engines:
+            orm.mapper_registry.metadata.create_all(engine)
+        self.session_factories = [sessionmaker(bind=e) for e in self.engines]
+
+    def uow(self) -> unit_of_work.ShardedSQLAlchemyUOW:
+        return unit_of_work.ShardedSQLAlchemyUOW(self.session_factories)
+
+    def stored_events(self, shard: int) -> list[str]:
+        session = self.session_factories[shard]()
+        return list(session.scalars(T("SELECT identifier FROM event")))
+
+    def test_events_are_committed_to_their_shard(self):
+
+        with self.uow() as uow:
+            uow.events.add_all(models.Event(f"event{i}", "Event") for i in range(9))
+            uow.commit()
+
+        for shard in range(3):
+            for identifier in self.stored_events(shard):
+                self.assertEqual(sharding.shard_for(identifier, 3), shard)
+        self.assertEqual(sum(len(self.stored_events(s)) for s in range(3)), 9)
+
+        with self.uow() as uow:
+            self.assertEqual(len(uow.events.list()), 9)
+
+    def test_quiz_saved_with_an_event_is_found_in_the_event_shard(self):
+
+        # a quiz whose own shard differs from its event's
+        quiz_id = next(
+            f"quiz{i}"
+            for i in range(100)
+            if sharding.shard_for(f"quiz{i}", 3) != sharding.shard_for("event1", 3)
+        )
+        quiz = models.Quiz(quiz_id, "Quiz", [models.Question("Q1", [])])
+        with self.uow() as uow:
+            uow.events.add(models.Event("event1", "Event1", quizzes=[quiz]))
+            uow.commit()
+
+        with self.uow() as uow:
+            self.assertEqual(uow.quizzes.get(quiz_id).title, "Quiz")
+
+    def test_uncommitted_writes_are_not_persisted(self):
+
+        with self.uow() as uow:
+            uow.events.add(models.Event("event1", "Event1"))
+
+        self.assertEqual(sum(len(self.stored_events(s)) for s in range(3)), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+"""Engine warm-up tests"""
+
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.orm import Session
+
+from slidow.adapters import engine, orm, repos, warmup
+
+
+class WarmUpTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = engine.create_sqlite_engine(
+            os.path.join(self.tmpdir.name, "slidow-test.sqlite")
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_repo_queries_hit_the_statement_cache_after_warm_up(self):
+        orm.mapper_registry.metadata.create_all(self.engine)
+        report = warmup.warm_up([self.engine])
+        cache_hits = []
+        event.listen(
+            self.engine,
+            "after_cursor_execute",
+            lambda *args: cache_hits.append(args[4].cache_hit == CACHE_HIT),
+        )
+
+        with Session(self.engine) as session:
+            repos.EventSQLAlchemyRepo(session).summaries(20, "event1")
+            repos.QuizSQLAlchemyRepo(session).page(20)
+
+        self.assertGreater(report.statements, 0)
+        self.assertEqual(cache_hits, [True, True])
+
+    def test_pool_is_opened(self):
+        report = warmup.warm_up([self.engine], connections=3)
+
+        self.assertEqual(report.connections, 3)
+        self.assertEqual(self.engine.pool.checkedin(), 3)  # type: ignore[attr-defined]
+
+    def test_pool_size_is_opened_by_default(self):
+        self.assertEqual(warmup.open_pool(self.engine), 5)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_forked_processes_do_not_reuse_the_pool(self):
+        orm.mapper_registry.metadata.create_all(self.engine)
+        warmup.warm_up([self.engine], connections=3)
+
+        pid = os.fork()
+        if pid == 0:
+            # the child's own connection is the only one in its pool
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            checked_in = self.engine.pool.checkedin()  # type: ignore[attr-defined]
+            os._exit(0 if checked_in == 1 else 1)
+        _, status = os.waitpid(pid, 0)
+
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(self.engine.pool.checkedin(), 3)  # type: ignore[attr-defined]
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT 1")).scalar(), 1)
+
+    def test_missing_schema_is_left_alone(self):
+        report = warmup.warm_up([self.engine])
+
+        self.assertEqual(report.statements, 0)
+        self.assertEqual(inspect(self.engine).get_table_names(), [])
+        self.assertEqual(set(report.seconds), {"mappers", "connections", "statements"})
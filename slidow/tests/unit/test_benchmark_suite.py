@@ -0,0 +1,40 @@
+import unittest
+
+from slidow.benchmarks import suite
+
+
+def results(*medians: tuple[str, int, float]) -> dict:
+    return {
+        "schema": suite.SCHEMA_VERSION,
+        "results": [
+            {"name": name, "rows": rows, "median_us": median}
+            for name, rows, median in medians
+        ],
+    }
+
+
+class CompareTestCase(unittest.TestCase):
+
+    def test_pairs_cases_by_name_and_rows(self):
+        baseline = results(("GET /events", 1000, 100.0), ("GET /events", 10, 50.0))
+        current = results(("GET /events", 1000, 150.0), ("POST /events", 1000, 1.0))
+
+        [comparison] = suite.compare(baseline, current)
+
+        self.assertEqual((comparison.name, comparison.rows), ("GET /events", 1000))
+        self.assertEqual(comparison.ratio, 1.5)
+
+    def test_flags_slowdowns_beyond_the_threshold(self):
+        comparison = suite.Comparison("GET /events", 1000, 100.0, 115.0)
+
+        self.assertFalse(comparison.regressed(0.2))
+        self.assertTrue(comparison.regressed(0.1))
+
+    def test_measures_at_least_one_call(self):
+        calls = []
+
+        result = suite.measure("noop", 1, lambda: calls.append(1), min_time=0)
+
+        self.assertEqual(result.calls, 1)
+        self.assertEqual(len(calls), 2)
+        self.assertLessEqual(result.min_us, result.median_us)
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import unittest
+
+from slidow.service_layer import broadcast
+
+
+class ChannelTestCase(unittest.TestCase):
+
+    def test_every_subscriber_receives_published_messages(self):
+        channel = broadcast.Channel()
+        received: list[list] = [[], []]
+        subscribed = threading.Barrier(3)
+
+        def subscriber(messages):
+            stream = channel.subscribe()
+            subscribed.wait()
+            messages.extend(stream)
+
+        threads = [threading.Thread(target=subscriber, args=(m,)) for m in received]
+        for thread in threads:
+            thread.start()
+        subscribed.wait()
+        channel.publish(b"question 1")
+        channel.publish(b"question 2")
+        channel.close()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(received, [[b"question 1", b"question 2"]] * 2)
+
+    def test_new_subscriber_starts_from_latest_message(self):
+        channel = broadcast.Channel()
+        channel.publish(b"question 1")
+        channel.publish(b"question 2")
+        channel.close()
+
+        self.assertEqual(list(channel.subscribe()), [b"question 2"])
+
+    def test_idle_subscriber_gets_keepalives(self):
+        channel = broadcast.Channel()
+
+        stream = channel.subscribe(timeout=0.01)
+
+        self.assertIsNone(next(stream))
+
+    def test_cannot_publish_to_a_closed_channel(self):
+        channel = broadcast.Channel()
+        channel.close()
+
+        with self.assertRaises(ValueError):
+            channel.publish(b"question 1")
+
+
+class AsyncChannelTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_every_subscriber_receives_published_messages(self):
+        channel = broadcast.AsyncChannel()
+        streams = [channel.subscribe(), channel.subscribe()]
+
+        async def follow(stream):
+            return [message async for message in stream]
+
+        followers = [asyncio.create_task(follow(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        channel.publish(b"question 1")
+        channel.publish(b"question 2")
+        channel.close()
+
+        received = await asyncio.wait_for(asyncio.gather(*followers), 5)
+        self.assertEqual(received, [[b"question 1", b"question 2"]] * 2)
+
+    async def test_async_channel_is_dropped_when_its_last_subscriber_leaves(self):
+        broadcaster = broadcast.AsyncBroadcaster()
+        subscription = broadcaster.subscribe("quiz1", timeout=0.01)
+        await anext(subscription)
+
+        await subscription.aclose()
+
+        self.assertEqual(len(broadcaster), 0)
+
+    async def test_idle_subscriber_gets_keepalives(self):
+        channel = broadcast.AsyncChannel()
+
+        stream = channel.subscribe(timeout=0.01)
+
+        self.assertIsNone(await anext(stream))
+
+
+class BroadcasterTestCase(unittest.TestCase):
+
+    def test_closed_channels_are_replaced(self):
+        broadcaster = broadcast.Broadcaster()
+        channel = broadcaster.channel("quiz1")
+
+        broadcaster.close("quiz1")
+
+        self.assertTrue(channel.closed)
+        self.assertIsNot(broadcaster.channel("quiz1"), channel)
+
+    def test_channel_is_dropped_when_its_last_subscriber_leaves(self):
+        broadcaster = broadcast.Broadcaster()
+        first = broadcaster.subscribe("quiz1", timeout=0.01)
+        second = broadcaster.subscribe("quiz1", timeout=0.01)
+        next(first), next(second)
+
+        first.close()
+        self.assertEqual(len(broadcaster), 1)
+        second.close()
+        self.assertEqual(len(broadcaster), 0)
+
+    def test_channel_with_messages_is_kept_for_reconnects(self):
+        broadcaster = broadcast.Broadcaster()
+        subscription = broadcaster.subscribe("quiz1", timeout=0.01)
+        broadcaster.publish("quiz1", b"question 1")
+        next(subscription)
+
+        subscription.close()
+
+        self.assertEqual(next(broadcaster.subscribe("quiz1")), b"question 1")
+
+    def test_async_broadcaster_creates_async_channels(self):
+        broadcaster = broadcast.AsyncBroadcaster()
+
+        self.assertIsInstance(broadcaster.channel("quiz1"), broadcast.AsyncChannel)
+
+    def test_sse_frame(self):
+        self.assertEqual(broadcast.sse_frame(b'{"a":1}'), b'data: {"a":1}\n\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from slidow import models
+from slidow.adapters import caching
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class AggregateCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = caching.AggregateCache(max_size=2, ttl=10.0, clock=self.clock)
+
+    def put(self, identifier: str, value, depends_on=()):
+        key = (models.Quiz, identifier)
+        return self.cache.put(key, value, self.cache.generation, depends_on)
+
+    def get(self, identifier: str):
+        return self.cache.get((models.Quiz, identifier))
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertIsNone(self.get("quiz1"))
+        self.put("quiz1", "Quiz1")
+
+        self.assertEqual(self.get("quiz1"), "Quiz1")
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.put("quiz1", "Quiz1")
+        self.put("quiz2", "Quiz2")
+        self.get("quiz1")
+        self.put("quiz3", "Quiz3")
+
+        self.assertIsNone(self.get("quiz2"))
+        self.assertEqual(self.get("quiz1"), "Quiz1")
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_entries_expire_after_ttl(self):
+        self.put("quiz1", "Quiz1")
+        self.clock.now = 10.0
+
+        self.assertIsNone(self.get("quiz1"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidation_drops_dependent_entries(self):
+        self.put("quiz1", "Quiz1")
+        self.cache.put(
+            (models.Event, "event1"),
+            "Event1",
+            self.cache.generation,
+            depends_on=[(models.Quiz, "quiz1")],
+        )
+
+        self.cache.invalidate([(models.Quiz, "quiz1")])
+
+        self.assertIsNone(self.get("quiz1"))
+        self.assertIsNone(self.cache.get((models.Event, "event1")))
+        self.assertEqual(self.cache.invalidations, 2)
+
+    def test_dropped_entries_are_not_kept_as_dependents(self):
+        for identifier in ("event1", "event2", "event3"):
+            self.cache.put(
+                (models.Event, identifier),
+                identifier,
+                self.cache.generation,
+                depends_on=[(models.Quiz, f"quiz-of-{identifier}")],
+            )
+        self.clock.now = 10.0
+        for identifier in ("event2", "event3"):
+            self.cache.get((models.Event, identifier))
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache._dependents, {})
+
+    def test_value_loaded_across_an_invalidation_is_not_stored(self):
+        generation = self.cache.generation
+        self.cache.invalidate([(models.Quiz, "quiz1")])
+
+        stored = self.cache.put((models.Quiz, "quiz1"), "stale", generation)
+
+        self.assertFalse(stored)
+        self.assertIsNone(self.get("quiz1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
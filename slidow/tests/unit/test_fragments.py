@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from slidow.adapters import fragments
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+
+    def test_renders_once_per_key(self):
+        cache = fragments.FragmentCache()
+        renders = []
+
+        def render():
+            renders.append(1)
+            return "<ul></ul>"
+
+        for _ in range(3):
+            self.assertEqual(cache.get_or_render(("events", "v1"), render), "<ul></ul>")
+
+        self.assertEqual(len(renders), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertAlmostEqual(cache.hit_rate(), 2 / 3)
+
+    def test_least_recently_used_fragments_are_evicted_by_size(self):
+        cache = fragments.FragmentCache(max_bytes=10)
+        cache.get_or_render(("a",), lambda: "aaaa")
+        cache.get_or_render(("b",), lambda: "bbbb")
+        cache.get_or_render(("a",), lambda: "aaaa")
+
+        cache.get_or_render(("c",), lambda: "cccc")
+
+        self.assertEqual(cache.size, 8)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.get_or_render(("a",), lambda: "new"), "aaaa")
+        self.assertEqual(cache.get_or_render(("b",), lambda: "new"), "new")
+
+    def test_fragments_larger_than_the_cache_are_not_kept(self):
+        cache = fragments.FragmentCache(max_bytes=3)
+
+        cache.get_or_render(("a",), lambda: "aaaa")
+
+        self.assertEqual(len(cache), 0)
+
+
+class FileFragmentStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_caches_share_fragments_through_the_store(self):
+        store = fragments.FileFragmentStore(self.directory.name)
+        first = fragments.FragmentCache(store=store)
+        second = fragments.FragmentCache(
+            store=fragments.FileFragmentStore(self.directory.name)
+        )
+
+        first.get_or_render(("events", "v1"), lambda: "<ul></ul>")
+        fragment = second.get_or_render(("events", "v1"), lambda: "rendered again")
+
+        self.assertEqual(fragment, "<ul></ul>")
+        self.assertEqual(second.shared_hits, 1)
+
+    def test_prune_removes_the_oldest_fragments(self):
+        store = fragments.FileFragmentStore(self.directory.name, max_bytes=10)
+        for index, key in enumerate("abc"):
+            store.put((key,), "x" * 5)
+            path = store._path((key,))
+            os.utime(path, (index, index))
+
+        store.prune()
+
+        self.assertIsNone(store.get(("a",)))
+        self.assertEqual(store.get(("c",)), "xxxxx")
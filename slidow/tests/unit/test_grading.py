@@ -0,0 +1,44 @@
+import unittest
+
+from slidow import models
+from slidow.service_layer import grading
+
+
+class CorrectMaskTestCase(unittest.TestCase):
+
+    def test_mask_has_a_bit_per_correct_option(self):
+        question = models.Question(
+            "Which are even?",
+            [
+                models.Option("1"),
+                models.Option("2", correct=True),
+                models.Option("3"),
+                models.Option("4", correct=True),
+            ],
+        )
+        self.assertEqual(grading.correct_mask(question), 0b1010)
+
+    def test_too_many_options_is_an_error(self):
+        question = models.Question("?", [models.Option(str(i)) for i in range(64)])
+        with self.assertRaises(ValueError):
+            grading.correct_mask(question)
+
+
+class GradeTestCase(unittest.TestCase):
+
+    selections = [("alice", 0b1010), ("bob", 0b0010), ("carol", 0b1011), ("dan", 0)]
+
+    def test_only_exact_selections_score(self):
+        scores = grading.grade(0b1010, self.selections)
+        self.assertEqual(scores, {"alice": 1.0, "bob": 0.0, "carol": 0.0, "dan": 0.0})
+
+    def test_partial_credit_for_multiple_correct_options(self):
+        scores = grading.grade(0b1010, self.selections, partial=True)
+        self.assertEqual(scores, {"alice": 1.0, "bob": 0.5, "carol": 0.5, "dan": 0.0})
+
+    def test_no_selections(self):
+        self.assertEqual(grading.grade(0b1, []), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
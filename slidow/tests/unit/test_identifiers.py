@@ -0,0 +1,58 @@
+import unittest
+
+from slidow import identifiers
+
+
+class ULIDGeneratorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_700_000_000_000
+        self.generator = identifiers.ULIDGenerator(clock=lambda: self.now)
+
+    def test_identifiers_are_26_base32_characters(self):
+
+        identifier = self.generator.new()
+
+        self.assertEqual(len(identifier), 26)
+        self.assertTrue(set(identifier) <= set(identifiers.ALPHABET))
+
+    def test_identifiers_sort_in_creation_order(self):
+
+        created = [self.generator.new() for _ in range(5)]
+        self.now += 1
+        created += self.generator.batch(100)
+        self.now -= 10  # clocks can step backwards
+        created.append(self.generator.new())
+
+        self.assertEqual(created, sorted(created))
+        self.assertEqual(len(set(created)), len(created))
+
+    def test_prefix_encodes_the_time(self):
+
+        later = identifiers.ULIDGenerator(clock=lambda: self.now + 1).new()
+
+        self.assertLess(self.generator.new()[:10], later[:10])
+        self.assertEqual(self.generator.new()[:10], self.generator.new()[:10])
+
+    def test_generator_is_pluggable(self):
+
+        class Counter:
+            count = 0
+
+            def new(self) -> str:
+                return self.batch(1)[0]
+
+            def batch(self, count: int) -> list[str]:
+                self.count += count
+                return [f"id{i}" for i in range(self.count - count, self.count)]
+
+        previous = identifiers.set_generator(Counter())
+        try:
+            self.assertEqual(identifiers.new_identifiers(2), ["id0", "id1"])
+            self.assertEqual(identifiers.new_identifier(), "id2")
+        finally:
+            identifiers.set_generator(previous)
+
+
+if __name__ == "__main__":
+    unittest.main()
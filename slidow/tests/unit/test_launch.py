@@ -0,0 +1,68 @@
+import dataclasses
+import json
+import unittest
+
+from slidow import models
+from slidow.service_layer import launch
+
+
+class CompileQuizTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.quiz = models.Quiz(
+            "quiz1",
+            "warmup quiz",
+            [
+                models.Question(
+                    "Is Bitcoin Dead?",
+                    [models.Option("yes"), models.Option("no", correct=True)],
+                ),
+                models.Question(
+                    "Which are even?",
+                    [
+                        models.Option("2", True),
+                        models.Option("3"),
+                        models.Option("4", True),
+                    ],
+                ),
+            ],
+        )
+
+    def test_questions_are_served_as_json(self):
+        snapshot = launch.compile_quiz(self.quiz)
+
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(
+            json.loads(snapshot.question(0)),
+            {
+                "quiz": "quiz1",
+                "index": 0,
+                "count": 2,
+                "text": "Is Bitcoin Dead?",
+                "options": ["yes", "no"],
+            },
+        )
+
+    def test_correct_answers_are_kept_apart(self):
+        snapshot = launch.compile_quiz(self.quiz)
+
+        self.assertEqual(snapshot.correct_mask(0), 0b10)
+        self.assertEqual(snapshot.correct_mask(1), 0b101)
+        self.assertNotIn(b"correct", b"".join(snapshot.payloads))
+
+    def test_selections_are_bitmasks_of_the_options(self):
+        snapshot = launch.compile_quiz(self.quiz)
+
+        self.assertTrue(snapshot.is_selection(0, 0b11))
+        self.assertFalse(snapshot.is_selection(0, 0b100))
+        self.assertFalse(snapshot.is_selection(0, -1))
+
+    def test_snapshot_is_immutable(self):
+        snapshot = launch.compile_quiz(self.quiz)
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            snapshot.title = "changed"  # type: ignore[misc]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import random
+import unittest
+
+from slidow.service_layer import leaderboard
+
+
+class LeaderboardTestCase(unittest.TestCase):
+
+    def test_top_participants_are_ranked_by_total_score(self):
+        board = leaderboard.Leaderboard("quiz1")
+
+        board.add_all({"alice": 1.0, "bob": 0.0, "carol": 1.0})
+        board.add_all({"alice": 0.0, "bob": 1.0, "carol": 1.0})
+
+        self.assertEqual(board.top(2), [("carol", 2.0), ("alice", 1.0)])
+        self.assertEqual(len(board), 3)
+
+    def test_ties_are_ranked_by_name(self):
+        board = leaderboard.Leaderboard("quiz1", [("bob", 1.0), ("alice", 1.0)])
+
+        self.assertEqual(board.rank("alice"), 1)
+        self.assertEqual(board.rank("bob"), 2)
+
+    def test_rank_follows_updates(self):
+        board = leaderboard.Leaderboard("quiz1", [("alice", 2.0), ("bob", 1.0)])
+
+        board.add("bob", 1.5)
+
+        self.assertEqual(board.score("bob"), 2.5)
+        self.assertEqual(board.rank("bob"), 1)
+        self.assertEqual(board.rank("alice"), 2)
+
+    def test_matches_a_full_sort(self):
+        board = leaderboard.Leaderboard("quiz1")
+        totals: dict[str, float] = {}
+
+        for _ in range(2000):
+            participant = f"p{random.randrange(100)}"
+            points = random.choice([0.0, 0.5, 1.0])
+            board.add(participant, points)
+            totals[participant] = totals.get(participant, 0.0) + points
+
+        ranking = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        self.assertEqual(board.top(10), ranking[:10])
+        for position, (participant, _) in enumerate(ranking, start=1):
+            self.assertEqual(board.rank(participant), position)
+
+
+if __name__ == "__main__":
+    unittest.main()
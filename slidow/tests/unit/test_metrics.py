@@ -0,0 +1,42 @@
+import unittest
+
+from slidow.adapters import metrics
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_buckets_are_cumulative_and_inclusive(self):
+        histogram = metrics.Histogram([1, 5])
+
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(
+            list(histogram.cumulative()), [("1", 2), ("5", 3), ("+Inf", 4)]
+        )
+        self.assertEqual((histogram.count, histogram.sum), (4, 14.5))
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_renders_finished_requests(self):
+        registry = metrics.Metrics()
+        stats = metrics.start_request("slidow.events_list")
+        stats.queries, stats.rows = 3, 20
+
+        registry.finish_request(stats, "GET", 200)
+
+        text = registry.render()
+        self.assertIsNone(metrics.current_request())
+        self.assertIn(
+            'slidow_requests_total{endpoint="slidow.events_list",method="GET",'
+            'status="200"} 1',
+            text,
+        )
+        self.assertIn(
+            'slidow_request_queries_bucket{endpoint="slidow.events_list",le="3"} 1',
+            text,
+        )
+        self.assertIn(
+            'slidow_db_rows_fetched_total{endpoint="slidow.events_list"} 20', text
+        )
@@ -0,0 +1,179 @@
+import threading
+import unittest
+
+from sqlalchemy.exc import OperationalError
+
+from slidow.adapters import repos
+from slidow.service_layer import responses, unit_of_work
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SQLiteIntegerResponseRepo(repos.ResponseKeyValRepo):
+    """Rejects selections too large for a SQLite INTEGER, as sqlite3 does"""
+
+    def add_all(self, responses):
+        responses = list(responses)
+        if any(r.selected >= 1 << 63 for r in responses):
+            raise OverflowError("Python int too large to convert to SQLite INTEGER")
+        super().add_all(responses)
+
+
+class LockedForResponseRepo(SQLiteIntegerResponseRepo):
+    """Finds the database locked when writing the response of `participant`"""
+
+    participant: str | None = "carol"
+
+    def add_all(self, responses):
+        responses = list(responses)
+        if any(r.participant == self.participant for r in responses[:1]):
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        super().add_all(responses)
+
+
+class ResponseCollectorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.uow = unit_of_work.DummyUOW()
+        self.clock = FakeClock()
+        self.collector = responses.ResponseCollector(
+            self.uow,
+            max_batch=3,
+            max_delay=1.0,
+            clock=self.clock,
+            wall_clock=self.clock,
+        )
+        self.collector.open_question("quiz1", 0)
+
+    def stored(self) -> list[str]:
+        return [r.participant for r in self.uow.responses.for_question("quiz1", 0)]
+
+    def test_responses_are_flushed_in_batches(self):
+
+        self.collector.submit("alice", "quiz1", 0, 0b01)
+        self.collector.submit("bob", "quiz1", 0, 0b10)
+        self.assertEqual(self.stored(), [])
+
+        self.collector.submit("carol", "quiz1", 0, 0b10)
+
+        self.assertEqual(self.stored(), ["alice", "bob", "carol"])
+        self.assertEqual(self.collector.flushed, 3)
+
+    def test_responses_are_flushed_after_max_delay(self):
+
+        self.collector.submit("alice", "quiz1", 0, 0b01)
+        self.assertEqual(self.collector.flush_if_due(), 0)
+
+        self.clock.now = 1.0
+        self.assertEqual(self.collector.flush_if_due(), 1)
+        self.assertEqual(self.stored(), ["alice"])
+
+    def test_only_first_response_per_participant_is_kept(self):
+
+        self.assertTrue(self.collector.submit("alice", "quiz1", 0, 0b01))
+        self.assertFalse(self.collector.submit("alice", "quiz1", 0, 0b10))
+        self.collector.flush()
+        self.assertFalse(self.collector.submit("alice", "quiz1", 0, 0b10))
+
+        [response] = self.uow.responses.for_question("quiz1", 0)
+        self.assertEqual(response.selected, 0b01)
+        self.assertEqual(self.collector.duplicates, 2)
+
+    def test_closing_a_question_flushes_and_rejects_responses(self):
+
+        self.collector.submit("alice", "quiz1", 0, 0b01)
+        self.collector.close_question("quiz1", 0)
+
+        self.assertEqual(self.stored(), ["alice"])
+        with self.assertRaises(responses.QuestionClosedError):
+            self.collector.submit("bob", "quiz1", 0, 0b01)
+
+    def test_reopening_a_question_keeps_its_participants(self):
+
+        self.collector.submit("alice", "quiz1", 0, 0b01)
+        self.collector.close_question("quiz1", 0)
+        self.collector.open_question("quiz1", 0)
+
+        self.assertFalse(self.collector.submit("alice", "quiz1", 0, 0b10))
+        self.assertTrue(self.collector.submit("bob", "quiz1", 0, 0b10))
+
+    def test_responses_are_stamped_with_the_wall_clock(self):
+
+        self.clock.now = 42.0
+        self.collector.submit("alice", "quiz1", 0, 0b01)
+        self.collector.flush()
+
+        [response] = self.uow.responses.for_question("quiz1", 0)
+        self.assertEqual(response.answered_at, 42.0)
+
+    def test_a_bad_response_is_dropped_without_holding_up_others(self):
+        self.uow.responses = SQLiteIntegerResponseRepo(self.uow.kv_store)
+        self.collector.open_question("quiz2", 0)
+
+        with self.assertLogs("slidow.service_layer.responses", "ERROR"):
+            self.collector.submit("alice", "quiz1", 0, 1 << 64)
+            self.collector.submit("bob", "quiz1", 0, 0b10)
+            self.collector.submit("carol", "quiz2", 0, 0b01)
+        self.collector.submit("dave", "quiz2", 0, 0b01)
+        self.collector.flush()
+
+        self.assertEqual(self.stored(), ["bob"])
+        self.assertEqual(
+            [r.participant for r in self.uow.responses.for_question("quiz2", 0)],
+            ["carol", "dave"],
+        )
+        self.assertEqual((self.collector.flushed, self.collector.dropped), (3, 1))
+
+    def test_responses_written_before_a_transient_error_are_counted(self):
+        self.uow.responses = LockedForResponseRepo(self.uow.kv_store)
+        self.collector.max_batch = 10
+
+        self.collector.submit("alice", "quiz1", 0, 1 << 64)
+        self.collector.submit("bob", "quiz1", 0, 0b10)
+        self.collector.submit("carol", "quiz1", 0, 0b01)
+        with self.assertLogs("slidow.service_layer.responses", "ERROR"):
+            with self.assertRaises(OperationalError):
+                self.collector.flush()
+
+        self.assertEqual(self.stored(), ["bob"])
+        self.assertEqual((self.collector.flushed, self.collector.dropped), (1, 1))
+
+        self.uow.responses.participant = None  # type: ignore[attr-defined]
+        self.assertEqual(self.collector.flush(), 1)
+        self.assertEqual(self.stored(), ["bob", "carol"])
+        self.assertEqual(self.collector.flushed, 2)
+
+    def test_background_flusher_survives_errors(self):
+        failures = []
+        retried = threading.Event()
+
+        def flush_if_due():
+            failures.append(True)
+            if len(failures) == 2:
+                retried.set()
+            raise RuntimeError("disk full")
+
+        self.collector.flush_if_due = flush_if_due  # type: ignore[method-assign]
+        self.collector.max_delay = 0.01
+        with self.assertLogs("slidow.service_layer.responses", "ERROR"):
+            self.collector.start()
+            self.assertTrue(retried.wait(5))
+            self.collector.stop()
+
+    def test_background_flusher_writes_on_stop(self):
+
+        self.collector.start()
+        self.collector.submit("alice", "quiz1", 0, 0b01)
+        self.collector.stop()
+
+        self.assertEqual(self.stored(), ["alice"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 import unittest
 
+from slidow import models
 from slidow.adapters import repos
-from slidow.service_layer import services, unit_of_work
+from slidow.service_layer import leaderboard, services, unit_of_work
 
 
 class AddEventTestCase(unittest.TestCase):
@@ -26,6 +27,164 @@ class AddEventTestCase(unittest.TestCase):
             services.add_event(event_name, uow)
 
 
+class AddEventsTestCase(unittest.TestCase):
+
+    def test_can_add_events(self):
+        event_names = ["Event1", "Event2", "Event3"]
+
+        uow = unit_of_work.DummyUOW()
+        identifiers = services.add_events(event_names, uow)
+
+        self.assertTrue(uow.committed)
+        added_names = [uow.events.get(identifier).name for identifier in identifiers]
+        self.assertEqual(added_names, event_names)
+
+    def test_no_event_is_added_if_a_name_is_empty(self):
+
+        uow = unit_of_work.DummyUOW()
+
+        with self.assertRaises(services.InvalidEventNameError):
+            services.add_events(["Event1", ""], uow)
+        self.assertFalse(uow.committed)
+        self.assertEqual(list(uow.events.list()), [])
+
+
+class AddQuizzesTestCase(unittest.TestCase):
+
+    def test_can_add_quizzes(self):
+        question = models.Question("Is Bitcoin Dead?", [models.Option("no", True)])
+
+        uow = unit_of_work.DummyUOW()
+        [identifier] = services.add_quizzes([("warmup quiz", [question])], uow)
+
+        self.assertTrue(uow.committed)
+        added_quiz = uow.quizzes.get(identifier)
+        self.assertEqual(added_quiz.title, "warmup quiz")
+        self.assertEqual(added_quiz.questions, [question])
+
+    def test_quiz_title_cannot_be_empty_string(self):
+
+        uow = unit_of_work.DummyUOW()
+
+        with self.assertRaises(services.InvalidQuizTitleError):
+            services.add_quizzes([("", [])], uow)
+
+
+class ImportExportQuizzesTestCase(unittest.TestCase):
+
+    quiz_lines = [
+        '{"identifier": "quiz1", "title": "warmup quiz", "questions": ['
+        '{"text": "Is Bitcoin Dead?", "options": ['
+        '{"text": "yes", "correct": false}, {"text": "no", "correct": true}]}]}\n',
+        "\n",
+        '{"title": "empty quiz"}\n',
+    ]
+
+    def test_can_import_quizzes(self):
+
+        uow = unit_of_work.DummyUOW()
+        count = services.import_quizzes(self.quiz_lines, uow, chunk_size=1)
+
+        self.assertEqual(count, 2)
+        quiz = uow.quizzes.get("quiz1")
+        self.assertEqual(quiz.title, "warmup quiz")
+        [question] = quiz.questions
+        self.assertEqual(
+            question.options, [models.Option("yes"), models.Option("no", True)]
+        )
+
+    def test_export_can_be_imported(self):
+
+        uow = unit_of_work.DummyUOW()
+        services.import_quizzes(self.quiz_lines, uow)
+
+        exported = list(services.export_quizzes(uow))
+        other_uow = unit_of_work.DummyUOW()
+        services.import_quizzes(exported, other_uow)
+
+        self.assertEqual(list(other_uow.quizzes.list()), list(uow.quizzes.list()))
+        self.assertEqual(
+            other_uow.quizzes.get("quiz1").questions,
+            uow.quizzes.get("quiz1").questions,
+        )
+
+    def test_invalid_line_is_reported(self):
+
+        uow = unit_of_work.DummyUOW()
+
+        with self.assertRaises(services.InvalidQuizDocumentError) as cm:
+            services.import_quizzes([self.quiz_lines[0], '{"questions": []}'], uow)
+        self.assertIn("line 2", cm.exception.msg)
+
+    def test_correct_must_be_a_boolean(self):
+
+        for correct in ('"false"', "0", "null"):
+            line = (
+                '{"title": "quiz", "questions": [{"text": "?", "options": ['
+                f'{{"text": "yes", "correct": {correct}}}]}}]}}'
+            )
+            with self.subTest(correct=correct):
+                with self.assertRaises(services.InvalidQuizDocumentError) as cm:
+                    services.import_quizzes([line], unit_of_work.DummyUOW())
+                self.assertIn("correct must be true or false", cm.exception.msg)
+
+
+class GradeQuestionTestCase(unittest.TestCase):
+
+    def test_can_grade_question_responses(self):
+        question = models.Question(
+            "Is Bitcoin Dead?", [models.Option("yes"), models.Option("no", True)]
+        )
+        uow = unit_of_work.DummyUOW()
+        uow.quizzes.add(models.Quiz("quiz1", "warmup quiz", [question]))
+        uow.responses.add_all(
+            [
+                models.Response("alice", "quiz1", 0, 0b10),
+                models.Response("bob", "quiz1", 0, 0b01),
+            ]
+        )
+
+        scores = services.grade_question("quiz1", 0, uow)
+
+        self.assertEqual(scores, {"alice": 1.0, "bob": 0.0})
+
+    def test_grading_a_missing_question_is_rejected(self):
+        question = models.Question("Is Bitcoin Dead?", [models.Option("no", True)])
+        uow = unit_of_work.DummyUOW()
+        uow.quizzes.add(models.Quiz("quiz1", "warmup quiz", [question]))
+
+        for index in (1, -1):
+            with self.assertRaises(services.InvalidQuestionIndexError) as cm:
+                services.grade_question("quiz1", index, uow)
+            self.assertIn(str(index), cm.exception.msg)
+
+
+class LaunchQuizTestCase(unittest.TestCase):
+
+    def test_can_launch_a_quiz(self):
+        question = models.Question("Is Bitcoin Dead?", [models.Option("no", True)])
+        uow = unit_of_work.DummyUOW()
+        uow.quizzes.add(models.Quiz("quiz1", "warmup quiz", [question]))
+
+        snapshot = services.launch_quiz("quiz1", uow)
+
+        self.assertEqual(snapshot.quiz_identifier, "quiz1")
+        self.assertEqual(snapshot.correct_masks, (0b1,))
+
+
+class LeaderboardTestCase(unittest.TestCase):
+
+    def test_can_save_and_load_a_leaderboard(self):
+        board = leaderboard.Leaderboard("quiz1", [("alice", 2.0), ("bob", 1.0)])
+        uow = unit_of_work.DummyUOW()
+
+        services.save_leaderboard(board, uow)
+        restored = services.load_leaderboard("quiz1", uow)
+
+        self.assertTrue(uow.committed)
+        self.assertEqual(restored.top(2), board.top(2))
+
+
 class ListEventTestCase(unittest.TestCase):
 
     def test_can_list_events(self):
@@ -36,11 +195,29 @@ class ListEventTestCase(unittest.TestCase):
         for name in events:
             services.add_event(name, uow)
 
-        event_repo = repos.EventKeyValRepo(uow.events.kv_store)  # type: ignore[attr-defined]
+        kv_store = uow.events.kv_store  # type: ignore[attr-defined]
+        event_repo = repos.EventKeyValRepo(kv_store)
         retrieved_events = services.get_events(event_repo)
         event_names = [name for _, name in retrieved_events]
         self.assertIn("Event1", event_names)
 
+    def test_can_page_through_events(self):
+
+        uow = unit_of_work.DummyUOW()
+        for i in range(5):
+            services.add_event(f"Event{i}", uow)
+
+        kv_store = uow.events.kv_store  # type: ignore[attr-defined]
+        event_repo = repos.EventKeyValRepo(kv_store)
+        first_page = services.get_events(event_repo, limit=3)
+        last_identifier, _ = first_page[-1]
+        second_page = services.get_events(event_repo, limit=3, after=last_identifier)
+
+        self.assertEqual(len(first_page), 3)
+        self.assertEqual(len(second_page), 2)
+        names = {name for _, name in [*first_page, *second_page]}
+        self.assertEqual(names, {f"Event{i}" for i in range(5)})
+
 
 if __name__ == "__main__":
     unittest.main()
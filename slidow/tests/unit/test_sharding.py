@@ -0,0 +1,69 @@
+import unittest
+
+from slidow import models
+from slidow.adapters import repos, sharding
+
+
+class ShardedRepoTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.shards = [repos.EventKeyValRepo({}) for _ in range(3)]
+        self.repo = sharding.ShardedEventRepo(self.shards)
+        self.identifiers = [f"event{i:02}" for i in range(20)]
+        self.repo.add_all(models.Event(i, i.title()) for i in self.identifiers)
+
+    def test_events_are_stored_in_their_hashed_shard(self):
+
+        for identifier in self.identifiers:
+            shard = self.shards[sharding.shard_for(identifier, 3)]
+            self.assertEqual(shard.get(identifier).identifier, identifier)
+        self.assertEqual(sum(len(list(shard.list())) for shard in self.shards), 20)
+        self.assertTrue(all(shard.list() for shard in self.shards))
+
+    def test_get_reads_from_the_hashed_shard(self):
+
+        self.assertEqual(self.repo.get("event07").name, "Event07")
+
+    def test_pages_are_merged_across_shards(self):
+
+        first = self.repo.page(8)
+        rest = self.repo.page(20, after=first[-1].identifier)
+
+        self.assertEqual(
+            [e.identifier for e in (*first, *rest)], sorted(self.identifiers)
+        )
+        self.assertEqual(
+            self.repo.summaries(2, after="event17"),
+            [("event18", "Event18"), ("event19", "Event19")],
+        )
+
+    def test_list_scans_every_shard_in_pages(self):
+
+        sharding.SCAN_PAGE_SIZE, page_size = 3, sharding.SCAN_PAGE_SIZE
+        try:
+            events = self.repo.list()
+        finally:
+            sharding.SCAN_PAGE_SIZE = page_size
+
+        self.assertEqual([e.identifier for e in events], sorted(self.identifiers))
+
+    def test_responses_follow_their_quiz(self):
+        shards = [repos.ResponseKeyValRepo({}) for _ in range(3)]
+        repo = sharding.ShardedResponseRepo(shards)
+
+        repo.add_all(
+            [
+                models.Response("alice", "quiz1", 0, 1),
+                models.Response("bob", "quiz1", 0, 2),
+            ]
+        )
+
+        home = shards[sharding.shard_for("quiz1", 3)]
+        self.assertEqual(len(home.for_question("quiz1", 0)), 2)
+        self.assertEqual(
+            sorted(repo.selections("quiz1", 0)), [("alice", 1), ("bob", 2)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()